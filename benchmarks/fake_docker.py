@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Stand-in for the ``docker`` CLI used by the benchmarks and the tests.
+
+Containers share the host filesystem, so container paths are host paths and commands run on
+the host. As with the real client, exec'd commands run in their own session and their output is
+relayed, so killing the client leaves them running.
+
+The running services are listed in ``$FAKE_DOCKER_STATE/services``, one per line, and container
+IDs embed ``$FAKE_DOCKER_STATE/generation``, so bumping it makes every cached ID stale, as if the
+containers had been recreated. ``FAKE_DOCKER_LATENCY`` adds a fixed delay, in seconds, to every
+invocation to emulate the docker daemon round trip, and ``FAKE_DOCKER_CP_DELAY`` delays every copy.
+
+Supported: ``compose ps --format json``, ``compose exec``, ``compose cp``, ``exec`` and ``cp``.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+
+STATE = os.environ["FAKE_DOCKER_STATE"]
+
+def read_state(name):
+    with open(os.path.join(STATE, name)) as file:
+        return file.read().split()
+
+def fail(message):
+    sys.stderr.write(f"Error response from daemon: {message}\n")
+    sys.exit(1)
+
+def container_id(service):
+    return f"fake_{service}_{read_state('generation')[0]}"
+
+def service_of(container):
+    for service in read_state("services"):
+        if container == container_id(service):
+            return service
+    fail(f"No such container: {container}")
+
+def relay(pipe, fd):
+    while True:
+        chunk = os.read(pipe.fileno(), 65536)
+        if not chunk:
+            return
+        os.write(fd, chunk)
+
+def exec_(args, compose):
+    while args[0].startswith("-"):
+        if args[0] in ("-e", "--env"):
+            name, value = args[1].split("=", 1)
+            os.environ[name] = value
+            args = args[1:]
+        args = args[1:]
+    if compose:
+        if args[0] not in read_state("services"):
+            fail(f"service \"{args[0]}\" is not running")
+    else:
+        service_of(args[0])
+    process = subprocess.Popen(args[1:], stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    relays = [threading.Thread(target=relay, args=(pipe, fd)) for pipe, fd in ((process.stdout, 1), (process.stderr, 2))]
+    for thread in relays:
+        thread.start()
+    for thread in relays:
+        thread.join()
+    sys.exit(process.wait())
+
+def cp(service, path, dest):
+    if not os.path.lexists(path):
+        fail(f"Could not find the file {path} in container {container_id(service)}")
+    time.sleep(float(os.environ.get("FAKE_DOCKER_CP_DELAY", "0")))
+    if dest == "-":
+        with tarfile.open(fileobj=sys.stdout.buffer, mode="w|") as tar:
+            tar.add(path, arcname=os.path.basename(path.rstrip("/")))
+    elif os.path.isdir(path):
+        shutil.copytree(path, dest, symlinks=True)
+    else:
+        shutil.copy(path, dest)
+
+def main(args):
+    time.sleep(float(os.environ.get("FAKE_DOCKER_LATENCY", "0")))
+    if args[0] == "compose":
+        args = args[1:]
+        if args[0] == "-f":
+            args = args[2:]
+        if args[0] == "ps":
+            for service in read_state("services"):
+                print(json.dumps({"ID": container_id(service), "Service": service, "State": "running"}))
+            return
+        if args[0] == "exec":
+            return exec_(args[1:], compose=True)
+        if args[0] == "cp":
+            service, path = args[1].split(":", 1)
+            return cp(service, path, args[2])
+    elif args[0] == "exec":
+        return exec_(args[1:], compose=False)
+    elif args[0] == "cp":
+        container, path = args[1].split(":", 1)
+        return cp(service_of(container), path, args[2])
+    fail(f"unsupported command: {' '.join(args)}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
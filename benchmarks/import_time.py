@@ -0,0 +1,69 @@
+"""Measure how long ``import fulgens`` takes in a fresh interpreter.
+
+Every sample starts a new Python process, like a checker launched by the gameserver. The
+module of another git revision can be measured side by side with ``--rev`` to show the change.
+
+Usage::
+
+    python benchmarks/import_time.py --runs 20 --rev HEAD~1
+"""
+from pathlib import Path
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("fabric", "paramiko", "cryptography", "invoke", "yaml", "asyncio", "concurrent.futures", "http.client")
+
+PROBE = f"""
+import sys, time
+started = time.perf_counter()
+import fulgens
+elapsed = time.perf_counter() - started
+print(elapsed, ",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+
+def measure(module_dir: Path, runs: int):
+    samples = []
+    loaded = ""
+    for _ in range(runs):
+        stdout = subprocess.run([sys.executable, "-c", PROBE], cwd=module_dir, capture_output=True, check=True, text=True).stdout
+        elapsed, _, loaded = stdout.strip().partition(" ")
+        samples.append(float(elapsed) * 1000)
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "heavy_modules": loaded.split(",") if loaded else [],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per measurement")
+    parser.add_argument("--rev", help="git revision to measure as well, e.g. a previous release tag")
+    parser.add_argument("--output", type=Path, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {"working tree": measure(REPO_DIR, args.runs)}
+    if args.rev:
+        with tempfile.TemporaryDirectory(prefix="fulgens-import-") as rev_dir:
+            source = subprocess.run(["git", "show", f"{args.rev}:fulgens.py"], cwd=REPO_DIR, capture_output=True, check=True).stdout
+            Path(rev_dir, "fulgens.py").write_bytes(source)
+            results[args.rev] = measure(Path(rev_dir), args.runs)
+
+    for name, result in results.items():
+        modules = ", ".join(result["heavy_modules"]) or "none"
+        print(f"{name:14} median {result['median_ms']:7.1f}ms  min {result['min_ms']:7.1f}ms  heavy modules: {modules}")
+    if args.output:
+        report = {"python": platform.python_version(), "platform": platform.platform(), "results": results}
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Measure the throughput and latency of :class:`fulgens.ChallengeHelper` operations.
+
+The docker CLI is replaced by ``fake_docker.py`` and the team VM by a local SSH server, so the
+numbers track the overhead of fulgens itself (process spawns, SSH round trips, transfers)
+rather than the docker daemon. Results are written as JSON; compare two runs with ``--compare``.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py --iterations 200 --latency 0.005
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/0.2.0.json
+"""
+from pathlib import Path
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import stat
+import sys
+import tempfile
+import time
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import fabric
+import fulgens
+from ssh_server import SSHServer
+
+SERVICE = "web"
+
+def version():
+    for line in BENCH_DIR.parent.joinpath("setup.py").read_text().splitlines():
+        if line.strip().startswith("version="):
+            return line.split("'")[1]
+    return "unknown"
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))]
+
+def setup_workdir(workdir: Path, payload_size: int, folder_files: int):
+    bin_dir = workdir.joinpath("bin")
+    bin_dir.mkdir()
+    docker = bin_dir.joinpath("docker")
+    docker.write_text(f"#!/bin/sh\nexec {sys.executable} {BENCH_DIR.joinpath('fake_docker.py')} \"$@\"\n")
+    docker.chmod(docker.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    # The fake containers share the host filesystem, so the fetched paths are host paths.
+    data_dir = workdir.joinpath("container", "data")
+    data_dir.joinpath("folder").mkdir(parents=True)
+    data_dir.joinpath("file.bin").write_bytes(os.urandom(payload_size))
+    for index in range(folder_files):
+        data_dir.joinpath("folder", f"{index}.bin").write_bytes(os.urandom(max(payload_size // folder_files, 1)))
+
+    chall_dir = workdir.joinpath("chall")
+    chall_dir.mkdir()
+    chall_dir.joinpath("docker-compose.yml").write_text(f"services:\n  {SERVICE}:\n    image: bench\n")
+    workdir.joinpath("remote").mkdir()
+    workdir.joinpath("out").mkdir()
+
+    state_dir = workdir.joinpath("docker-state")
+    state_dir.mkdir()
+    state_dir.joinpath("services").write_text(f"{SERVICE}\n")
+    state_dir.joinpath("generation").write_text("0\n")
+
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    os.environ["FAKE_DOCKER_STATE"] = str(state_dir)
+    return data_dir
+
+def measure(operation, iterations: int, warmup: int):
+    for index in range(warmup):
+        operation(-index - 1)
+    latencies = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        op_started = time.perf_counter()
+        operation(index)
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+    }
+
+def bench_helper(helper: fulgens.ChallengeHelper, data_dir: Path, out_dir: Path, iterations: int, warmup: int):
+    def run(index):
+        stdout, _, exit_code = helper.run(SERVICE, "echo ok")
+        assert exit_code == 0 and stdout == b"ok\n", stdout
+
+    def fetch(source, stream):
+        def operation(index):
+            dest = out_dir.joinpath(f"{index}")
+            assert helper.fetch(SERVICE, source, dest, stream=stream)
+            if dest.is_dir():
+                shutil.rmtree(dest)
+            else:
+                dest.unlink()
+        return operation
+
+    return {
+        "run": measure(run, iterations, warmup),
+        "fetch_file": measure(fetch(data_dir.joinpath("file.bin"), False), iterations, warmup),
+        "fetch_folder": measure(fetch(data_dir.joinpath("folder"), False), iterations, warmup),
+        "fetch_file_stream": measure(fetch(data_dir.joinpath("file.bin"), True), iterations, warmup),
+        "fetch_folder_stream": measure(fetch(data_dir.joinpath("folder"), True), iterations, warmup),
+    }
+
+def compare(current: dict, baseline: dict):
+    for mode, operations in current["results"].items():
+        for operation, result in operations.items():
+            previous = baseline["results"].get(mode, {}).get(operation)
+            if previous is None:
+                continue
+            ratio = result["p50_ms"] / previous["p50_ms"]
+            print(f"{mode:6} {operation:20} p50 {previous['p50_ms']:8.2f}ms -> {result['p50_ms']:8.2f}ms ({ratio:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100, help="measured calls per operation")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured calls per operation")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every docker CLI call")
+    parser.add_argument("--payload-size", type=int, default=64 * 1024, help="bytes of the fetched file and of the whole fetched folder")
+    parser.add_argument("--folder-files", type=int, default=16, help="number of files in the fetched folder")
+    parser.add_argument("--modes", default="local,ssh", help="comma separated modes: local, ssh")
+    parser.add_argument("--output", type=Path, help="result file, defaults to benchmarks/results/<version>.json")
+    parser.add_argument("--compare", type=Path, help="previous result file to compare against")
+    args = parser.parse_args()
+
+    os.environ["FAKE_DOCKER_LATENCY"] = str(args.latency)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="fulgens-bench-") as workdir:
+        workdir = Path(workdir)
+        data_dir = setup_workdir(workdir, args.payload_size, args.folder_files)
+        chall_dir = workdir.joinpath("chall")
+        for mode in args.modes.split(","):
+            if mode == "local":
+                helper = fulgens.ChallengeHelper(["127.0.0.1"], "bench", chall_dir)
+            elif mode == "ssh":
+                server = SSHServer(str(workdir.joinpath("remote")))
+                conn = fabric.Connection("127.0.0.1", user="bench", port=server.port, connect_kwargs=server.connect_kwargs())
+                helper = fulgens.ChallengeHelper(["127.0.0.1"], "bench", chall_dir, chall_dir, ssh_conn=conn)
+            else:
+                parser.error(f"unknown mode '{mode}'")
+            results[mode] = bench_helper(helper, data_dir, workdir.joinpath("out"), args.iterations, args.warmup)
+            if mode == "ssh":
+                conn.close()
+                server.close()
+
+    report = {
+        "fulgens_version": version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+    output = args.output or BENCH_DIR.joinpath("results", f"{report['fulgens_version']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    for mode, operations in results.items():
+        for operation, result in operations.items():
+            print(f"{mode:6} {operation:20} {result['ops_per_sec']:9.1f} ops/s  p50 {result['p50_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms")
+    print(f"results written to {output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Local SSH server standing in for a team VM in the benchmarks.
+
+It accepts any password, runs exec requests with the host shell and serves SFTP. The server
+lives on the same host as the checker, so commands run from a private root directory where
+``/tmp`` is rewritten to its relative ``tmp`` directory, keeping the "remote" temporary files
+apart from the local ones while archives still get the same member names.
+"""
+import os
+import re
+import socket
+import subprocess
+import threading
+
+import paramiko
+
+# Container paths follow a colon in docker cp arguments and are left alone.
+_TMP_RE = re.compile(r"(?<![\w/.:])/tmp(?=/|\b)")
+
+class _SFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+class _SFTPServer(paramiko.SFTPServerInterface):
+    def __init__(self, server, remote_root, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.remote_root = remote_root
+
+    def __path(self, path):
+        return os.path.join(self.remote_root, _TMP_RE.sub("tmp", path))
+
+    def open(self, path, flags, attr):
+        handle = _SFTPHandle(flags)
+        handle.filename = path
+        handle.readfile = open(self.__path(path), "rb")
+        return handle
+
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.stat(self.__path(path)))
+
+    lstat = stat
+
+    def canonicalize(self, path):
+        return os.path.abspath(path)
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, remote_root):
+        self.remote_root = remote_root
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        command = _TMP_RE.sub("tmp", command.decode())
+        threading.Thread(target=self.__exec, args=(channel, command), daemon=True).start()
+        return True
+
+    def __exec(self, channel, command):
+        process = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.remote_root)
+
+        def pump_stdin():
+            try:
+                for data in iter(lambda: channel.recv(65536), b""):
+                    process.stdin.write(data)
+                    process.stdin.flush()
+            except OSError:
+                pass
+            finally:
+                process.stdin.close()
+
+        def pump_stderr():
+            try:
+                for data in iter(lambda: process.stderr.read1(65536), b""):
+                    channel.sendall_stderr(data)
+            except (OSError, EOFError):
+                pass
+
+        threads = [threading.Thread(target=pump_stdin, daemon=True), threading.Thread(target=pump_stderr, daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            for data in iter(lambda: process.stdout.read1(65536), b""):
+                channel.sendall(data)
+        except (OSError, EOFError):
+            process.kill()
+        threads[1].join()
+        try:
+            channel.send_exit_status(process.wait())
+            channel.shutdown_write()
+            channel.close()
+        except (OSError, EOFError):
+            # The client hung up first.
+            pass
+
+class SSHServer():
+    """SSH server listening on a free port of the loopback interface.
+
+    Attributes
+    ----------
+    port: int
+        Listening port.
+    remote_root: str
+        Working directory of the remote commands, its ``tmp`` directory is used in place of ``/tmp``.
+    """
+    def __init__(self, remote_root: str):
+        """Constructor.
+
+        Parameters
+        ----------
+        remote_root: str
+            See the :attr:`~SSHServer.remote_root` attribute.
+        """
+        self.remote_root = remote_root
+        os.makedirs(os.path.join(remote_root, "tmp"), exist_ok=True)
+        self.__host_key = paramiko.RSAKey.generate(2048)
+        self.__socket = socket.socket()
+        self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__socket.bind(("127.0.0.1", 0))
+        self.__socket.listen(64)
+        self.port = self.__socket.getsockname()[1]
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def __accept(self):
+        while True:
+            try:
+                client, _ = self.__socket.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.__host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _SFTPServer, self.remote_root)
+            transport.start_server(server=_Server(self.remote_root))
+
+    def connect_kwargs(self):
+        """Get the ``connect_kwargs`` for a :class:`fabric.Connection` to this server.
+
+        Returns
+        -------
+        dict
+            Paramiko connection arguments.
+        """
+        return {"password": "bench", "look_for_keys": False, "allow_agent": False}
+
+    def close(self):
+        """Stop accepting connections."""
+        self.__socket.close()
@@ -1,101 +1,4505 @@
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Callable, Dict, List
 from secrets import token_hex
-from shutil import move
+from shutil import copyfile, copystat, move, rmtree
+from stat import S_IFDIR, S_IFREG, S_ISDIR, S_ISREG
+from types import MappingProxyType
 
-import fabric
+import base64
+import hashlib
+import io
+import json
 import os
 import pathlib
+import re
+import select
+import selectors
 import shlex
+import socket
+import struct
 import subprocess
-import yaml
+import tarfile
+import threading
+import time
+import urllib.parse
+
+# fabric (with paramiko, cryptography and invoke), yaml, asyncio, concurrent.futures,
+# http and the optional numpy are imported where they are used, so that ``import fulgens``
+# stays cheap for checkers that never open an SSH connection.
+if TYPE_CHECKING:
+    import fabric
+    import http.client
+    import numpy
+
+_STALE_CONTAINER_RE = re.compile(rb"^Error(?: response from daemon)?: (?:No such container(?!:path)|Container \S+ is (?:not running|restarting))", re.MULTILINE | re.IGNORECASE)
+
+_CALL_ENV = "FULGENS_CALL"
+
+# The kill of a timed out command runs after the deadline has expired, so it gets its own budget.
+_KILL_TIMEOUT = 5.0
+
+def _kill_tagged_cmd(token: str):
+    """Shell command that kills every process inside a container tagged with ``token`` in its environment."""
+    return f"for p in /proc/[0-9]*; do grep -qs {_CALL_ENV}={token} $p/environ && kill -9 ${{p#/proc/}}; done; true"
+
+class CommandTimeout(TimeoutError):
+    """Raised when a command or transfer does not finish within its timeout or the helper deadline.
+
+    The command is killed before this is raised. A checker would usually turn it into a
+    ``FAIL`` verdict, since the service took too long to respond.
+
+    Attributes
+    ----------
+    timeout: float
+        Timeout that expired, in seconds.
+    """
+    def __init__(self, timeout: float):
+        super().__init__(f"operation timed out after {timeout:.2f} seconds.")
+        self.timeout = timeout
+
+def _remaining_timeout(deadlines: List[float], timeout: float | None = None):
+    """Get the smaller of ``timeout`` and the time left before the earliest of ``deadlines``.
+
+    Returns ``None`` without any limit and raises :class:`CommandTimeout` once one has expired.
+    """
+    limits = [deadline - time.monotonic() for deadline in deadlines]
+    if timeout is not None:
+        limits.append(timeout)
+    if not limits:
+        return None
+    if min(limits) <= 0:
+        raise CommandTimeout(0)
+    return min(limits)
+
+class _Watchdog():
+    """Run kill callbacks once a timeout expires and turn the interrupted operation into :class:`CommandTimeout`."""
+    def __init__(self, timeout: float | None):
+        self.timeout = timeout
+        self.expired = False
+        self.__callbacks = []
+        self.__lock = threading.Lock()
+        self.__timer = None
+        if timeout is not None:
+            self.__timer = threading.Timer(timeout, self.__expire)
+            self.__timer.daemon = True
+            self.__timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cancel()
+        if self.expired:
+            raise CommandTimeout(self.timeout) from exc
+
+    def __expire(self):
+        with self.__lock:
+            self.expired = True
+            callbacks = self.__callbacks
+            self.__callbacks = []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_expire(self, callback: Callable):
+        with self.__lock:
+            if not self.expired:
+                self.__callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        if self.expired:
+            raise CommandTimeout(self.timeout)
+
+    def cancel(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+
+def _parse_compose_ps(output: bytes):
+    """Map service name to container ID from ``docker compose ps --format json`` output.
+
+    Older compose releases print a single JSON array, newer ones print one JSON object per line.
+    """
+    output = output.strip()
+    if not output:
+        return {}
+    if output.startswith(b"["):
+        containers = json.loads(output)
+    else:
+        containers = [json.loads(line) for line in output.splitlines() if line.strip()]
+    return {container["Service"]: container["ID"] for container in containers if container.get("State", "running") == "running"}
+
+def _frame_command(cmd: str, token: str):
+    """Wrap a command so its end is marked on both output streams.
+
+    The command runs in an ``eval`` subshell with its standard input closed. Afterwards
+    ``\\x1e<token> <exit code>\\n`` is printed on stdout and ``\\x1e<token>\\n`` on stderr.
+    """
+    return (
+        f"(eval {shlex.quote(cmd)}) </dev/null; __rc=$?; "
+        f"printf '\\036%s %d\\n' {token} $__rc; printf '\\036%s\\n' {token} >&2"
+    )
+
+def _split_frames(stdout: bytes, stderr: bytes, token: str):
+    """Split the output of commands wrapped by :func:`_frame_command` into ``(stdout, stderr, exit code)`` tuples.
+
+    Output after the last complete frame is ignored.
+    """
+    marker = b"\x1e" + token.encode()
+    out_parts = stdout.split(marker + b" ")
+    err_parts = stderr.split(marker + b"\n")
+    frames = []
+    out, rest = out_parts[0], out_parts[1:]
+    for i, part in enumerate(rest):
+        if i + 1 >= len(err_parts):
+            break
+        code, sep, next_out = part.partition(b"\n")
+        if not sep:
+            break
+        frames.append((out, err_parts[i], int(code)))
+        out = next_out
+    return frames
+
+def _fetch_filter(member: tarfile.TarInfo, dest_path: str):
+    """Extraction filter for fetched archives.
+
+    Unlike the ``data`` filter it keeps symlinks wherever they point, as ``docker cp`` does, and
+    only rejects members that would be written outside of ``dest_path``.
+    """
+    root = os.path.realpath(dest_path)
+    def inside(path):
+        return os.path.commonpath([root, os.path.realpath(os.path.join(root, path))]) == root
+    names = [member.name, member.linkname] if member.islnk() else [member.name]
+    for name in names:
+        if os.path.isabs(name) or ".." in name.split("/"):
+            raise IOError(f"archive member '{name}' points outside of the destination.")
+    # A symlink member is created, not followed, so only its parent has to stay inside.
+    if not inside(os.path.dirname(member.name) if member.issym() else member.name) or (member.islnk() and not inside(member.linkname)):
+        raise IOError(f"archive member '{member.name}' points outside of the destination.")
+    if member.isdev():
+        raise IOError(f"archive member '{member.name}' is a device file.")
+    member.mode &= 0o777
+    return member
+
+def _extract_tar_stream(fileobj, source: str | pathlib.Path, dest: str | pathlib.Path):
+    """Extract a ``docker cp SRC -`` tar stream so that ``source`` lands at ``dest``.
+
+    The archive root is named after the basename of ``source``. Like :func:`shutil.move`,
+    if ``dest`` is an existing directory the root is placed inside it, otherwise it is
+    renamed to ``dest``. The archive is extracted into a scratch directory next to its
+    destination first, so a failed transfer leaves whatever was at ``dest`` untouched.
+    """
+    dest = Path(dest)
+    if dest.is_dir() and not dest.is_symlink():
+        dest = dest.joinpath(os.path.basename(str(source).rstrip("/")))
+    scratch_dir = dest.parent.joinpath(f".fulgens-{token_hex(8)}")
+    scratch_dir.mkdir()
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+            for member in tar:
+                _, _, rest = member.name.partition("/")
+                member.name = dest.name + ("/" + rest if rest else "")
+                if member.islnk():
+                    _, _, link_rest = member.linkname.partition("/")
+                    member.linkname = dest.name + ("/" + link_rest if link_rest else "")
+                if hasattr(tarfile, "data_filter"):
+                    tar.extract(member, path=scratch_dir, filter=_fetch_filter)
+                else:
+                    tar.extract(_fetch_filter(member, str(scratch_dir)), path=scratch_dir)
+        extracted = scratch_dir.joinpath(dest.name)
+        if not extracted.is_symlink() and not extracted.exists():
+            raise IOError(f"archive of '{source}' is empty.")
+        _replace_path(extracted, dest)
+    finally:
+        rmtree(scratch_dir, ignore_errors=True)
+    return True
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+_compose_lock = threading.Lock()
+_compose_by_path = {}
+_compose_by_digest = {}
+
+def load_compose(path: str | pathlib.Path):
+    """Parse a compose file through the process-wide compose model cache.
+
+    Files are keyed by path and revalidated by modification time and size, so unchanged files
+    are not read again. Changed or new files are read and hashed, and files with the same content
+    share the same model, so every helper of a challenge points to a single parsed copy. The C
+    YAML loader is used when PyYAML was built with libyaml.
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        Compose file path.
+
+    Returns
+    -------
+    types.MappingProxyType
+        Read-only compose model, with mappings as read-only mappings and lists as tuples.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    version = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with _compose_lock:
+        cached = _compose_by_path.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, "rb") as compose_file:
+        content = compose_file.read()
+    digest = hashlib.sha256(content).digest()
+    with _compose_lock:
+        model = _compose_by_digest.get(digest)
+    if model is None:
+        import yaml
+        model = _freeze(yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)))
+        with _compose_lock:
+            model = _compose_by_digest.setdefault(digest, model)
+    with _compose_lock:
+        previous = _compose_by_path.get(path)
+        _compose_by_path[path] = (version, model, digest)
+        if previous is not None and previous[2] != digest and all(entry[2] != previous[2] for entry in _compose_by_path.values()):
+            del _compose_by_digest[previous[2]]
+    return model
+
+def _compose_project(local_challenge_dir: str | pathlib.Path, remote_challenge_dir: str | pathlib.Path | None, compose_filename: str):
+    """Get the ``services`` section and the compose project name of a challenge, as ``docker compose`` derives it."""
+    compose_data = load_compose(Path(local_challenge_dir).joinpath(compose_filename))
+    project_name = compose_data.get("name") or os.environ.get("COMPOSE_PROJECT_NAME") \
+        or re.sub(r"[^a-z0-9_-]", "", Path(remote_challenge_dir or local_challenge_dir).name.lower())
+    return compose_data["services"], project_name
+
+def clear_compose_cache():
+    """Drop every model of the compose model cache, see :func:`load_compose`."""
+    with _compose_lock:
+        _compose_by_path.clear()
+        _compose_by_digest.clear()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""Default upper bounds, in seconds, of the latency histograms."""
+
+SIZE_BUCKETS = (256, 4096, 65536, 1048576, 16777216, 268435456)
+"""Default upper bounds, in bytes, of the transferred size histograms."""
+
+class Histogram():
+    """Histogram with fixed bucket upper bounds.
+
+    Attributes
+    ----------
+    buckets: Tuple[float]
+        Bucket upper bounds, in increasing order. Values above the last bound fall in an implicit ``+Inf`` bucket.
+    counts: List[int]
+        Number of observations per bucket, the last item is the ``+Inf`` bucket.
+    count: int
+        Number of observations.
+    sum: float
+        Sum of the observed values.
+    """
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        """Constructor.
+
+        Parameters
+        ----------
+        buckets: Tuple[float]
+            See the :attr:`~Histogram.buckets` attribute.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value: float):
+        """Add an observation.
+
+        Parameters
+        ----------
+        value: float
+            Observed value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Get the cumulative count of every bucket.
+
+        Returns
+        -------
+        List[Tuple[float, int]]
+            Bucket upper bound and number of observations less than or equal to it, ending with ``+Inf``.
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        """Convert the histogram to plain data.
+
+        Returns
+        -------
+        dict
+            ``buckets`` (cumulative counts keyed by upper bound), ``count`` and ``sum``.
+        """
+        return {"buckets": dict(self.cumulative()), "count": self.count, "sum": self.sum}
+
+class OperationSample():
+    """Measurement of a single helper operation, passed to the stats hooks.
+
+    Attributes
+    ----------
+    operation: str
+        Operation name: ``run``, ``run_many``, ``fetch``, ``read``, ``dir_check``, ``transfer``,
+        ``session``, ``stream``, ``ps`` or ``kill``.
+    service: str or None
+        Service name, ``None`` for operations not tied to one service.
+    backend: str
+        :attr:`Backend.name` of the helper backend, e.g. ``local``, ``ssh``, ``docker_api`` or ``fake``,
+        and ``asyncio`` or ``asyncssh`` for :class:`AsyncChallengeHelper`.
+    seconds: float
+        Wall time.
+    bytes: int
+        Bytes moved (command output or transferred data).
+    spawns: int
+        Processes or SSH channels started.
+    error: str or None
+        Exception class name if the operation failed.
+    """
+    def __init__(self, operation: str, service: str | None, backend: str, spawns: int = 0):
+        """Constructor.
+
+        Parameters
+        ----------
+        operation: str
+            See the :attr:`~OperationSample.operation` attribute.
+        service: str or None
+            See the :attr:`~OperationSample.service` attribute.
+        backend: str
+            See the :attr:`~OperationSample.backend` attribute.
+        spawns: int
+            See the :attr:`~OperationSample.spawns` attribute.
+        """
+        self.operation = operation
+        self.service = service
+        self.backend = backend
+        self.seconds = 0.0
+        self.bytes = 0
+        self.spawns = spawns
+        self.error = None
+
+class OperationStats():
+    """Aggregated samples of one operation on one service through one backend.
+
+    Attributes
+    ----------
+    count: int
+        Number of samples.
+    errors: int
+        Number of failed samples.
+    spawns: int
+        Total processes or SSH channels started.
+    bytes: int
+        Total bytes moved.
+    latency: Histogram
+        Wall time histogram, in seconds.
+    size: Histogram
+        Bytes moved histogram.
+    """
+    def __init__(self):
+        """Constructor."""
+        self.count = 0
+        self.errors = 0
+        self.spawns = 0
+        self.bytes = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+    def add(self, sample: OperationSample):
+        """Aggregate a sample.
+
+        Parameters
+        ----------
+        sample: fulgens.OperationSample
+            Sample to add.
+        """
+        self.count += 1
+        self.errors += sample.error is not None
+        self.spawns += sample.spawns
+        self.bytes += sample.bytes
+        self.latency.observe(sample.seconds)
+        self.size.observe(sample.bytes)
+
+    def to_dict(self):
+        """Convert the stats to plain data.
+
+        Returns
+        -------
+        dict
+            Counters and histograms.
+        """
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "spawns": self.spawns,
+            "bytes": self.bytes,
+            "latency": self.latency.to_dict(),
+            "size": self.size.to_dict(),
+        }
+
+class _StatsRecorder():
+    """Operation stats and stats hooks of a helper, shared by :class:`ChallengeHelper` and :class:`AsyncChallengeHelper`."""
+    def __init__(self, helper):
+        self.helper = helper
+        self.stats = {}
+        self.hooks = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, operation: str, service_name: str | None, backend: str, spawns: int = 0):
+        sample = OperationSample(operation, service_name, backend, spawns)
+        start = time.perf_counter()
+        try:
+            yield sample
+        except BaseException as ex:
+            sample.error = type(ex).__name__
+            raise
+        finally:
+            sample.seconds = time.perf_counter() - start
+            key = (sample.operation, sample.service, sample.backend)
+            with self.lock:
+                if key not in self.stats:
+                    self.stats[key] = OperationStats()
+                self.stats[key].add(sample)
+                hooks = list(self.hooks)
+            for hook in hooks:
+                try:
+                    hook(self.helper, sample)
+                except Exception:
+                    # Metrics must never break a check.
+                    pass
+
+    def add_hook(self, hook: Callable):
+        with self.lock:
+            self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable):
+        with self.lock:
+            self.hooks.remove(hook)
+
+    def to_dict(self):
+        with self.lock:
+            return {key: stats.to_dict() for key, stats in self.stats.items()}
+
+class _CountingReader():
+    """Read-only file wrapper counting the bytes read through it."""
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, size: int = -1):
+        data = self.fileobj.read(size)
+        self.bytes_read += len(data)
+        return data
+
+def _path_size(path: str | pathlib.Path):
+    path = Path(path)
+    if not path.is_dir():
+        return path.stat().st_size
+    return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+
+class DockerAPIError(IOError):
+    """Raised when the Docker Engine API answers with an error status."""
+    def __init__(self, status: int, message: str):
+        super().__init__(f"docker api error {status}: {message}")
+        self.status = status
+
+def _unix_http_connection(socket_path: str, timeout: float | None = None):
+    import http.client
+    conn = http.client.HTTPConnection("localhost", timeout=timeout)
+
+    def connect():
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(conn.timeout)
+        sock.connect(socket_path)
+        conn.sock = sock
+
+    conn.connect = connect
+    return conn
+
+class DockerEngineAPI():
+    """Minimal Docker Engine API client over a unix socket.
+
+    Requests reuse a keep-alive connection per thread instead of spawning a ``docker`` CLI
+    process for every call. Remote engines can be reached by forwarding their socket, e.g.
+    ``ssh -L /tmp/team1.sock:/var/run/docker.sock team1``.
+
+    Attributes
+    ----------
+    socket_path: str
+        Path to the Docker Engine unix socket.
+    api_version: str
+        Docker Engine API version prefix used in every request path.
+    timeout: float or None
+        Socket timeout in seconds.
+    """
+    def __init__(self, socket_path: str = "/var/run/docker.sock", api_version: str = "v1.41", timeout: float | None = None):
+        """Constructor.
+
+        Parameters
+        ----------
+        socket_path: str
+            See the :attr:`~DockerEngineAPI.socket_path` attribute.
+        api_version: str
+            See the :attr:`~DockerEngineAPI.api_version` attribute.
+        timeout: float or None
+            See the :attr:`~DockerEngineAPI.timeout` attribute.
+        """
+        self.socket_path = socket_path
+        self.api_version = api_version
+        self.timeout = timeout
+        self.__local = threading.local()
+
+    def __connection(self):
+        conn = getattr(self.__local, "conn", None)
+        if conn is None:
+            conn = _unix_http_connection(self.socket_path, self.timeout)
+            self.__local.conn = conn
+        return conn
+
+    def _reset(self):
+        """Drop the connection of the current thread, e.g. after a response was abandoned halfway."""
+        conn = getattr(self.__local, "conn", None)
+        if conn is not None:
+            conn.close()
+
+    def _request(self, method: str, path: str, body: dict | None = None, query: dict | None = None, timeout: float | None = None):
+        url = f"/{self.api_version}{path}"
+        if query:
+            url += "?" + urllib.parse.urlencode(query)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        conn = self.__connection()
+        conn.timeout = self.timeout if timeout is None else timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        try:
+            conn.request(method, url, body=payload, headers=headers)
+            resp = conn.getresponse()
+        except (BrokenPipeError, ConnectionResetError):
+            # The engine closed the idle keep-alive connection, retry once on a fresh one.
+            conn.close()
+            conn.request(method, url, body=payload, headers=headers)
+            resp = conn.getresponse()
+        if resp.status >= 400:
+            data = resp.read()
+            try:
+                message = json.loads(data)["message"]
+            except (ValueError, KeyError, TypeError):
+                message = data.decode(errors="replace")
+            raise DockerAPIError(resp.status, message)
+        return resp
+
+    def _json(self, method: str, path: str, body: dict | None = None, query: dict | None = None):
+        data = self._request(method, path, body, query).read()
+        return json.loads(data) if data else None
+
+    def container_ids(self, project: str):
+        """Get the IDs of every running container of a compose project.
+
+        Parameters
+        ----------
+        project: str
+            Compose project name.
+
+        Returns
+        -------
+        dict
+            Mapping of service name to container ID.
+        """
+        filters = {"label": [f"com.docker.compose.project={project}"], "status": ["running"]}
+        containers = self._json("GET", "/containers/json", query={"filters": json.dumps(filters)})
+        return {container["Labels"]["com.docker.compose.service"]: container["Id"] for container in containers}
+
+    def exec(self, container_id: str, cmd: List[str], env: List[str] | None = None, timeout: float | None = None):
+        """Execute a command inside a container.
+
+        Parameters
+        ----------
+        container_id: str
+            Container ID.
+        cmd: List[str]
+            Command arguments.
+        env: List[str] or None
+            Extra ``KEY=value`` environment variables.
+        timeout: float or None
+            Socket timeout in seconds while waiting for output.
+
+        Returns
+        -------
+        bytes
+            Standard output.
+        bytes
+            Standard error.
+        int
+            exit code
+
+        Raises
+        ------
+        TimeoutError
+            If no output arrives within ``timeout``.
+        """
+        exec_id = self._json("POST", f"/containers/{container_id}/exec", {"AttachStdout": True, "AttachStderr": True, "Cmd": cmd, "Env": env or []})["Id"]
+        stdout, stderr = bytearray(), bytearray()
+        try:
+            resp = self._request("POST", f"/exec/{exec_id}/start", {"Detach": False, "Tty": False}, timeout=timeout)
+            with resp:
+                while True:
+                    header = resp.read(8)
+                    if len(header) < 8:
+                        break
+                    stream, size = struct.unpack(">BxxxI", header)
+                    (stderr if stream == 2 else stdout).extend(resp.read(size))
+        except TimeoutError:
+            self._reset()
+            raise
+        exit_code = self.exec_inspect(exec_id)["ExitCode"]
+        return bytes(stdout), bytes(stderr), exit_code
+
+    def exec_attach(self, container_id: str, cmd: List[str], env: List[str] | None = None, stdin: bool = True):
+        """Start a command inside a container with its standard streams attached to a socket.
+
+        The exec start request upgrades its own connection to a raw stream, as ``docker exec -i``
+        does, so the command can be fed and read while it runs.
+
+        Parameters
+        ----------
+        container_id: str
+            Container ID.
+        cmd: List[str]
+            Command arguments.
+        env: List[str] or None
+            Extra ``KEY=value`` environment variables.
+        stdin: bool
+            Whether to attach the standard input of the command.
+
+        Returns
+        -------
+        str
+            Exec ID, see :meth:`~DockerEngineAPI.exec_inspect`.
+        socket.socket
+            Hijacked connection. Data sent goes to the standard input of the command, shutting
+            down the writing side closes it, and the output arrives in the frames of :meth:`~DockerEngineAPI.exec`.
+        """
+        exec_id = self._json("POST", f"/containers/{container_id}/exec", {"AttachStdin": stdin, "AttachStdout": True, "AttachStderr": True, "Cmd": cmd, "Env": env or []})["Id"]
+        body = json.dumps({"Detach": False, "Tty": False}).encode()
+        request = (
+            f"POST /{self.api_version}/exec/{exec_id}/start HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: Upgrade\r\nUpgrade: tcp\r\n\r\n"
+        )
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(request.encode() + body)
+            # Read the response head byte by byte, the output frames may follow in the same segment.
+            head = bytearray()
+            while not head.endswith(b"\r\n\r\n"):
+                data = sock.recv(1)
+                if not data:
+                    raise DockerAPIError(502, "connection closed before the exec started.")
+                head += data
+            status_line = head.split(b"\r\n", 1)[0].decode(errors="replace")
+            status = int(status_line.split()[1])
+            # Engines older than API 1.42 answer 200 instead of 101, the stream is the same.
+            if status not in (101, 200):
+                raise DockerAPIError(status, status_line)
+            sock.settimeout(None)
+        except BaseException:
+            sock.close()
+            raise
+        return exec_id, sock
+
+    def exec_inspect(self, exec_id: str):
+        """Get the state of an exec.
+
+        Parameters
+        ----------
+        exec_id: str
+            Exec ID.
+
+        Returns
+        -------
+        dict
+            Exec details, with ``Running`` and ``ExitCode`` among others.
+        """
+        return self._json("GET", f"/exec/{exec_id}/json")
+
+    def stat_path(self, container_id: str, path: str):
+        """Get the status of a container path.
+
+        Parameters
+        ----------
+        container_id: str
+            Container ID.
+        path: str
+            Path inside the container.
+
+        Returns
+        -------
+        dict
+            ``name``, ``size``, ``mode`` (a Go ``os.FileMode``), ``mtime`` and ``linkTarget``.
+
+        Raises
+        ------
+        DockerAPIError
+            If the path does not exist (status 404).
+        """
+        resp = self._request("HEAD", f"/containers/{container_id}/archive", query={"path": str(path)})
+        resp.read()
+        return json.loads(base64.b64decode(resp.getheader("X-Docker-Container-Path-Stat")))
+
+    def get_archive(self, container_id: str, path: str, timeout: float | None = None):
+        """Get a tar archive of a container path.
+
+        The response must be read until the end before another request is issued from the same thread.
+
+        Parameters
+        ----------
+        container_id: str
+            Container ID.
+        path: str
+            Path inside the container.
+        timeout: float or None
+            Socket timeout in seconds while reading the archive.
+
+        Returns
+        -------
+        http.client.HTTPResponse
+            Streaming response with the uncompressed tar archive as its body.
+        """
+        return self._request("GET", f"/containers/{container_id}/archive", query={"path": str(path)}, timeout=timeout)
+
+class PooledConnection():
+    """Handle to a host connection managed by :class:`SSHConnectionPool`.
+
+    It can be given as :attr:`ChallengeHelper.ssh_conn` in place of a :class:`fabric.Connection`.
+    Every call borrows a channel on the shared transport of the host, so any number of helpers
+    for the same host only pay for one SSH handshake.
+
+    Attributes
+    ----------
+    pool: SSHConnectionPool
+        Pool that owns the connection.
+    host: str
+        Remote host.
+    user: str or None
+        Remote user.
+    port: int or None
+        Remote SSH port.
+    """
+    def __init__(self, pool: "SSHConnectionPool", host: str, user: str | None = None, port: int | None = None):
+        """Constructor.
+
+        Parameters
+        ----------
+        pool: SSHConnectionPool
+            See the :attr:`~PooledConnection.pool` attribute.
+        host: str
+            See the :attr:`~PooledConnection.host` attribute.
+        user: str or None
+            See the :attr:`~PooledConnection.user` attribute.
+        port: int or None
+            See the :attr:`~PooledConnection.port` attribute.
+        """
+        self.pool = pool
+        self.host = host
+        self.user = user
+        self.port = port
+
+    def run(self, command: str, **kwargs):
+        """Run a shell command on the host, see :meth:`fabric.Connection.run`."""
+        with self.pool.acquire(self.host, self.user, self.port) as conn:
+            return conn.run(command, **kwargs)
+
+    def get(self, *args, **kwargs):
+        """Download a file from the host, see :meth:`fabric.Connection.get`."""
+        with self.pool.acquire(self.host, self.user, self.port) as conn:
+            return conn.get(*args, **kwargs)
+
+    def local(self, *args, **kwargs):
+        """Run a shell command on the local machine, see :meth:`fabric.Connection.local`."""
+        with self.pool.acquire(self.host, self.user, self.port) as conn:
+            return conn.local(*args, **kwargs)
+
+    def open_channel(self):
+        """Open a raw session channel that holds one of the host channel slots until released.
+
+        Returns
+        -------
+        paramiko.Channel
+            New session channel.
+        Callable
+            Function that gives the channel slot back to the pool.
+        """
+        stack = ExitStack()
+        conn = stack.enter_context(self.pool.acquire(self.host, self.user, self.port))
+        try:
+            return conn.transport.open_session(), stack.close
+        except BaseException:
+            stack.close()
+            raise
+
+class _PoolEntry():
+    def __init__(self, conn: "fabric.Connection", max_channels: int):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.channels = threading.BoundedSemaphore(max_channels)
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+class SSHConnectionPool():
+    """Pool of SSH connections shared between :class:`ChallengeHelper` instances.
+
+    The pool keeps one authenticated transport per host and multiplexes commands over it as
+    SSH channels. Dropped transports are reconnected on the next use and connections that
+    stay idle longer than :attr:`~SSHConnectionPool.idle_timeout` are closed.
+
+    Attributes
+    ----------
+    max_channels_per_host: int
+        Maximum number of channels open at the same time on one host. Callers wait for a
+        free channel when the limit is reached.
+    idle_timeout: float
+        Seconds after which an unused connection is closed.
+    keepalive: int
+        SSH keepalive interval in seconds, so dead transports are noticed. ``0`` disables it.
+    connection_kwargs: dict
+        Extra keyword arguments for every :class:`fabric.Connection` created by the pool
+        (e.g. ``connect_kwargs`` or ``connect_timeout``).
+    """
+    __default = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, max_channels_per_host: int = 8, idle_timeout: float = 300.0, keepalive: int = 30, **connection_kwargs):
+        """Constructor.
+
+        Parameters
+        ----------
+        max_channels_per_host: int
+            See the :attr:`~SSHConnectionPool.max_channels_per_host` attribute.
+        idle_timeout: float
+            See the :attr:`~SSHConnectionPool.idle_timeout` attribute.
+        keepalive: int
+            See the :attr:`~SSHConnectionPool.keepalive` attribute.
+        **connection_kwargs
+            See the :attr:`~SSHConnectionPool.connection_kwargs` attribute.
+        """
+        self.max_channels_per_host = max_channels_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self.connection_kwargs = connection_kwargs
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """Get the process-wide pool, creating it on first use.
+
+        Returns
+        -------
+        fulgens.SSHConnectionPool
+            Shared pool object.
+        """
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    def connection(self, host: str, user: str | None = None, port: int | None = None):
+        """Get a connection handle for a host.
+
+        Parameters
+        ----------
+        host: str
+            Remote host.
+        user: str or None
+            Remote user.
+        port: int or None
+            Remote SSH port.
+
+        Returns
+        -------
+        fulgens.PooledConnection
+            Connection handle usable as :attr:`ChallengeHelper.ssh_conn`.
+        """
+        return PooledConnection(self, host, user, port)
+
+    @contextmanager
+    def acquire(self, host: str, user: str | None = None, port: int | None = None):
+        """Borrow the connected :class:`fabric.Connection` of a host for one channel.
+
+        Parameters
+        ----------
+        host: str
+            Remote host.
+        user: str or None
+            Remote user.
+        port: int or None
+            Remote SSH port.
+
+        Yields
+        ------
+        fabric.Connection
+            Open connection to the host.
+        """
+        self.evict_idle()
+        key = (host, user, port)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                import fabric
+                conn = fabric.Connection(host, user=user, port=port, **self.connection_kwargs)
+                entry = self.__entries[key] = _PoolEntry(conn, self.max_channels_per_host)
+            entry.in_use += 1
+        try:
+            with entry.channels:
+                with entry.lock:
+                    if not entry.conn.is_connected:
+                        # Drop the stale transport and its cached SFTP session before reconnecting.
+                        entry.conn.close()
+                        entry.conn.open()
+                        if self.keepalive:
+                            entry.conn.transport.set_keepalive(self.keepalive)
+                yield entry.conn
+        finally:
+            with self.__lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def evict_idle(self):
+        """Close connections that have been idle longer than :attr:`~SSHConnectionPool.idle_timeout`."""
+        now = time.monotonic()
+        with self.__lock:
+            idle = [key for key, entry in self.__entries.items() if entry.in_use == 0 and now - entry.last_used > self.idle_timeout]
+            entries = [self.__entries.pop(key) for key in idle]
+        for entry in entries:
+            entry.conn.close()
+
+    def close(self):
+        """Close every pooled connection."""
+        with self.__lock:
+            entries = list(self.__entries.values())
+            self.__entries.clear()
+        for entry in entries:
+            entry.conn.close()
+
+def _open_ssh_channel(conn: "fabric.Connection | PooledConnection"):
+    if isinstance(conn, PooledConnection):
+        return conn.open_channel()
+    conn.open()
+    return conn.transport.open_session(), None
+
+class _Process():
+    def communicate(self):
+        stdout, stderr = bytearray(), bytearray()
+        while not self.eof:
+            out, err = self.read()
+            stdout += out
+            stderr += err
+        return bytes(stdout), bytes(stderr)
+
+class _LocalProcess(_Process):
+    """Local shell command with pipes, used where output has to be consumed while it runs."""
+    def __init__(self, real_cmd: str):
+        self.proc = subprocess.Popen(real_cmd, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.proc.stdout, selectors.EVENT_READ, 1)
+        self.selector.register(self.proc.stderr, selectors.EVENT_READ, 2)
+        self.stdout = self.proc.stdout
+        self.stderr = self.proc.stderr
+
+    @property
+    def eof(self):
+        return not self.selector.get_map()
+
+    def write(self, data: bytes):
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+
+    def close_stdin(self):
+        self.proc.stdin.close()
+
+    def read(self, timeout: float | None = None):
+        stdout, stderr = b"", b""
+        for key, _ in self.selector.select(timeout):
+            data = os.read(key.fileobj.fileno(), 65536)
+            if not data:
+                self.selector.unregister(key.fileobj)
+            elif key.data == 1:
+                stdout = data
+            else:
+                stderr = data
+        return stdout, stderr
+
+    def wait_stdout(self):
+        return bool(self.proc.stdout.peek(1))
+
+    def wait(self, timeout: float | None = None):
+        return self.proc.wait(timeout)
+
+    def kill(self):
+        try:
+            os.killpg(self.proc.pid, 9)
+        except ProcessLookupError:
+            pass
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.kill()
+        for pipe in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            pipe.close()
+        self.selector.close()
+        self.proc.wait()
+
+class _ChannelProcess(_Process):
+    """Remote shell command on a raw SSH channel, with the same interface as :class:`_LocalProcess`."""
+    def __init__(self, conn: "fabric.Connection | PooledConnection", real_cmd: str):
+        self.channel, self.release = _open_ssh_channel(conn)
+        try:
+            self.channel.exec_command(real_cmd)
+            self.stdout = self.channel.makefile("rb")
+            self.stderr = self.channel.makefile_stderr("rb")
+        except BaseException:
+            # Give the pooled slot back, otherwise the host runs out of channels for good.
+            self.channel.close()
+            if self.release is not None:
+                self.release()
+            raise
+
+    @property
+    def eof(self):
+        return (self.channel.eof_received or self.channel.closed) and not self.channel.recv_ready() and not self.channel.recv_stderr_ready()
+
+    def write(self, data: bytes):
+        self.channel.sendall(data)
+
+    def close_stdin(self):
+        self.channel.shutdown_write()
+
+    def read(self, timeout: float | None = None):
+        if not self.channel.closed and not self.channel.recv_ready() and not self.channel.recv_stderr_ready():
+            select.select([self.channel], [], [], timeout)
+        stdout = self.channel.recv(65536) if self.channel.recv_ready() else b""
+        stderr = self.channel.recv_stderr(65536) if self.channel.recv_stderr_ready() else b""
+        return stdout, stderr
+
+    def wait_stdout(self):
+        while not self.channel.recv_ready():
+            if self.channel.exit_status_ready() or self.channel.eof_received:
+                return self.channel.recv_ready()
+            select.select([self.channel], [], [])
+        return True
+
+    def wait(self, timeout: float | None = None):
+        if not self.channel.status_event.wait(timeout):
+            raise subprocess.TimeoutExpired(self.channel, timeout)
+        return self.channel.recv_exit_status()
+
+    def kill(self):
+        self.channel.close()
+
+    def close(self):
+        self.channel.close()
+        if self.release:
+            self.release()
+            self.release = None
+
+class _ProcessArchive():
+    """Tar stream written to the standard output of ``docker cp SRC -``."""
+    def __init__(self, process: "_LocalProcess | _ChannelProcess"):
+        self.process = process
+        self.stream = _CountingReader(process.stdout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
+
+    def finish(self):
+        try:
+            self.stream.read()
+            stderr = self.process.stderr.read()
+            exit_code = self.process.wait()
+        finally:
+            self.process.close()
+        if exit_code != 0:
+            raise IOError(f"failed to copy: {stderr.decode()}")
+
+    def abort(self):
+        self.process.close()
+
+class _ResponseArchive():
+    """Tar stream in the body of a Docker Engine API archive response."""
+    def __init__(self, response: "http.client.HTTPResponse", docker_api: DockerEngineAPI):
+        self.response = response
+        self.stream = _CountingReader(response)
+        self.docker_api = docker_api
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
+
+    def finish(self):
+        # Keep the keep-alive connection usable by reading the rest of the body.
+        self.stream.read()
+
+    def abort(self):
+        self.response.close()
+        self.docker_api._reset()
+
+_FICLONE = 0x40049409
+
+def _reflink_fd(source_fd: int, dest_fd: int):
+    """Make ``dest_fd`` a copy-on-write clone of ``source_fd``, returning ``False`` if the filesystem cannot."""
+    try:
+        import fcntl
+        fcntl.ioctl(dest_fd, _FICLONE, source_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+def _clone_fd(source_fd: int, dest_fd: int):
+    """Copy between file descriptors without going through user space.
+
+    Tries a reflink first, sharing the blocks on filesystems like btrfs and XFS, then
+    :func:`os.copy_file_range`, which copies inside the kernel (or server side on NFS).
+    Returns ``False``, with both files rewound, if neither is available.
+    """
+    if _reflink_fd(source_fd, dest_fd):
+        return True
+    if not hasattr(os, "copy_file_range"):
+        return False
+    remaining = os.fstat(source_fd).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(source_fd, dest_fd, remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError:
+        # Before Linux 5.3 it cannot cross filesystems, and some filesystems do not support it.
+        os.lseek(source_fd, 0, os.SEEK_SET)
+        os.lseek(dest_fd, 0, os.SEEK_SET)
+        os.ftruncate(dest_fd, 0)
+        return False
+    return True
+
+def _clone_file(source: str | pathlib.Path, dest: str | pathlib.Path):
+    """Copy a file's content with :func:`_clone_fd`, falling back to :func:`shutil.copyfile`."""
+    with open(source, "rb") as source_file, open(dest, "wb") as dest_file:
+        if _clone_fd(source_file.fileno(), dest_file.fileno()):
+            return dest
+    copyfile(source, dest)
+    return dest
+
+def _copy_file(source: str | pathlib.Path, dest: str | pathlib.Path):
+    """Drop-in for :func:`shutil.copy2` as the ``copy_function`` of :func:`shutil.move`, using :func:`_clone_file`."""
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(source))
+    _clone_file(source, dest)
+    copystat(source, dest)
+    return dest
+
+def _landing_dir(dest: str | pathlib.Path):
+    """Directory that :func:`shutil.move` places ``dest`` in."""
+    dest = Path(dest).absolute()
+    return dest if dest.is_dir() else dest.parent
+
+class StaleContainerError(IOError):
+    """Raised by a :class:`Backend` when a cached container ID no longer names a running container.
+
+    :class:`ChallengeHelper` then resolves the container IDs again and retries once.
+    """
+
+class ContainerRef():
+    """Service container targeted by a :class:`Backend` container operation.
+
+    Attributes
+    ----------
+    service: str
+        Compose service name.
+    id: str or None
+        Container ID, ``None`` if unknown, in which case the service is resolved by ``docker compose``.
+    compose_path: pathlib.Path
+        Compose file path on the server.
+    """
+    def __init__(self, service: str, id: str | None, compose_path: pathlib.Path):
+        """Constructor.
+
+        Parameters
+        ----------
+        service: str
+            See the :attr:`~ContainerRef.service` attribute.
+        id: str or None
+            See the :attr:`~ContainerRef.id` attribute.
+        compose_path: pathlib.Path
+            See the :attr:`~ContainerRef.compose_path` attribute.
+        """
+        self.service = service
+        self.id = id
+        self.compose_path = compose_path
+
+def _docker_exec_args(container: ContainerRef, env: Dict[str, str] | None = None, interactive: bool = False):
+    """Build the ``docker exec`` arguments running a command inside ``container``, through ``docker compose`` without an ID."""
+    options = [arg for key, value in (env or {}).items() for arg in ("-e", f"{key}={value}")]
+    if container.id is None:
+        return ["docker", "compose", "-f", str(container.compose_path), "exec", "-T", *options, container.service]
+    return ["docker", "exec", *(["-i"] if interactive else []), *options, container.id]
+
+def _docker_shell_args(container: ContainerRef, cmd: str, env: Dict[str, str] | None = None):
+    """Build the arguments running the shell command ``cmd`` inside ``container``."""
+    return [*_docker_exec_args(container, env), "/bin/sh", "-c", cmd]
+
+def _docker_cp_args(container: ContainerRef, source: str | pathlib.Path, dest: str | pathlib.Path):
+    """Build the ``docker cp`` arguments copying ``source`` out of ``container``, ``-`` as ``dest`` streams a tar archive."""
+    if container.id is None:
+        return ["docker", "compose", "-f", str(container.compose_path), "cp", f"{container.service}:{source}", str(dest)]
+    return ["docker", "cp", f"{container.id}:{source}", str(dest)]
+
+def _check_stale(container: ContainerRef, result: tuple):
+    if container.id is not None and result[-1] != 0 and _STALE_CONTAINER_RE.search(result[1]):
+        raise StaleContainerError(f"container of service '{container.service}' is gone: {result[1].decode(errors='replace')}")
+    return result
+
+class Backend():
+    """Transport to the containers of the server that runs the services.
+
+    :class:`ChallengeHelper` makes every container operation through its backend. A backend
+    implements :meth:`~Backend.list_containers`, :meth:`~Backend.container_exec`,
+    :meth:`~Backend.container_spawn` and :meth:`~Backend.open_archive`, like :class:`DockerAPIBackend`;
+    :meth:`~Backend.container_exec_many` runs :meth:`~Backend.container_exec` concurrently unless
+    overridden. Backends that reach the server through a shell and the ``docker`` CLI derive from
+    :class:`ShellBackend` instead.
+
+    Attributes
+    ----------
+    name: str
+        Backend name, used as the ``backend`` label of the operation stats.
+    local: bool
+        Whether the services run on the checker machine, so the local and remote challenge
+        directories are the same.
+    spawns: int
+        Processes started per container operation, reported in the operation stats.
+    stream_fetch: bool
+        Whether :meth:`ChallengeHelper.fetch` always streams the archive from
+        :meth:`~Backend.open_archive`. Only a :class:`ShellBackend` can copy through the server filesystem instead.
+    """
+    name = "backend"
+    local = False
+    spawns = 1
+    stream_fetch = True
+
+    def list_containers(self, compose_path: pathlib.Path, project_name: str, timeout: float | None = None):
+        """Get the IDs of the running containers of a compose project.
+
+        Parameters
+        ----------
+        compose_path: pathlib.Path
+            Compose file path on the server.
+        project_name: str
+            Compose project name.
+        timeout: float or None
+            Maximum seconds to wait for the listing.
+
+        Returns
+        -------
+        dict
+            Mapping of service name to container ID.
+
+        Raises
+        ------
+        IOError
+            If the running containers cannot be listed.
+        """
+        raise NotImplementedError
+
+    def container_exec(self, container: ContainerRef, cmd: str, env: Dict[str, str] | None = None, timeout: float | None = None, on_timeout: Callable | None = None):
+        """Run a shell command inside a container and wait for it.
+
+        Parameters
+        ----------
+        container: ContainerRef
+            Target container.
+        cmd: str
+            Shell command.
+        env: Dict[str, str] or None
+            Extra environment variables of the command.
+        timeout: float or None
+            Maximum seconds to wait for the command. On expiry the command is killed.
+        on_timeout: Callable or None
+            Function called after the command is killed on expiry.
+
+        Returns
+        -------
+        bytes
+            Standard output.
+        bytes
+            Standard error.
+        int
+            exit code
+
+        Raises
+        ------
+        StaleContainerError
+            If the container ID is no longer valid.
+        CommandTimeout
+            If the command does not finish in time.
+        """
+        raise NotImplementedError
+
+    def container_exec_many(self, calls: Dict[str, tuple], env: Dict[str, str] | None = None, timeout: float | None = None, on_timeout: Callable | None = None):
+        """Run one shell command in each of several containers concurrently.
+
+        The default implementation calls :meth:`~Backend.container_exec` from one thread per command.
+
+        Parameters
+        ----------
+        calls: Dict[str, Tuple[ContainerRef, str]]
+            Target container and shell command, keyed by an arbitrary name.
+        env: Dict[str, str] or None
+            Extra environment variables of every command.
+        timeout: float or None
+            Maximum seconds for the whole batch. On expiry the batch is killed.
+        on_timeout: Callable or None
+            Function called after the batch is killed on expiry.
+
+        Returns
+        -------
+        dict
+            Standard output, standard error and exit code keyed like ``calls``, or a
+            :class:`StaleContainerError` for containers whose ID is no longer valid.
+
+        Raises
+        ------
+        IOError
+            If the batch cannot be run.
+        CommandTimeout
+            If the batch does not finish in time.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max(len(calls), 1)) as executor:
+            futures = {name: executor.submit(self.container_exec, container, cmd, env, timeout) for name, (container, cmd) in calls.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except StaleContainerError as ex:
+                results[name] = ex
+            except CommandTimeout:
+                if on_timeout:
+                    on_timeout()
+                raise
+        return results
+
+    def container_spawn(self, container: ContainerRef, cmd: str | None = None, env: Dict[str, str] | None = None):
+        """Start a shell command inside a container, with its output readable while it runs.
+
+        Parameters
+        ----------
+        container: ContainerRef
+            Target container.
+        cmd: str or None
+            Shell command, ``None`` for a shell reading commands from the standard input.
+        env: Dict[str, str] or None
+            Extra environment variables of the command.
+
+        Returns
+        -------
+        process
+            Running command, with the interface of the process objects used by :class:`ContainerSession`.
+        """
+        raise NotImplementedError
+
+    def open_archive(self, container: ContainerRef, path: str | pathlib.Path, watchdog: _Watchdog):
+        """Start streaming the tar archive of a container path, as ``docker cp SRC -`` does.
+
+        Parameters
+        ----------
+        container: ContainerRef
+            Source container.
+        path: str or pathlib.Path
+            Container path.
+        watchdog: _Watchdog
+            Timeout of the copy. Whatever stops the copy has to be registered with its
+            ``on_expire`` method, its ``timeout`` attribute holds the seconds left.
+
+        Returns
+        -------
+        archive
+            Context manager with the tar stream as its ``stream`` attribute, ``finish()`` to
+            check the copy once the stream was read and ``abort()`` to stop it early.
+
+        Raises
+        ------
+        StaleContainerError
+            If the container ID is no longer valid.
+        IOError
+            If the path cannot be copied.
+        """
+        raise NotImplementedError
+
+class ShellBackend(Backend):
+    """Backend running the ``docker`` CLI through a shell on the server.
+
+    The container operations are ``docker`` invocations run with :meth:`~ShellBackend.spawn` and
+    :meth:`~ShellBackend.exec`, and fetched files are copied to the server with ``docker cp`` before
+    :meth:`~ShellBackend.copy_out` transfers them. Subclass it to plug another shell transport in:
+    :meth:`~ShellBackend.spawn`, :meth:`~ShellBackend.copy_out` and :meth:`~ShellBackend.stat` have to
+    be implemented, the other methods are derived from them but can be overridden with faster paths.
+    """
+    stream_fetch = False
+
+    def spawn(self, cmd: str):
+        """Start a shell command on the server, with its output readable while it runs.
+
+        Parameters
+        ----------
+        cmd: str
+            Shell command.
+
+        Returns
+        -------
+        process
+            Running command, with the interface of the process objects used by :class:`ContainerSession`.
+        """
+        raise NotImplementedError
+
+    def exec(self, cmd: str, timeout: float | None = None, on_timeout: Callable | None = None):
+        """Run a shell command on the server and wait for it.
+
+        Parameters
+        ----------
+        cmd: str
+            Shell command.
+        timeout: float or None
+            Maximum seconds to wait for the command. On expiry the command is killed.
+        on_timeout: Callable or None
+            Function called after the command is killed on expiry.
+
+        Returns
+        -------
+        bytes
+            Standard output.
+        bytes
+            Standard error.
+        int
+            exit code
+
+        Raises
+        ------
+        CommandTimeout
+            If the command does not finish in time.
+        """
+        process = self.spawn(cmd)
+        try:
+            with _Watchdog(timeout) as watchdog:
+                watchdog.on_expire(process.kill)
+                if on_timeout:
+                    watchdog.on_expire(on_timeout)
+                stdout, stderr = process.communicate()
+                return stdout, stderr, process.wait()
+        finally:
+            process.close()
+
+    def copy_out(self, source: str | pathlib.Path, dest: str | pathlib.Path, is_dir: bool | None = None):
+        """Transfer a file or folder from the server to the local filesystem.
+
+        ``source`` is a temporary copy made by the helper and may be consumed by the transfer.
+        Like :func:`shutil.move`, if ``dest`` is an existing directory the source is placed inside it.
+
+        Parameters
+        ----------
+        source: str or pathlib.Path
+            Server path.
+        dest: str or pathlib.Path
+            Local filesystem path.
+        is_dir: bool or None
+            Whether ``source`` is a folder, if already known.
+
+        Returns
+        -------
+        int
+            Bytes transferred.
+        """
+        raise NotImplementedError
+
+    def stat(self, path: str | pathlib.Path):
+        """Get the status of a server path.
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            Server path.
+
+        Returns
+        -------
+        os.stat_result
+            Path status. Only ``st_mode``, ``st_size`` and ``st_mtime`` are guaranteed to be filled.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the path does not exist.
+        """
+        raise NotImplementedError
+
+    def is_dir(self, path: str | pathlib.Path):
+        """Check whether a server path is a folder.
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            Server path.
+
+        Returns
+        -------
+        bool
+            Whether the path exists and is a folder.
+        """
+        try:
+            return S_ISDIR(self.stat(path).st_mode)
+        except FileNotFoundError:
+            return False
+
+    def list_containers(self, compose_path: pathlib.Path, project_name: str, timeout: float | None = None):
+        stdout, stderr, exit_code = self.exec(f"docker compose -f {compose_path} ps --format json", timeout)
+        if exit_code != 0:
+            raise IOError(f"failed to list containers: {stderr.decode()}")
+        return _parse_compose_ps(stdout)
+
+    def container_exec(self, container: ContainerRef, cmd: str, env: Dict[str, str] | None = None, timeout: float | None = None, on_timeout: Callable | None = None):
+        return _check_stale(container, self.exec(shlex.join(_docker_shell_args(container, cmd, env)), timeout, on_timeout))
+
+    def container_exec_many(self, calls: Dict[str, tuple], env: Dict[str, str] | None = None, timeout: float | None = None, on_timeout: Callable | None = None):
+        # Ship every invocation to the server as one shell script, so the whole batch takes a single round trip.
+        names = list(calls)
+        script = ["d=$(mktemp -d) || exit 1", "trap 'rm -rf \"$d\"' EXIT"]
+        for i, name in enumerate(names):
+            container, cmd = calls[name]
+            script.append(f"({shlex.join(_docker_shell_args(container, cmd, env))} >\"$d/{i}.out\" 2>\"$d/{i}.err\" </dev/null; echo $? >\"$d/{i}.rc\") &")
+        script.append("wait")
+        script.append(f"for i in {' '.join(map(str, range(len(names))))}; do")
+        script.append("  echo $(cat \"$d/$i.rc\") $(wc -c <\"$d/$i.out\") $(wc -c <\"$d/$i.err\"); cat \"$d/$i.out\" \"$d/$i.err\"")
+        script.append("done")
+        stdout, stderr, exit_code = self.exec(f"sh -c {shlex.quote(chr(10).join(script))}", timeout, on_timeout)
+        if exit_code != 0:
+            raise IOError(f"failed to run batch: {stderr.decode()}")
+
+        results = {}
+        buf = io.BytesIO(stdout)
+        for name in names:
+            exit_code, out_len, err_len = map(int, buf.readline().split())
+            result = (buf.read(out_len), buf.read(err_len), exit_code)
+            try:
+                results[name] = _check_stale(calls[name][0], result)
+            except StaleContainerError as ex:
+                results[name] = ex
+        return results
+
+    def container_spawn(self, container: ContainerRef, cmd: str | None = None, env: Dict[str, str] | None = None):
+        if cmd is None:
+            return self.spawn(shlex.join([*_docker_exec_args(container, env, interactive=True), "/bin/sh"]))
+        return self.spawn(shlex.join(_docker_shell_args(container, cmd, env)))
+
+    def container_copy(self, container: ContainerRef, source: str | pathlib.Path, dest: str | pathlib.Path):
+        """Copy a file or folder from a container to the server, to be transferred with :meth:`~ShellBackend.copy_out`.
+
+        Parameters
+        ----------
+        container: ContainerRef
+            Source container.
+        source: str or pathlib.Path
+            Container path.
+        dest: str or pathlib.Path
+            Server path.
+
+        Returns
+        -------
+        bytes
+            Standard output.
+        bytes
+            Standard error.
+        int
+            exit code
+
+        Raises
+        ------
+        StaleContainerError
+            If the container ID is no longer valid.
+        """
+        return _check_stale(container, self.exec(shlex.join(_docker_cp_args(container, source, dest))))
+
+    def open_archive(self, container: ContainerRef, path: str | pathlib.Path, watchdog: _Watchdog):
+        process = self.spawn(shlex.join(_docker_cp_args(container, path, "-")))
+        watchdog.on_expire(process.kill)
+        try:
+            if process.wait_stdout():
+                return _ProcessArchive(process)
+            stderr = process.stderr.read()
+        except BaseException:
+            process.close()
+            raise
+        process.close()
+        _check_stale(container, (b"", stderr, 1))
+        raise IOError(f"failed to copy: {stderr.decode()}")
+
+def _stat_result(mode: int, size: int, mtime: float = 0):
+    return os.stat_result((mode, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+
+class LocalBackend(ShellBackend):
+    """Run everything on the checker machine, for services hosted next to the checker."""
+    name = "local"
+    local = True
+
+    def spawn(self, cmd: str):
+        return _LocalProcess(cmd)
+
+    def exec(self, cmd: str, timeout: float | None = None, on_timeout: Callable | None = None):
+        if timeout is not None:
+            return super().exec(cmd, timeout, on_timeout)
+        cmd_res = subprocess.run(cmd, capture_output=True, shell=True)
+        return cmd_res.stdout, cmd_res.stderr, cmd_res.returncode
+
+    def copy_out(self, source: str | pathlib.Path, dest: str | pathlib.Path, is_dir: bool | None = None):
+        size = _path_size(source)
+        move(source, dest, copy_function=_copy_file)
+        return size
+
+    def stat(self, path: str | pathlib.Path):
+        return os.stat(path)
+
+    def is_dir(self, path: str | pathlib.Path):
+        return Path(path).is_dir()
+
+class SSHBackend(ShellBackend):
+    """Run everything on a remote server through a fabric SSH connection.
+
+    Commands run on raw session channels and their output is collected as bytes, skipping the
+    text decoding of :meth:`fabric.Connection.run`, so binary output comes back unchanged.
+
+    Attributes
+    ----------
+    conn: fabric.Connection or PooledConnection
+        SSH connection to the server.
+    """
+    name = "ssh"
+
+    def __init__(self, conn: "fabric.Connection | PooledConnection"):
+        """Constructor.
+
+        Parameters
+        ----------
+        conn: fabric.Connection or PooledConnection
+            See the :attr:`~SSHBackend.conn` attribute.
+        """
+        self.conn = conn
+
+    def spawn(self, cmd: str):
+        return _ChannelProcess(self.conn, cmd)
+
+    def copy_out(self, source: str | pathlib.Path, dest: str | pathlib.Path, is_dir: bool | None = None):
+        if is_dir is None:
+            is_dir = self.is_dir(source)
+        if not is_dir:
+            self.conn.get(remote=str(source), local=str(dest))
+            return _path_size(dest)
+        import gzip
+
+        parent, name = os.path.split(str(source).rstrip("/"))
+        folder_tarname = f"/tmp/{token_hex(8)}.tar.gz"
+        # Download next to dest, so that the extracted folder is moved in place by a rename.
+        scratch_dir = _landing_dir(dest).joinpath(f".fulgens-{token_hex(8)}")
+        scratch_dir.mkdir()
+        try:
+            local_tarname = scratch_dir.joinpath("folder.tar.gz")
+            try:
+                self.conn.run(f"tar -czf {shlex.quote(folder_tarname)} -C {shlex.quote(parent or '/')} {shlex.quote(name)}", hide=True, in_stream=False)
+                self.conn.get(remote=folder_tarname, local=str(local_tarname))
+            finally:
+                self.conn.run(f"rm -rf {shlex.quote(folder_tarname)} {shlex.quote(str(source))}", hide=True, warn=True, in_stream=False)
+            size = _path_size(local_tarname)
+            with gzip.open(local_tarname) as fileobj:
+                _extract_tar_stream(fileobj, source, dest)
+        finally:
+            rmtree(scratch_dir, ignore_errors=True)
+        return size
+
+    def stat(self, path: str | pathlib.Path):
+        stdout, stderr, exit_code = self.exec(f"stat -L -c '%f %s %Y' {shlex.quote(str(path))}")
+        if exit_code != 0:
+            raise FileNotFoundError(f"cannot stat '{path}': {stderr.decode(errors='replace')}")
+        mode, size, mtime = stdout.split()
+        return _stat_result(int(mode, 16), int(size), int(mtime))
+
+    def is_dir(self, path: str | pathlib.Path):
+        return self.exec(f"test -d {shlex.quote(str(path))}")[2] == 0
+
+class DockerAPIBackend(Backend):
+    """Run the container operations through the Docker Engine API instead of the ``docker`` CLI.
+
+    Commands are exec'd and files are copied over the keep-alive connection of a
+    :class:`DockerEngineAPI` client, so no process is started per call. Sessions and streamed
+    commands get an attached exec on a connection of their own. There is no server shell, so
+    :meth:`ChallengeHelper.fetch` always streams.
+
+    .. code-block:: python
+
+        backend = fulgens.DockerAPIBackend(fulgens.DockerEngineAPI("/tmp/team1.sock"))
+        helper = fulgens.ChallengeHelper(addresses, secret, challenge_dir, backend=backend)
+
+    Attributes
+    ----------
+    docker_api: DockerEngineAPI
+        Docker Engine API client.
+    """
+    name = "docker_api"
+    spawns = 0
+
+    def __init__(self, docker_api: DockerEngineAPI):
+        """Constructor.
+
+        Parameters
+        ----------
+        docker_api: DockerEngineAPI
+            See the :attr:`~DockerAPIBackend.docker_api` attribute.
+        """
+        self.docker_api = docker_api
+
+    def list_containers(self, compose_path: pathlib.Path, project_name: str, timeout: float | None = None):
+        return self.docker_api.container_ids(project_name)
+
+    def __container_id(self, container: ContainerRef):
+        if container.id is None:
+            raise ValueError(f"no running container for service '{container.service}'.")
+        return container.id
+
+    def __api_call(self, container: ContainerRef, call: Callable):
+        try:
+            return call(self.__container_id(container))
+        except DockerAPIError as ex:
+            # A missing path is a 404 too, only a missing container means the ID is stale.
+            if ex.status == 409 or (ex.status == 404 and "no such container" in str(ex).lower()):
+                raise StaleContainerError(f"container of service '{container.service}' is gone: {ex}") from ex
+            raise
+
+    def container_exec(self, container: ContainerRef, cmd: str, env: Dict[str, str] | None = None, timeout: float | None = None, on_timeout: Callable | None = None):
+        env_list = [f"{key}={value}" for key, value in (env or {}).items()]
+        try:
+            return self.__api_call(container, lambda container_id: self.docker_api.exec(container_id, ["/bin/sh", "-c", cmd], env=env_list, timeout=timeout))
+        except TimeoutError as ex:
+            if on_timeout:
+                on_timeout()
+            raise CommandTimeout(timeout) from ex
+
+    def container_spawn(self, container: ContainerRef, cmd: str | None = None, env: Dict[str, str] | None = None):
+        env_list = [f"{key}={value}" for key, value in (env or {}).items()]
+        args = ["/bin/sh"] if cmd is None else ["/bin/sh", "-c", cmd]
+        # Like docker exec without -i, a given command gets no standard input.
+        exec_id, sock = self.__api_call(container, lambda container_id: self.docker_api.exec_attach(container_id, args, env_list, stdin=cmd is None))
+        return _ExecProcess(self.docker_api, exec_id, sock)
+
+    def open_archive(self, container: ContainerRef, path: str | pathlib.Path, watchdog: _Watchdog):
+        response = self.__api_call(container, lambda container_id: self.docker_api.get_archive(container_id, path, watchdog.timeout))
+        return _ResponseArchive(response, self.docker_api)
+
+class _BufferedProcess(_Process):
+    """Finished command with its whole output in memory, returned by :meth:`FakeBackend.spawn`."""
+    def __init__(self, stdout: bytes, stderr: bytes, exit_code: int):
+        self.stdout = io.BytesIO(stdout)
+        self.stderr = io.BytesIO(stderr)
+        self.exit_code = exit_code
+        self.eof = False
+
+    def write(self, data: bytes):
+        pass
+
+    def close_stdin(self):
+        pass
+
+    def read(self, timeout: float | None = None):
+        self.eof = True
+        return self.stdout.read(), self.stderr.read()
+
+    def wait_stdout(self):
+        return self.stdout.tell() < len(self.stdout.getbuffer())
+
+    def wait(self, timeout: float | None = None):
+        return self.exit_code
+
+    def kill(self):
+        pass
+
+    def close(self):
+        pass
+
+class _ExecProcess(_Process):
+    """Attached Docker Engine API exec, with the same interface as :class:`_LocalProcess`."""
+    def __init__(self, docker_api: DockerEngineAPI, exec_id: str, sock: socket.socket):
+        self.docker_api = docker_api
+        self.exec_id = exec_id
+        self.sock = sock
+        self.eof = False
+        self.__buffer = bytearray()
+        self.__stream = 1
+        self.__left = 0
+
+    def write(self, data: bytes):
+        self.sock.sendall(data)
+
+    def close_stdin(self):
+        self.sock.shutdown(socket.SHUT_WR)
+
+    def read(self, timeout: float | None = None):
+        # Wait for more data unless a frame payload or a whole frame header is buffered.
+        if not self.__buffer or (not self.__left and len(self.__buffer) < 8):
+            if not select.select([self.sock], [], [], timeout)[0]:
+                return b"", b""
+            data = self.sock.recv(65536)
+            if not data:
+                self.eof = True
+                return b"", b""
+            self.__buffer += data
+        stdout, stderr = bytearray(), bytearray()
+        while self.__buffer:
+            if not self.__left:
+                if len(self.__buffer) < 8:
+                    break
+                self.__stream, self.__left = struct.unpack(">BxxxI", self.__buffer[:8])
+                del self.__buffer[:8]
+                continue
+            chunk = self.__buffer[:self.__left]
+            del self.__buffer[:self.__left]
+            self.__left -= len(chunk)
+            (stderr if self.__stream == 2 else stdout).extend(chunk)
+        return bytes(stdout), bytes(stderr)
+
+    def wait(self, timeout: float | None = None):
+        # The exit code is only known to the engine, which may need a moment after the stream ended.
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self.docker_api.exec_inspect(self.exec_id)
+            if not state["Running"] and state["ExitCode"] is not None:
+                return state["ExitCode"]
+            if end is not None and time.monotonic() >= end:
+                raise subprocess.TimeoutExpired(self.exec_id, timeout)
+            time.sleep(0.01)
+
+    def kill(self):
+        # Like closing an SSH channel, detaching leaves the command running inside the container.
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.kill()
+        self.sock.close()
+
+class FakeBackend(ShellBackend):
+    """In-memory backend for testing checkers without a server.
+
+    Commands are answered by the handlers registered with :meth:`~FakeBackend.add_command`,
+    and file copies, streamed or not, are served from :attr:`~FakeBackend.files`.
+
+    Examples
+    --------
+    >>> backend = FakeBackend({"/etc/hostname": b"web\\n"})
+    >>> backend.add_command(r"compose .* ps", (b"", b"", 0))
+    >>> backend.add_command(r" exec .*web ", (b"hello\\n", b"", 0))
+    >>> helper = ChallengeHelper(["127.0.0.1"], "secret", Path("chall"), backend=backend)
+    >>> helper.run("web", "echo hello")
+    (b'hello\\n', b'', 0)
+    >>> helper.read("web", "/etc/hostname")
+    b'web\\n'
+
+    Attributes
+    ----------
+    files: Dict[str, bytes]
+        Files keyed by absolute path, seen both on the server and inside every container.
+        Folders are implied by the file paths.
+    commands: List[str]
+        Every command run so far, in order.
+    default_result: Tuple[bytes, bytes, int]
+        Result of commands without a matching handler.
+    """
+    name = "fake"
+
+    def __init__(self, files: Dict[str, bytes] | None = None, default_result: tuple = (b"", b"", 0)):
+        """Constructor.
+
+        Parameters
+        ----------
+        files: Dict[str, bytes] or None
+            See the :attr:`~FakeBackend.files` attribute.
+        default_result: Tuple[bytes, bytes, int]
+            See the :attr:`~FakeBackend.default_result` attribute.
+        """
+        self.files = dict(files or {})
+        self.commands = []
+        self.default_result = default_result
+        self.__handlers = []
+        self.__lock = threading.Lock()
+
+    def add_command(self, pattern: str, result: "tuple | Callable[[FakeBackend, str], tuple]"):
+        """Answer the commands matching a pattern. Later handlers take precedence.
+
+        Parameters
+        ----------
+        pattern: str
+            Regular expression searched in the command.
+        result: Tuple[bytes, bytes, int] or Callable[[FakeBackend, str], Tuple[bytes, bytes, int]]
+            Standard output, standard error and exit code, or a function of the backend and the
+            command returning them. The function may also change :attr:`~FakeBackend.files`.
+        """
+        with self.__lock:
+            self.__handlers.append((re.compile(pattern), result))
+
+    def spawn(self, cmd: str):
+        with self.__lock:
+            self.commands.append(cmd)
+            handlers = list(self.__handlers)
+        for pattern, result in reversed(handlers):
+            if pattern.search(cmd):
+                break
+        else:
+            result = self.default_result
+        if callable(result):
+            result = result(self, cmd)
+        return _BufferedProcess(*result)
+
+    def copy_out(self, source: str | pathlib.Path, dest: str | pathlib.Path, is_dir: bool | None = None):
+        source = str(source).rstrip("/")
+        dest = Path(dest)
+        if dest.is_dir():
+            dest = dest.joinpath(os.path.basename(source))
+        copied = self.__take(source, pop=True)
+        if not copied:
+            raise FileNotFoundError(f"'{source}' cannot be found.")
+        for path, data in copied.items():
+            local_path = dest.joinpath(path[len(source) + 1:]) if path != source else dest
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            local_path.write_bytes(data)
+        return sum(map(len, copied.values()))
+
+    def __take(self, source: str, pop: bool):
+        with self.__lock:
+            if source in self.files:
+                names = [source]
+            else:
+                names = [path for path in self.files if path.startswith(source + "/")]
+            return {path: self.files.pop(path) if pop else self.files[path] for path in names}
+
+    def container_copy(self, container: ContainerRef, source: str | pathlib.Path, dest: str | pathlib.Path):
+        result = super().container_copy(container, source, dest)
+        if result[-1] != 0:
+            return result
+        source, dest = str(source).rstrip("/"), str(dest).rstrip("/")
+        copied = self.__take(source, pop=False)
+        if not copied:
+            return b"", f"Error: No such container:path: {container.service}:{source}\n".encode(), 1
+        with self.__lock:
+            for path, data in copied.items():
+                self.files[dest + path[len(source):]] = data
+        return result
+
+    def open_archive(self, container: ContainerRef, path: str | pathlib.Path, watchdog: _Watchdog):
+        with self.__lock:
+            self.commands.append(f"docker cp {container.id or container.service}:{shlex.quote(str(path))} -")
+        source = str(path).rstrip("/")
+        copied = self.__take(source, pop=False)
+        if not copied:
+            raise IOError(f"failed to copy: '{source}' cannot be found.")
+        # Member names start with the basename of the source, as with docker cp.
+        name = os.path.basename(source)
+        members = {name + path[len(source):]: data for path, data in copied.items()}
+        dirs = {str(parent) for member in members for parent in Path(member).parents if str(parent) != "."}
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for dir_name in sorted(dirs):
+                info = tarfile.TarInfo(dir_name)
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                tar.addfile(info)
+            for member, data in sorted(members.items()):
+                info = tarfile.TarInfo(member)
+                info.size = len(data)
+                info.mode = 0o644
+                tar.addfile(info, io.BytesIO(data))
+        return _ProcessArchive(_BufferedProcess(buf.getvalue(), b"", 0))
+
+    def stat(self, path: str | pathlib.Path):
+        path = str(path).rstrip("/") or "/"
+        with self.__lock:
+            if path in self.files:
+                return _stat_result(S_IFREG | 0o644, len(self.files[path]))
+            if any(name.startswith(path.rstrip("/") + "/") for name in self.files):
+                return _stat_result(S_IFDIR | 0o755, 0)
+        raise FileNotFoundError(f"'{path}' cannot be found.")
+
+class ContainerFile(io.RawIOBase):
+    """Read-only stream of a regular file inside a service container.
+
+    Returned (buffered) by :meth:`ChallengeHelper.open`. Closing it before the end of the file
+    stops the underlying copy.
+
+    Attributes
+    ----------
+    name: str
+        File path inside the container.
+    size: int
+        File size in bytes.
+    """
+    def __init__(self, name: str, archive: "_ProcessArchive | _ResponseArchive", max_size: int | None = None, watchdog: _Watchdog | None = None):
+        """Constructor.
+
+        Parameters
+        ----------
+        name: str
+            See the :attr:`~ContainerFile.name` attribute.
+        archive: _ProcessArchive or _ResponseArchive
+            Tar stream of the file.
+        max_size: int or None
+            Largest file size accepted, in bytes.
+        watchdog: _Watchdog or None
+            Watchdog that stops the copy when the timeout expires.
+
+        Raises
+        ------
+        IOError
+            If the path is not a regular file or is larger than ``max_size``.
+        """
+        super().__init__()
+        self.name = name
+        self.__archive = archive
+        self.__watchdog = watchdog or _Watchdog(None)
+        try:
+            self.__tar = tarfile.open(fileobj=archive.stream, mode="r|")
+            member = self.__tar.next()
+            if member is None or not member.isfile():
+                raise IOError(f"'{name}' is not a regular file.")
+            if max_size is not None and member.size > max_size:
+                raise IOError(f"'{name}' is {member.size} bytes, larger than the {max_size} bytes limit.")
+            self.size = member.size
+            self.__remaining = member.size
+            self.__file = self.__tar.extractfile(member)
+        except BaseException as ex:
+            self.__watchdog.cancel()
+            archive.abort()
+            if self.__watchdog.expired:
+                raise CommandTimeout(self.__watchdog.timeout) from ex
+            raise
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            data = self.__file.read(min(len(buffer), self.__remaining))
+        except Exception:
+            self.__watchdog.check()
+            raise
+        self.__watchdog.check()
+        buffer[:len(data)] = data
+        self.__remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.__watchdog.cancel()
+            try:
+                if self.__remaining == 0 and not self.__watchdog.expired:
+                    self.__archive.finish()
+                else:
+                    self.__archive.abort()
+            finally:
+                super().close()
+
+class StepResult():
+    """Result of one step of :meth:`ChallengeHelper.run_steps`.
+
+    It unpacks like the return value of :meth:`ChallengeHelper.run`:
+    ``stdout, stderr, exit_code = step``.
+
+    Attributes
+    ----------
+    cmd: str
+        Command of the step.
+    stdout: bytes
+        Standard output.
+    stderr: bytes
+        Standard error.
+    exit_code: int
+        Exit code.
+    """
+    def __init__(self, cmd: str, stdout: bytes, stderr: bytes, exit_code: int):
+        """Constructor.
+
+        Parameters
+        ----------
+        cmd: str
+            See the :attr:`~StepResult.cmd` attribute.
+        stdout: bytes
+            See the :attr:`~StepResult.stdout` attribute.
+        stderr: bytes
+            See the :attr:`~StepResult.stderr` attribute.
+        exit_code: int
+            See the :attr:`~StepResult.exit_code` attribute.
+        """
+        self.cmd = cmd
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+
+    def __iter__(self):
+        return iter((self.stdout, self.stderr, self.exit_code))
+
+    def is_ok(self):
+        """Check if the step exited with code ``0`` or not.
+
+        Returns
+        -------
+        bool
+            Whether the step succeeded or not.
+        """
+        return self.exit_code == 0
+
+class ContainerSession():
+    """Long-lived shell inside a service container.
+
+    Commands are written to one ``docker exec -i ... /bin/sh`` process and their output is
+    delimited with random sentinel markers, so every command after the first one only costs
+    a subshell fork instead of a new ``docker exec``. Each command runs in its own subshell
+    with its standard input closed, therefore ``exit`` or a syntax error only ends that command.
+
+    Use it as a context manager, or call :meth:`~ContainerSession.close` when done.
+
+    Attributes
+    ----------
+    service_name: str
+        Service name.
+    """
+    def __init__(self, service_name: str, process: "_LocalProcess | _ChannelProcess", limit_timeout: Callable | None = None, on_timeout: Callable | None = None):
+        """Constructor.
+
+        Parameters
+        ----------
+        service_name: str
+            See the :attr:`~ContainerSession.service_name` attribute.
+        process: _LocalProcess or _ChannelProcess
+            Running ``/bin/sh`` process inside the container.
+        limit_timeout: Callable or None
+            Function that shortens a command timeout to the deadline of the owning helper.
+        on_timeout: Callable or None
+            Function that kills the session processes inside the container.
+        """
+        self.service_name = service_name
+        self.__process = process
+        self.__limit_timeout = limit_timeout or (lambda timeout: timeout)
+        self.__on_timeout = on_timeout
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, cmd: List[str] | str, timeout: float | None = None):
+        """Run shell commands inside the session.
+
+        Parameters
+        ----------
+        cmd: List[str] or str
+            Command to be executed.
+        timeout: float or None
+            Maximum seconds to wait for the command, also bounded by :meth:`ChallengeHelper.deadline`.
+            The session is closed when it expires.
+
+        Returns
+        -------
+        bytes
+            Standard output.
+        bytes
+            Standard error.
+        int
+            exit code
+
+        Raises
+        ------
+        IOError
+            If the session shell is gone.
+        CommandTimeout
+            If the command does not finish in time.
+        """
+        if not isinstance(cmd, str):
+            cmd = " ; ".join(cmd)
+        token = token_hex(8)
+        timeout = self.__limit_timeout(timeout)
+        with self.__lock:
+            if self.__process is None:
+                raise IOError("session is closed.")
+            self.__process.write(_frame_command(cmd, token).encode() + b"\n")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            stdout, stderr = bytearray(), bytearray()
+            while True:
+                frames = _split_frames(stdout, stderr, token)
+                if frames:
+                    out, err, exit_code = frames[0]
+                    return bytes(out), bytes(err), exit_code
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.close()
+                    if self.__on_timeout:
+                        self.__on_timeout()
+                    raise CommandTimeout(timeout)
+                if self.__process.eof:
+                    self.close()
+                    raise IOError("session shell exited.")
+                out, err = self.__process.read(remaining)
+                stdout += out
+                stderr += err
+
+    def close(self):
+        """Terminate the session shell."""
+        if self.__process is not None:
+            process, self.__process = self.__process, None
+            try:
+                process.close_stdin()
+            except OSError:
+                pass
+            process.close()
+
+class ContainerStream():
+    """Output of a command running inside a service container, available while it runs.
+
+    Returned by :meth:`ChallengeHelper.stream`. Iterating over it yields standard output chunks,
+    or lines, as soon as they arrive. Closing it before the command ends kills the command, so a
+    check can stop reading as soon as it saw what it was looking for.
+
+    Use it as a context manager, or call :meth:`~ContainerStream.close` when done.
+
+    Attributes
+    ----------
+    service_name: str
+        Service name.
+    stderr: bytes
+        Standard error received so far.
+    exit_code: int or None
+        Exit code, ``None`` until the output has been read until the end.
+    """
+    def __init__(self, service_name: str, process: "_LocalProcess | _ChannelProcess", lines: bool = False, timeout: float | None = None, on_close: Callable | None = None):
+        """Constructor.
+
+        Parameters
+        ----------
+        service_name: str
+            See the :attr:`~ContainerStream.service_name` attribute.
+        process: _LocalProcess or _ChannelProcess
+            Running command.
+        lines: bool
+            Whether to yield whole lines instead of chunks.
+        timeout: float or None
+            Maximum seconds until the command ends.
+        on_close: Callable or None
+            Function that kills the command processes inside the container.
+        """
+        self.service_name = service_name
+        self.stderr = b""
+        self.exit_code = None
+        self.__process = process
+        self.__lines = lines
+        self.__timeout = timeout
+        self.__deadline = None if timeout is None else time.monotonic() + timeout
+        self.__on_close = on_close
+        self.__buffer = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            if self.__lines and b"\n" in self.__buffer:
+                line, _, self.__buffer = self.__buffer.partition(b"\n")
+                return line + b"\n"
+            if self.__process is None:
+                raise StopIteration
+            if self.__process.eof:
+                if self.__buffer:
+                    line, self.__buffer = self.__buffer, b""
+                    return line
+                self.exit_code = self.__process.wait()
+                self.__process.close()
+                self.__process = None
+                raise StopIteration
+            remaining = None if self.__deadline is None else self.__deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self.close()
+                raise CommandTimeout(self.__timeout)
+            out, err = self.__process.read(remaining)
+            self.stderr += err
+            if self.__lines:
+                self.__buffer += out
+            elif out:
+                return out
+
+    def close(self):
+        """Stop reading, killing the command if it is still running."""
+        if self.__process is not None:
+            process, self.__process = self.__process, None
+            process.close()
+            if self.__on_close:
+                self.__on_close()
+
+def _replace_path(source: pathlib.Path, dest: pathlib.Path):
+    """Move ``source`` over ``dest``, whether either is a file or a folder.
+
+    A folder in the way is renamed aside first and removed once ``source`` is in place, so
+    ``dest`` ends up with exactly the content of ``source``.
+    """
+    if not dest.is_symlink() and not dest.exists():
+        os.rename(source, dest)
+        return
+    if not source.is_dir() and (dest.is_symlink() or not dest.is_dir()):
+        os.replace(source, dest)
+        return
+    aside = dest.with_name(f".{dest.name}.{token_hex(4)}")
+    os.rename(dest, aside)
+    try:
+        os.rename(source, dest)
+    except BaseException:
+        os.rename(aside, dest)
+        raise
+    if aside.is_dir() and not aside.is_symlink():
+        rmtree(aside, ignore_errors=True)
+    else:
+        aside.unlink()
+
+class FetchCache():
+    """Content-addressed store of fetched files, shared by helpers to skip unchanged transfers.
+
+    Each file is stored once under ``objects/`` named after its sha256 digest, and fetched
+    files are reflinks (copy-on-write clones) of the stored copy, or plain copies on filesystems
+    without reflinks, so writing to a fetched file never changes what later fetches get. Once
+    the total size exceeds :attr:`~FetchCache.max_size`, the least recently used files that no
+    fetched file links to anymore are removed.
+
+    Enable it by setting :attr:`ChallengeHelper.fetch_cache`.
+
+    Attributes
+    ----------
+    root: pathlib.Path
+        Cache directory.
+    max_size: int
+        Maximum total size in bytes of the stored files.
+    hardlink: bool
+        Whether fetched files are hardlinks to the stored copy instead, which saves space and time
+        on any filesystem. The stored copies are made read-only, but that does not stop root, so
+        a write through one fetched file changes the stored copy and every file linked to it.
+        Only enable it when nothing ever writes to the fetched files.
+    reflink: bool
+        Whether the filesystem of :attr:`~FetchCache.root` supports reflinks, probed on creation.
+    size: int
+        Current total size in bytes of the stored files.
+    """
+    def __init__(self, root: str | pathlib.Path, max_size: int = 1024 * 1024 * 1024, hardlink: bool = False):
+        """Constructor.
+
+        Parameters
+        ----------
+        root: str or pathlib.Path
+            See the :attr:`~FetchCache.root` attribute. Created if missing.
+        max_size: int
+            See the :attr:`~FetchCache.max_size` attribute.
+        hardlink: bool
+            See the :attr:`~FetchCache.hardlink` attribute.
+        """
+        from collections import OrderedDict
+
+        self.root = Path(root)
+        self.max_size = max_size
+        self.hardlink = hardlink
+        self.size = 0
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        objects_dir = self.root.joinpath("objects")
+        objects_dir.mkdir(parents=True, exist_ok=True)
+        probe = self.root.joinpath(f".probe-{token_hex(4)}")
+        try:
+            with open(probe, "wb+") as source_file, open(f"{probe}.clone", "wb") as dest_file:
+                source_file.write(b"fulgens")
+                source_file.flush()
+                self.reflink = _reflink_fd(source_file.fileno(), dest_file.fileno())
+        finally:
+            probe.unlink(missing_ok=True)
+            Path(f"{probe}.clone").unlink(missing_ok=True)
+        # Recency survives restarts through the modification time, refreshed on every hit.
+        found = []
+        for path in objects_dir.glob("*/*"):
+            st = path.stat()
+            found.append((st.st_mtime, path.name, st.st_size))
+        for _, key, size in sorted(found):
+            self.__entries[key] = size
+            self.size += size
+        self.gc()
+
+    @staticmethod
+    def file_digest(path: str | pathlib.Path):
+        """Compute the sha256 hex digest of a local file.
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            File path.
+
+        Returns
+        -------
+        str
+            Hex digest.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def __path(self, key: str):
+        return self.root.joinpath("objects", key[:2], key)
+
+    def get(self, digest: str, executable: bool = False):
+        """Look up a stored file.
+
+        Parameters
+        ----------
+        digest: str
+            sha256 hex digest of the content.
+        executable: bool
+            Whether the executable copy is wanted, both are stored separately as they differ in mode.
+
+        Returns
+        -------
+        pathlib.Path or None
+            Stored file path, ``None`` on a miss.
+        """
+        key = digest + ("x" if executable else "")
+        with self.__lock:
+            if key not in self.__entries:
+                return None
+            self.__entries.move_to_end(key)
+        path = self.__path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self.__lock:
+                self.size -= self.__entries.pop(key, 0)
+            return None
+        return path
+
+    def add(self, path: str | pathlib.Path, digest: str | None = None):
+        """Store a local file.
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            File to store. It is made read-only with :attr:`~FetchCache.hardlink`.
+        digest: str or None
+            sha256 hex digest of the file, computed if ``None``.
+
+        Returns
+        -------
+        pathlib.Path
+            Stored file path.
+        """
+        return self.__add(path, digest or self.file_digest(path), False)
+
+    def __add(self, path: str | pathlib.Path, digest: str, shared_only: bool):
+        # With shared_only, nothing is stored unless the stored copy shares its blocks with path.
+        executable = bool(os.stat(path).st_mode & 0o100)
+        stored = self.get(digest, executable)
+        if stored is not None:
+            return stored
+        key = digest + ("x" if executable else "")
+        stored = self.__path(key)
+        stored.parent.mkdir(exist_ok=True)
+        scratch = stored.with_name(f".{key}.{token_hex(4)}")
+        if not self.__link(path, scratch) and shared_only:
+            scratch.unlink()
+            return None
+        os.chmod(scratch, 0o555 if executable else 0o444)
+        os.replace(scratch, stored)
+        size = stored.stat().st_size
+        with self.__lock:
+            if key not in self.__entries:
+                self.size += size
+            self.__entries[key] = size
+            self.__entries.move_to_end(key)
+        self.gc()
+        return stored
+
+    def __link(self, source: pathlib.Path, dest: pathlib.Path):
+        # Returns whether dest shares its blocks with source instead of holding a copy.
+        if self.hardlink:
+            try:
+                os.link(source, dest)
+                return True
+            except OSError:
+                pass
+        with open(source, "rb") as source_file, open(dest, "wb") as dest_file:
+            shared = _reflink_fd(source_file.fileno(), dest_file.fileno())
+        if not shared:
+            _clone_file(source, dest)
+        os.chmod(dest, 0o755 if os.stat(source).st_mode & 0o100 else 0o644)
+        return shared
+
+    def gc(self, max_size: int | None = None):
+        """Remove the least recently used stored files until the total size fits.
+
+        Stored files that fetched files still link to are kept, as removing them would not free
+        any space. Called after every store with :attr:`~FetchCache.max_size`.
+
+        Parameters
+        ----------
+        max_size: int or None
+            Size to shrink to, defaults to :attr:`~FetchCache.max_size`.
+
+        Returns
+        -------
+        int
+            Bytes freed.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        with self.__lock:
+            candidates = list(self.__entries.items())
+        freed = 0
+        for key, size in candidates:
+            if self.size <= max_size:
+                break
+            path = self.__path(key)
+            try:
+                if os.stat(path).st_nlink > 1:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            with self.__lock:
+                if self.__entries.pop(key, None) is not None:
+                    self.size -= size
+                    freed += size
+        return freed
+
+    def dedupe(self, path: str | pathlib.Path):
+        """Store the files of a local path, replacing the ones already stored by links to the stored copy.
+
+        Only files that can share their blocks with the stored copy, through a hardlink or a
+        reflink, are stored or replaced, so without either nothing is done instead of keeping
+        every file twice.
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+            Local file or folder, e.g. a fresh fetch.
+
+        Returns
+        -------
+        int
+            Bytes no longer held twice on disk.
+        """
+        if not self.hardlink and not self.reflink:
+            return 0
+        path = Path(path)
+        files = [path] if path.is_file() else [child for child in path.rglob("*") if child.is_file() and not child.is_symlink()]
+        saved = 0
+        for file in files:
+            st = file.stat()
+            digest = self.file_digest(file)
+            stored = self.get(digest, bool(st.st_mode & 0o100))
+            if stored is None:
+                self.__add(file, digest, True)
+                continue
+            if os.path.samefile(stored, file):
+                continue
+            scratch = file.with_name(f".{file.name}.{token_hex(4)}")
+            if not self.__link(stored, scratch):
+                scratch.unlink()
+                continue
+            os.replace(scratch, file)
+            saved += st.st_size
+        return saved
+
+    def materialize(self, manifest: dict, target: str | pathlib.Path):
+        """Create ``target`` from stored files only.
+
+        Parameters
+        ----------
+        manifest: dict
+            ``dirs``, a list of relative directory paths, and ``files``, a mapping of relative file
+            path to ``(digest, executable)``. The path ``""`` stands for ``target`` itself.
+        target: str or pathlib.Path
+            Path to create. It is built next to ``target`` and then swapped in, so whatever was at
+            ``target`` before, including files missing from the manifest, is replaced as a whole.
+
+        Returns
+        -------
+        bool
+            ``False``, without touching ``target``, if a file is not stored.
+
+        Raises
+        ------
+        ValueError
+            If a path of the manifest is absolute or has a ``..`` component.
+        """
+        target = Path(target)
+        for rel_path in [*manifest["dirs"], *manifest["files"]]:
+            if not _is_safe_relative(rel_path):
+                raise ValueError(f"path '{rel_path}' is outside of the target.")
+        stored = {}
+        for rel_path, (digest, executable) in manifest["files"].items():
+            stored[rel_path] = self.get(digest, executable)
+            if stored[rel_path] is None:
+                return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        scratch = target.with_name(f".{target.name}.{token_hex(4)}")
+        try:
+            if manifest["dir"]:
+                scratch.mkdir()
+            for rel_path in manifest["dirs"]:
+                scratch.joinpath(rel_path).mkdir(parents=True, exist_ok=True)
+            for rel_path, source in stored.items():
+                self.__link(source, scratch.joinpath(rel_path) if rel_path else scratch)
+            _replace_path(scratch, target)
+        except BaseException:
+            if scratch.is_dir() and not scratch.is_symlink():
+                rmtree(scratch, ignore_errors=True)
+            elif scratch.exists():
+                scratch.unlink()
+            raise
+        return True
+
+    def ingest(self, manifest: dict, target: str | pathlib.Path):
+        """Store the files of a freshly fetched ``target``.
+
+        Files whose local digest differs from the manifest, e.g. because they changed between
+        hashing and fetching, are left out.
+
+        Parameters
+        ----------
+        manifest: dict
+            Manifest, see :meth:`~FetchCache.materialize`.
+        target: str or pathlib.Path
+            Fetched path.
+        """
+        target = Path(target)
+        for rel_path, (digest, _) in manifest["files"].items():
+            path = target.joinpath(rel_path) if rel_path else target
+            if path.is_file() and self.file_digest(path) == digest:
+                self.add(path, digest)
+
+def _manifest_cmd(source: str | pathlib.Path):
+    """Build the command listing the directories, executables, files and sha256 digests of ``source``, see :func:`_parse_manifest`.
+
+    Names are NUL-terminated and an empty name ends each list, so any name can be represented.
+    """
+    source = str(source).rstrip("/") or "/"
+    parent, name = shlex.quote(os.path.dirname(source) or "."), shlex.quote(os.path.basename(source))
+    return (
+        f"cd {parent} && [ -e {name} ] || exit 3; "
+        f"[ -z \"$(find {name} -type l)\" ] || exit 4; "
+        f"if [ -d {name} ]; then printf 'd\\000'; find {name} -mindepth 1 -type d -print0; else printf 'f\\000'; fi; printf '\\000'; "
+        f"find {name} -type f -perm -100 -print0; printf '\\000'; "
+        f"find {name} -type f -print0; printf '\\000'; "
+        f"find {name} -type f -exec sha256sum {{}} +"
+    )
+
+def _is_safe_relative(path: str):
+    """Check that ``path`` is ``""`` or a relative path without ``.``, ``..`` or empty components."""
+    return path == "" or all(part not in ("", ".", "..") for part in path.split("/"))
+
+def _escape_sha256sum(path: str):
+    """Escape a name the way ``sha256sum`` does, see :func:`_unescape_sha256sum`."""
+    return path.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+
+def _parse_manifest(output: bytes, source: str | pathlib.Path):
+    """Parse the output of :func:`_manifest_cmd` into a :meth:`FetchCache.materialize` manifest.
+
+    Returns ``None`` for output that cannot be trusted, e.g. paths escaping ``source`` or digests
+    that do not line up with the file list.
+    """
+    name = os.path.basename(str(source).rstrip("/"))
+    try:
+        fields = output.decode().split("\0")
+        dirs_end = fields.index("", 1)
+        executables_end = fields.index("", dirs_end + 1)
+        files_end = fields.index("", executables_end + 1)
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if fields[0] not in ("d", "f") or len(fields) != files_end + 2:
+        return None
+
+    def relative(path):
+        if path == name:
+            return ""
+        if not path.startswith(f"{name}/") or not _is_safe_relative(path[len(name) + 1:]):
+            raise ValueError(f"path '{path}' is outside of '{name}'.")
+        return path[len(name) + 1:]
+
+    # sha256sum lines are newline-terminated, so they are matched against the NUL-terminated file
+    # list, in the same find order, instead of being split.
+    digests, offset, files = fields[-1], 0, {}
+    try:
+        dirs = [relative(path) for path in fields[1:dirs_end]]
+        executables = {relative(path) for path in fields[dirs_end + 1:executables_end]}
+        for path in fields[executables_end + 1:files_end]:
+            line = f"  {path}\n"
+            if digests.startswith("\\", offset):
+                offset, line = offset + 1, f"  {_escape_sha256sum(path)}\n"
+            digest = digests[offset:offset + 64]
+            if not re.fullmatch("[0-9a-f]{64}", digest) or not digests.startswith(line, offset + 64):
+                return None
+            files[relative(path)] = digest
+            offset += 64 + len(line)
+    except ValueError:
+        return None
+    if offset != len(digests):
+        return None
+    return {
+        "dir": fields[0] == "d",
+        "dirs": dirs,
+        "files": {path: (digest, path in executables) for path, digest in files.items()},
+    }
+
+def _checksum_cmd(paths: List[str], find_args: str | None = None):
+    """Build the command printing ``stat`` and ``sha256sum`` lines of files, see :func:`_parse_checksums`.
+
+    Without ``find_args`` the given paths are checked, otherwise the regular files found from
+    ``paths[0]`` with the extra ``find`` arguments, relative to it.
+    """
+    if find_args is None:
+        files = " ".join(shlex.quote(str(path)) for path in paths)
+        return f"stat -L -c '%f %s %n' {files} 2>/dev/null; printf '\\036\\n'; sha256sum {files} 2>/dev/null; true"
+    return (
+        f"cd {shlex.quote(str(paths[0]))} || exit 1; "
+        f"find . -type f {find_args} -exec stat -c '%f %s %n' {{}} +; printf '\\036\\n'; "
+        f"find . -type f {find_args} -exec sha256sum {{}} +"
+    )
+
+_STAT_LINE_RE = re.compile(r"([0-9a-f]+) ([0-9]+) ")
+
+def _unescape_sha256sum(line: str):
+    """Undo the escaping ``sha256sum`` applies to lines of names with a backslash or a newline, marked by a leading backslash."""
+    escapes = {"\\": "\\", "n": "\n", "r": "\r"}
+    return re.sub(r"\\(.)", lambda match: escapes.get(match[1], match[1]), line[1:])
+
+def _iter_checksums(output: bytes, strip_dot: bool = False):
+    """Yield ``(path, sha256, size, mode)`` from the output of :func:`_checksum_cmd`.
+
+    Regular files that have both a ``stat`` and a ``sha256sum`` line are kept.
+    """
+    stats, _, digests = output.decode(errors="surrogateescape").partition("\x1e\n")
+    entries = []
+    for line in stats.split("\n")[:-1]:
+        match = _STAT_LINE_RE.match(line)
+        if match is not None:
+            entries.append((int(match[1], 16), int(match[2]), line[match.end():]))
+        elif entries:
+            # stat prints names as they are, so a newline in a name continues on the next line.
+            mode, size, path = entries[-1]
+            entries[-1] = (mode, size, f"{path}\n{line}")
+    infos = {path: (mode, size) for mode, size, path in entries if S_ISREG(mode)}
+    for line in digests.split("\n"):
+        if line.startswith("\\"):
+            line = _unescape_sha256sum(line)
+        digest, sep, path = line.partition("  ")
+        if not sep or path not in infos:
+            continue
+        mode, size = infos[path]
+        yield path[2:] if strip_dot else path, digest, size, mode
+
+def _parse_checksums(output: bytes, strip_dot: bool = False):
+    """Map path to ``{"sha256", "size", "mode"}`` from the output of :func:`_checksum_cmd`, see :func:`_iter_checksums`."""
+    return {path: {"sha256": digest, "size": size, "mode": mode} for path, digest, size, mode in _iter_checksums(output, strip_dot)}
+
+class ManifestDiff():
+    """Difference between a file manifest and its baseline, see :class:`ManifestBaseline`.
+
+    Attributes
+    ----------
+    added: List[str]
+        Sorted paths that are missing from the baseline.
+    removed: List[str]
+        Sorted paths of the baseline that are missing from the manifest.
+    modified: List[str]
+        Sorted paths whose digest, or mode, differs from the baseline.
+    """
+    def __init__(self, added: List[str], removed: List[str], modified: List[str]):
+        """Constructor.
+
+        Parameters
+        ----------
+        added: List[str]
+            See the :attr:`~ManifestDiff.added` attribute.
+        removed: List[str]
+            See the :attr:`~ManifestDiff.removed` attribute.
+        modified: List[str]
+            See the :attr:`~ManifestDiff.modified` attribute.
+        """
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+
+    def is_clean(self):
+        """Check if the manifest matches the baseline.
+
+        Returns
+        -------
+        bool
+            Whether no file was added, removed or modified.
+        """
+        return not (self.added or self.removed or self.modified)
+
+class ColumnarManifest():
+    """File manifest stored as columns: a path list with fixed-width digest and mode arrays.
+
+    :class:`ManifestBaseline` compares columnar manifests in bulk with NumPy. Get them straight
+    from ``ChallengeHelper.manifest(..., columnar=True)``, converting dicts with
+    :meth:`~ColumnarManifest.from_dict` only pays off for manifests compared more than once.
+    Requires NumPy.
+
+    Attributes
+    ----------
+    paths: List[str]
+        File paths.
+    digests: numpy.ndarray
+        ``(n, 4)`` ``uint64`` array of the raw sha256 digests, in the order of :attr:`~ColumnarManifest.paths`.
+    modes: numpy.ndarray
+        ``uint32`` array of the ``st_mode`` values, in the order of :attr:`~ColumnarManifest.paths`.
+    """
+    def __init__(self, paths: List[str], digests: "numpy.ndarray", modes: "numpy.ndarray"):
+        """Constructor.
+
+        Parameters
+        ----------
+        paths: List[str]
+            See the :attr:`~ColumnarManifest.paths` attribute.
+        digests: numpy.ndarray
+            See the :attr:`~ColumnarManifest.digests` attribute.
+        modes: numpy.ndarray
+            See the :attr:`~ColumnarManifest.modes` attribute.
+        """
+        self.paths = paths
+        self.digests = digests
+        self.modes = modes
+
+    def __len__(self):
+        return len(self.paths)
+
+    @classmethod
+    def from_dict(cls, manifest: Dict[str, dict]):
+        """Convert a manifest returned by :meth:`ChallengeHelper.manifest`.
+
+        Parameters
+        ----------
+        manifest: Dict[str, dict]
+            Manifest to convert.
+
+        Returns
+        -------
+        fulgens.ColumnarManifest
+            Columnar manifest.
+
+        Raises
+        ------
+        ImportError
+            If NumPy is not installed.
+        """
+        from operator import itemgetter
+
+        infos = manifest.values()
+        return cls.__from_columns(list(manifest), list(map(itemgetter("sha256"), infos)), list(map(itemgetter("mode"), infos)))
+
+    @classmethod
+    def _from_checksums(cls, output: bytes, strip_dot: bool = False):
+        """Build the columns straight from the output of :func:`_checksum_cmd`, without dicts per file."""
+        paths, digests, modes = [], [], []
+        for path, digest, _, mode in _iter_checksums(output, strip_dot):
+            paths.append(path)
+            digests.append(digest)
+            modes.append(mode)
+        return cls.__from_columns(paths, digests, modes)
+
+    @classmethod
+    def __from_columns(cls, paths: List[str], digests: List[str], modes: List[int]):
+        import numpy
+
+        # The digests are decoded at once and compared as four 64-bit words each.
+        digest_array = numpy.frombuffer(bytes.fromhex("".join(digests)), dtype=numpy.uint64).reshape(-1, 4)
+        return cls(paths, digest_array, numpy.array(modes, dtype=numpy.uint32))
+
+    def to_dict(self):
+        """Convert back to a manifest dict, without the sizes.
+
+        Returns
+        -------
+        Dict[str, dict]
+            Mapping of path to ``{"sha256", "mode"}``.
+        """
+        return {path: {"sha256": digest.tobytes().hex(), "mode": int(mode)} for path, digest, mode in zip(self.paths, self.digests, self.modes)}
+
+class ManifestBaseline():
+    """Reference file manifest, e.g. of the original challenge, that team manifests are diffed against.
+
+    Dict manifests are compared as plain dicts, which is the fastest for manifests used once.
+    :class:`ColumnarManifest` ones, e.g. from ``ChallengeHelper.manifest(..., columnar=True)``,
+    are aligned to the baseline rows through a path index and compared for every team at once
+    in a few NumPy array operations.
+
+    Attributes
+    ----------
+    paths: List[str]
+        Sorted baseline paths.
+    compare_mode: bool
+        Whether a different mode alone makes a file modified.
+    """
+    def __init__(self, manifest: "Dict[str, dict] | ColumnarManifest", compare_mode: bool = True):
+        """Constructor.
+
+        Parameters
+        ----------
+        manifest: Dict[str, dict] or ColumnarManifest
+            Baseline manifest.
+        compare_mode: bool
+            See the :attr:`~ManifestBaseline.compare_mode` attribute.
+        """
+        if isinstance(manifest, ColumnarManifest):
+            manifest = manifest.to_dict()
+        self.paths = sorted(manifest)
+        self.compare_mode = compare_mode
+        self.__manifest = manifest
+        self.__np = None
+
+    def __prepare_columns(self):
+        # Only columnar inputs need NumPy, so the baseline columns are built on first use.
+        if self.__np is None:
+            import numpy
+
+            self.__index = {path: row for row, path in enumerate(self.paths)}
+            self.__columns = ColumnarManifest.from_dict({path: self.__manifest[path] for path in self.paths})
+            self.__np = numpy
+        return self.__np
+
+    def compare(self, manifest: "Dict[str, dict] | ColumnarManifest"):
+        """Diff a single manifest against the baseline.
+
+        Parameters
+        ----------
+        manifest: Dict[str, dict] or ColumnarManifest
+            Manifest to compare.
+
+        Returns
+        -------
+        fulgens.ManifestDiff
+            Added, removed and modified files.
+        """
+        return self.compare_teams({None: manifest})[None]
+
+    def compare_teams(self, manifests: "Dict[str, Dict[str, dict] | ColumnarManifest]"):
+        """Diff the manifests of many teams against the baseline at once.
+
+        Parameters
+        ----------
+        manifests: Dict[str, Dict[str, dict] or ColumnarManifest]
+            Mapping of team ID to manifest.
+
+        Returns
+        -------
+        Dict[str, ManifestDiff]
+            Mapping of team ID to its differences.
+        """
+        # Turning dicts into columns costs more than comparing them as they are.
+        diffs = {team: self.__compare_dicts(manifest) for team, manifest in manifests.items() if not isinstance(manifest, ColumnarManifest)}
+        if len(diffs) < len(manifests):
+            diffs.update(self.__compare_columns({team: manifest for team, manifest in manifests.items() if team not in diffs}))
+        return {team: diffs[team] for team in manifests}
+
+    def __compare_columns(self, manifests: "Dict[str, ColumnarManifest]"):
+        np = self.__prepare_columns()
+        from itertools import chain, repeat
+
+        teams = list(manifests)
+        columns = list(manifests.values())
+        paths = list(chain.from_iterable(column.paths for column in columns))
+        digests = np.concatenate([column.digests for column in columns])
+        modes = np.concatenate([column.modes for column in columns])
+        counts = np.fromiter(map(len, columns), dtype=np.int64, count=len(columns))
+        team_index = np.repeat(np.arange(len(teams)), counts)
+        rows = np.fromiter(map(self.__index.get, paths, repeat(-1)), dtype=np.int64, count=len(paths))
+
+        matched = rows >= 0
+        changed = np.zeros(len(paths), dtype=bool)
+        if self.paths:
+            # Unmatched files are compared with row 0 and masked out afterwards, cheaper than gathering by mask.
+            base_rows = np.where(matched, rows, 0)
+            base = self.__columns
+            changed = (digests != base.digests[base_rows]).any(axis=1)
+            if self.compare_mode:
+                changed |= modes != base.modes[base_rows]
+            changed &= matched
+        present = np.zeros((len(teams), len(self.paths)), dtype=bool)
+        present[team_index[matched], rows[matched]] = True
+
+        diffs = {}
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        for index, team in enumerate(teams):
+            start = bounds[index]
+            added = np.flatnonzero(~matched[start:bounds[index + 1]])
+            modified = np.flatnonzero(changed[start:bounds[index + 1]])
+            diffs[team] = ManifestDiff(
+                sorted(paths[start + offset] for offset in added.tolist()),
+                [self.paths[row] for row in np.flatnonzero(~present[index]).tolist()],
+                sorted(paths[start + offset] for offset in modified.tolist()),
+            )
+        return diffs
+
+    def __compare_dicts(self, manifest: Dict[str, dict]):
+        baseline = self.__manifest
+        modified = []
+        for path, info in manifest.items():
+            base_info = baseline.get(path)
+            if base_info is not None and (info["sha256"] != base_info["sha256"] or (self.compare_mode and info["mode"] != base_info["mode"])):
+                modified.append(path)
+        return ManifestDiff(
+            sorted(path for path in manifest if path not in baseline),
+            [path for path in self.paths if path not in manifest],
+            sorted(modified),
+        )
+
+class ArtifactStore(FetchCache):
+    """Deduplicating store of the files fetched for every team of a challenge, kept in the
+    ``.artifacts`` directory of the local challenge directory.
+
+    Teams running the same challenge mostly return identical files. Set one store as the
+    :attr:`ChallengeHelper.artifact_store` of the helpers of every team, and each fetched file is
+    hashed locally and shares the blocks of a single stored copy per distinct content, see
+    :class:`FetchCache` for the linking and eviction rules. It needs a filesystem with reflinks,
+    like btrfs and XFS, or :attr:`~FetchCache.hardlink`, and otherwise stores nothing.
+
+    .. code-block:: python
+
+        store = fulgens.ArtifactStore(challenge_dir, max_size=512 * 1024 * 1024)
+        for helper in helpers.values():
+            helper.artifact_store = store
+    """
+    def __init__(self, local_challenge_dir: str | pathlib.Path, max_size: int = 1024 * 1024 * 1024, hardlink: bool = False):
+        """Constructor.
+
+        Parameters
+        ----------
+        local_challenge_dir: str or pathlib.Path
+            Local challenge directory, see :attr:`ChallengeHelper.local_challenge_dir`.
+        max_size: int
+            See the :attr:`~FetchCache.max_size` attribute.
+        hardlink: bool
+            See the :attr:`~FetchCache.hardlink` attribute.
+        """
+        super().__init__(Path(local_challenge_dir).joinpath(".artifacts"), max_size, hardlink)
 
 class Verdict():
     """Define checker verdict.
 
     Attributes
     ----------
-    status: str
-        Verdict status. ``OK`` is given if the service passed all the testcases, ``FAIL`` if the
-        service fail on some testcases (e.g.: give invalid response or take too long to respond),
-        or ``ERROR`` if the checker cannot execute the testcase properly.
-    message: str
-        Additional information related to the verdict given.
+    status: str
+        Verdict status. ``OK`` is given if the service passed all the testcases, ``FAIL`` if the
+        service fail on some testcases (e.g.: give invalid response or take too long to respond),
+        or ``ERROR`` if the checker cannot execute the testcase properly.
+    message: str
+        Additional information related to the verdict given.
+    """
+    def __init__(self, status: str, message: str):
+        """Constructor.
+
+        Parameters
+        ----------
+        status: str
+            See the :attr:`~Verdict.status` attribute.
+        message: str
+            See the :attr:`~Verdict.message` attribute.
+        """
+        self.status = status
+        self.message = message
+
+    def is_ok(self):
+        """Check is the verdict is ``OK`` or not.
+
+        Returns
+        -------
+        bool
+            Whether the verdict is ``OK`` or not.
+        """
+        return self.status == "OK"
+
+    @classmethod
+    def OK(cls, message = ""):
+        """Create OK verdict object.
+
+        Parameters
+        ----------
+        message: str
+            See the :attr:`~Verdict.message` attribute.
+
+        Returns
+        -------
+        fulgens.Verdict
+            Verdict object with ``OK`` status.
+        """
+        return Verdict("OK", message)
+
+    @classmethod
+    def FAIL(cls, message):
+        """Create FAIL verdict object.
+
+        Parameters
+        ----------
+        message: str
+            See the :attr:`~Verdict.message` attribute.
+
+        Returns
+        -------
+        fulgens.Verdict
+            Verdict object with ``FAIL`` status.
+        """
+        return Verdict("FAIL", message)
+
+    @classmethod
+    def ERROR(cls, message):
+        """Create ERROR verdict object.
+
+        Parameters
+        ----------
+        message: str
+            See the :attr:`~Verdict.message` attribute.
+
+        Returns
+        -------
+        fulgens.Verdict
+            Verdict object with ``ERROR`` status.
+        """
+        return Verdict("ERROR", message)
+
+    def to_dict(self):
+        """Convert the verdict to plain data, e.g. for JSON.
+
+        Returns
+        -------
+        dict
+            ``status`` and ``message``.
+        """
+        return {"status": self.status, "message": str(self.message)}
+
+class ChallengeHelper():
+    """
+    Helper for checker to get and interact with the service.
+
+    Attributes
+    ----------
+    addresses: List[str]
+        List of service addresses that exposed.
+    secret: str
+        Team secret key.
+    local_challenge_dir: pathlib.Path
+        Local challenge directory.
+    remote_challenge_dir: pathlib.Path
+        Remote challenge directory.
+    compose_filename: str
+        Compose filename. The default value is ``docker-compose.yml``.
+    services: types.MappingProxyType
+        Read-only ``services`` section of the compose file, shared by every helper of the
+        challenge through :func:`load_compose`.
+    ssh_conn: fabric.Connection or PooledConnection or None
+        SSH connection to the server that runs the services, either a dedicated connection or a
+        handle from :meth:`SSHConnectionPool.connection`. If ``None``, it will assume
+        that the service is in the same server as the checker, also :attr:`~ChallengeHelper.remote_challenge_dir`
+        and :attr:`~ChallengeHelper.local_challenge_dir` will have the same value.
+    backend: Backend
+        Transport used for the container operations and file transfers. Defaults to
+        :class:`SSHBackend` over :attr:`~ChallengeHelper.ssh_conn` if set, otherwise :class:`LocalBackend`.
+        Use :class:`DockerAPIBackend` to go through the Docker Engine API instead of the ``docker`` CLI.
+    project_name: str
+        Compose project name, used to find the service containers through the Docker Engine API.
+    max_read_size: int or None
+        Default size limit in bytes for :meth:`~ChallengeHelper.read` and :meth:`~ChallengeHelper.open`.
+        ``None`` disables the limit.
+    container_ids: dict or None
+        Cached mapping of service name to running container ID, see :meth:`~ChallengeHelper.refresh_containers`.
+        ``None`` until the first lookup.
+    fetch_cache: FetchCache or None
+        If set, :meth:`~ChallengeHelper.fetch` hashes the source inside the container first and
+        only transfers it when a file is missing from the cache. ``None`` by default.
+    artifact_store: ArtifactStore or None
+        If set, files written by :meth:`~ChallengeHelper.fetch` are deduplicated against the files
+        fetched by every helper sharing the store. ``None`` by default.
+    """
+    def __init__(self, addresses: List[str], secret: str, local_challenge_dir: str | pathlib.Path, remote_challenge_dir: str | pathlib.Path = None, compose_filename: str = "docker-compose.yml", ssh_conn: "fabric.Connection | PooledConnection | None" = None, backend: Backend | None = None):
+        """Constructor.
+
+        Parameters
+        ----------
+        addresses: List[str]
+            See the :attr:`~ChallengeHelper.status` attribute.
+        secret: str
+            See the :attr:`~ChallengeHelper.secret` attribute.
+        local_challenge_dir: str or pathlib.Path
+            See the :attr:`~ChallengeHelper.local_challenge_dir` attribute.
+        remote_challenge_dir: str or pathlib.Path
+            See the :attr:`~ChallengeHelper.remote_challenge_dir` attribute.
+        compose_filename: str
+            See the :attr:`~ChallengeHelper.compose_filename` attribute.
+        ssh_conn: fabric.Connection or PooledConnection or None
+            See the :attr:`~ChallengeHelper.ssh_conn` attribute.
+        backend: Backend or None
+            See the :attr:`~ChallengeHelper.backend` attribute.
+        """
+        self.addresses = addresses
+        self.ssh_conn = ssh_conn
+        if backend is None:
+            backend = SSHBackend(ssh_conn) if ssh_conn else LocalBackend()
+        self.backend = backend
+        self.secret = secret
+        self.services, self.project_name = _compose_project(local_challenge_dir, remote_challenge_dir, compose_filename)
+
+        self.local_chall_dir = Path(local_challenge_dir)
+
+        if self.backend.local:
+            self.remote_chall_dir = self.local_chall_dir
+        else:
+            self.remote_chall_dir = Path(remote_challenge_dir or local_challenge_dir)
+        
+        self.compose_path = self.remote_chall_dir.joinpath(compose_filename)        
+        self.container_ids = None
+        self.max_read_size = 16 * 1024 * 1024
+        self.fetch_cache = None
+        self.artifact_store = None
+        self.__local = threading.local()
+        self.__stats = _StatsRecorder(self)
+    
+
+    def __timeout(self, timeout: float | None = None):
+        return _remaining_timeout(getattr(self.__local, "deadlines", []), timeout)
+
+    @contextmanager
+    def __budget(self, timeout: float | None):
+        # One deadline for every step of a call, so retries and later steps only get the time left.
+        if timeout is None:
+            yield
+            return
+        with self.deadline(timeout):
+            yield
+
+    def __measure(self, operation: str, service_name: str | None = None, spawns: int = 0):
+        return self.__stats.measure(operation, service_name, self.backend.name, spawns)
+
+    def __container(self, service_name: str):
+        if self.container_ids is None:
+            self.refresh_containers()
+        return ContainerRef(service_name, self.container_ids.get(service_name), self.compose_path)
+
+    def __container_call(self, service_name: str, call: Callable):
+        # A recreated container gets a new ID, so re-resolve once when the cached one is gone.
+        try:
+            return call(self.__container(service_name))
+        except StaleContainerError:
+            self.invalidate_containers()
+        return call(self.__container(service_name))
+
+    def __kill_tagged(self, container: ContainerRef, token: str):
+        # Killing the docker client does not stop the process it started inside the container.
+        # It bypasses __timeout, which would refuse to start once the deadline has expired.
+        try:
+            with self.__measure("kill", container.service, spawns=self.backend.spawns):
+                self.backend.container_exec(container, _kill_tagged_cmd(token), timeout=_KILL_TIMEOUT)
+        except Exception:
+            # Best effort, the container may be gone already.
+            pass
+
+    def __cmd_container_wrapper(self, service_name: str, cmd: str, timeout: float | None = None):
+        token = token_hex(8)
+        def call(container):
+            timeout = self.__timeout()
+            env = None if timeout is None else {_CALL_ENV: token}
+            with self.__measure("run", service_name, spawns=self.backend.spawns) as sample:
+                stdout, stderr, exit_code = self.backend.container_exec(container, cmd, env, timeout, lambda: self.__kill_tagged(container, token))
+                sample.bytes = len(stdout) + len(stderr)
+                return stdout, stderr, exit_code
+        with self.__budget(timeout):
+            return self.__container_call(service_name, call)
+
+    def __transfer_wrapper(self, source: str, dest: str, is_dir: bool, service_name: str | None = None):
+        with self.__measure("transfer", service_name, spawns=0 if self.backend.local else 1 + 2 * is_dir) as sample:
+            sample.bytes = self.backend.copy_out(source, dest, is_dir)
+        return True
+    
+    def __dir_checker_wrapper(self, path, service_name: str | None = None):
+        with self.__measure("dir_check", service_name, spawns=0 if self.backend.local else 1):
+            return self.backend.is_dir(path)
+
+    def __get_container_file_wrapper(self, service_name, source, scratch_dir: pathlib.Path | None = None):
+        dest_fname = Path(scratch_dir or "/tmp").joinpath(os.path.basename(str(source).rstrip("/")))
+        def call(container):
+            with self.__measure("fetch", service_name, spawns=self.backend.spawns):
+                return self.backend.container_copy(container, source, dest_fname)
+        cmd_status = self.__container_call(service_name, call)
+        if cmd_status[-1] != 0:
+            raise Exception(f"failed to copy: {cmd_status[1].decode()}")
+        return dest_fname
+
+    def __open_container_archive(self, service_name: str, source: str | pathlib.Path, watchdog: _Watchdog):
+        return self.__container_call(service_name, lambda container: self.backend.open_archive(container, source, watchdog))
+
+    def session(self, service_name: str):
+        """Open a persistent shell inside the service container.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+
+        Returns
+        -------
+        fulgens.ContainerSession
+            Session that runs commands through a single ``docker exec``.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+        container = self.__container(service_name)
+        token = token_hex(8)
+        with self.__measure("session", service_name, spawns=self.backend.spawns):
+            process = self.backend.container_spawn(container, env={_CALL_ENV: token})
+        return ContainerSession(service_name, process, self.__timeout, lambda: self.__kill_tagged(container, token))
+
+    def stream(self, service_name: str, cmd: List[str] | str, lines: bool = False, timeout: float | None = None):
+        """Run shell commands inside the service container and read their output while they run.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        cmd: List[str] or str
+            Command to be executed.
+        lines: bool
+            If ``True``, yield whole lines (ending with ``\\n`` except maybe the last one)
+            instead of chunks as they arrive.
+        timeout: float or None
+            Maximum seconds until the command ends, also bounded by :meth:`~ChallengeHelper.deadline`.
+
+        Returns
+        -------
+        fulgens.ContainerStream
+            Iterable over the standard output.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+
+        Examples
+        --------
+        >>> with helper.stream("web", "tail -f /var/log/app.log", lines=True, timeout=10) as output:
+        ...     found = any(b"ready" in line for line in output)
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+        if not isinstance(cmd, str):
+            cmd = " ; ".join(cmd)
+        timeout = self.__timeout(timeout)
+        container = self.__container(service_name)
+        token = token_hex(8)
+        with self.__measure("stream", service_name, spawns=self.backend.spawns):
+            process = self.backend.container_spawn(container, cmd, {_CALL_ENV: token})
+        # Killing the docker client on close leaves the command running inside the container.
+        return ContainerStream(service_name, process, lines, timeout, lambda: self.__kill_tagged(container, token))
+
+    def stats(self):
+        """Get the latency and throughput statistics of the operations made by this helper.
+
+        Returns
+        -------
+        Dict[Tuple[str, str or None, str], dict]
+            :meth:`OperationStats.to_dict` data keyed by ``(operation, service, backend)``,
+            see :class:`OperationSample` for the possible values.
+        """
+        return self.__stats.to_dict()
+
+    def add_stats_hook(self, hook: Callable[["ChallengeHelper", OperationSample], None]):
+        """Register a function called with every operation sample, e.g. to push it to a metrics pipeline.
+
+        Hooks run synchronously in the thread that made the operation, so they should be quick.
+        Exceptions raised by hooks are ignored.
+
+        Parameters
+        ----------
+        hook: Callable[[ChallengeHelper, OperationSample], None]
+            Function receiving the helper and the :class:`OperationSample`.
+        """
+        self.__stats.add_hook(hook)
+
+    def remove_stats_hook(self, hook: Callable[["ChallengeHelper", OperationSample], None]):
+        """Unregister a function added with :meth:`~ChallengeHelper.add_stats_hook`.
+
+        Parameters
+        ----------
+        hook: Callable[[ChallengeHelper, OperationSample], None]
+            Registered function.
+        """
+        self.__stats.remove_hook(hook)
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """Limit the total time of every helper call made inside the block by the current thread.
+
+        Calls get the remaining time as their timeout, and raise :class:`CommandTimeout` once it is
+        used up. Deadlines nest, the earliest one wins.
+
+        Parameters
+        ----------
+        seconds: float
+            Time budget of the block.
+
+        Examples
+        --------
+        >>> with helper.deadline(10):
+        ...     helper.run("web", "curl -s localhost")
+        ...     helper.fetch("web", "/etc/nginx", helper.local_chall_dir)
+        """
+        deadlines = self.__local.__dict__.setdefault("deadlines", [])
+        deadlines.append(time.monotonic() + seconds)
+        try:
+            yield
+        finally:
+            deadlines.pop()
+
+    def refresh_containers(self):
+        """Resolve and cache the container ID of every running service.
+
+        Commands and file copies then go straight to ``docker exec``/``docker cp`` instead of
+        letting ``docker compose`` parse the compose file again on every call. The cache is
+        filled on first use; call this once per tick to pick up recreated containers early.
+
+        Returns
+        -------
+        dict
+            Mapping of service name to container ID.
+
+        Raises
+        ------
+        IOError
+            If the running containers cannot be listed.
+        """
+        timeout = self.__timeout()
+        with self.__measure("ps", spawns=self.backend.spawns):
+            self.container_ids = self.backend.list_containers(self.compose_path, self.project_name, timeout)
+        return self.container_ids
+
+    def invalidate_containers(self):
+        """Drop the cached container IDs so the next call resolves them again."""
+        self.container_ids = None
+
+    def fetch(self, service_name: str, source: str | pathlib.Path, dest: str | pathlib.Path, stream: bool = False, timeout: float | None = None):
+        """Fetch file/folder from the remote service container to the local filesystem.
+
+        With :attr:`~ChallengeHelper.fetch_cache` set, the files are hashed inside the container
+        first and ``dest`` is rebuilt from the cache when every file is cached already.
+        With :attr:`~ChallengeHelper.artifact_store` set, the fetched files are then deduplicated.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        source: str | pathlib.Path
+            Service container path file. 
+        dest: str | pathlib.Path
+            Local filesystem path.
+        stream: bool
+            If ``True``, pipe the tar stream of ``docker cp SRC -`` straight into a local extractor,
+            so files and folders take one round trip and no temporary file is written on either side.
+            Always the case when a timeout applies or the backend has no server filesystem, see
+            :attr:`Backend.stream_fetch`.
+        timeout: float or None
+            Maximum seconds for the transfer, also bounded by :meth:`~ChallengeHelper.deadline`.
+
+        Returns
+        -------
+        bool
+            Whether fetch is successful or not.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        IOError
+            If there is something wrong with the file transfer or modification.
+        CommandTimeout
+            If the transfer does not finish in time.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+
+        if self.fetch_cache is None and self.artifact_store is None:
+            return self.__fetch(service_name, source, dest, stream, timeout)
+        # The manifest and the transfer share the timeout.
+        with self.__budget(timeout):
+            return self.__fetch_cached(service_name, source, dest, stream)
+
+    def __fetch_cached(self, service_name: str, source: str | pathlib.Path, dest: str | pathlib.Path, stream: bool):
+        target = Path(dest)
+        if target.is_dir() and not target.is_symlink():
+            target = target.joinpath(os.path.basename(str(source).rstrip("/")))
+        manifest = None
+        if self.fetch_cache is not None:
+            stdout, _, exit_code = self.__cmd_container_wrapper(service_name, _manifest_cmd(source))
+            manifest = _parse_manifest(stdout, source) if exit_code == 0 else None
+            if manifest is not None and self.fetch_cache.materialize(manifest, target):
+                return True
+        # The transfer lands in a scratch directory next to the target, so neither a failed
+        # transfer nor files shared with a store can damage what is already at the target.
+        target.parent.mkdir(parents=True, exist_ok=True)
+        scratch_dir = target.parent.joinpath(f".fulgens-{token_hex(8)}")
+        scratch_dir.mkdir()
+        try:
+            fetched_path = scratch_dir.joinpath(target.name)
+            fetched = self.__fetch(service_name, source, fetched_path, stream, None)
+            if manifest is not None:
+                self.fetch_cache.ingest(manifest, fetched_path)
+            if self.artifact_store is not None:
+                self.artifact_store.dedupe(fetched_path)
+            if fetched:
+                _replace_path(fetched_path, target)
+        finally:
+            rmtree(scratch_dir, ignore_errors=True)
+        return fetched
+
+    def __fetch(self, service_name: str, source: str | pathlib.Path, dest: str | pathlib.Path, stream: bool, timeout: float | None):
+        timeout = self.__timeout(timeout)
+        if stream or self.backend.stream_fetch or timeout is not None:
+            with self.__measure("fetch", service_name, spawns=self.backend.spawns) as sample:
+                with _Watchdog(timeout) as watchdog:
+                    with self.__open_container_archive(service_name, source, watchdog) as archive:
+                        try:
+                            return _extract_tar_stream(archive.stream, source, dest)
+                        finally:
+                            sample.bytes = archive.stream.bytes_read
+        
+        if not self.backend.local:
+            container_fname = self.__get_container_file_wrapper(service_name, source)
+            is_dir = self.__dir_checker_wrapper(container_fname, service_name)
+            return self.__transfer_wrapper(container_fname, dest, is_dir, service_name)
+        # docker cp writes next to dest rather than into /tmp, which is often tmpfs, so that
+        # moving the copy in place is a rename instead of a second full copy.
+        scratch_dir = _landing_dir(dest).joinpath(f".fulgens-{token_hex(8)}")
+        scratch_dir.mkdir()
+        try:
+            container_fname = self.__get_container_file_wrapper(service_name, source, scratch_dir)
+            is_dir = self.__dir_checker_wrapper(container_fname, service_name)
+            return self.__transfer_wrapper(container_fname, dest, is_dir, service_name)
+        finally:
+            rmtree(scratch_dir, ignore_errors=True)
+
+    def open(self, service_name: str, path: str | pathlib.Path, max_size: int | None = -1, timeout: float | None = None):
+        """Open a file inside the service container for streaming reads, without touching the local filesystem.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        path: str | pathlib.Path
+            Service container path file.
+        max_size: int or None
+            Largest file size accepted, in bytes. Defaults to :attr:`~ChallengeHelper.max_read_size`,
+            ``None`` disables the limit.
+        timeout: float or None
+            Maximum seconds until the file is closed, also bounded by :meth:`~ChallengeHelper.deadline`.
+
+        Returns
+        -------
+        io.BufferedReader
+            Binary file object over a :class:`ContainerFile`.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        IOError
+            If the path cannot be copied, is not a regular file or is larger than ``max_size``.
+        CommandTimeout
+            If the copy does not finish in time.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+        if max_size == -1:
+            max_size = self.max_read_size
+        watchdog = _Watchdog(self.__timeout(timeout))
+        try:
+            archive = self.__open_container_archive(service_name, path, watchdog)
+        except BaseException as ex:
+            watchdog.cancel()
+            if watchdog.expired:
+                raise CommandTimeout(watchdog.timeout) from ex
+            raise
+        return io.BufferedReader(ContainerFile(str(path), archive, max_size, watchdog))
+
+    def read(self, service_name: str, path: str | pathlib.Path, max_size: int | None = -1, timeout: float | None = None):
+        """Read a whole file inside the service container into memory.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        path: str | pathlib.Path
+            Service container path file.
+        max_size: int or None
+            See :meth:`~ChallengeHelper.open`.
+        timeout: float or None
+            See :meth:`~ChallengeHelper.open`.
+
+        Returns
+        -------
+        bytes
+            File content.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        IOError
+            If the path cannot be copied, is not a regular file or is larger than ``max_size``.
+        CommandTimeout
+            If the copy does not finish in time.
+        """
+        with self.__measure("read", service_name, spawns=self.backend.spawns) as sample:
+            with self.open(service_name, path, max_size, timeout) as container_file:
+                data = container_file.read()
+            sample.bytes = len(data)
+            return data
+
+    def checksum(self, service_name: str, paths: List[str | pathlib.Path], timeout: float | None = None):
+        """Hash files inside the service container, so comparing them takes one round trip
+        and no file content leaves the container.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        paths: List[str | pathlib.Path]
+            Service container file paths, symbolic links are followed.
+        timeout: float or None
+            Maximum seconds for the command, also bounded by :meth:`~ChallengeHelper.deadline`.
+
+        Returns
+        -------
+        Dict[str, dict or None]
+            Mapping of every path, as given, to ``{"sha256": hex digest, "size": bytes, "mode": st_mode}``,
+            or ``None`` if it is missing or not a regular file.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        CommandTimeout
+            If the command does not finish in time.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+
+        paths = [str(path) for path in paths]
+        if not paths:
+            return {}
+        stdout, _, _ = self.__cmd_container_wrapper(service_name, _checksum_cmd(paths), timeout)
+        checksums = _parse_checksums(stdout)
+        return {path: checksums.get(path) for path in paths}
+
+    def manifest(self, service_name: str, root: str | pathlib.Path, include: List[str] | None = None, exclude: List[str] | None = None, timeout: float | None = None, columnar: bool = False):
+        """Hash every regular file under a directory inside the service container in one round trip.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        root: str | pathlib.Path
+            Service container directory path.
+        include: List[str] or None
+            Glob patterns, relative to ``root``, of the files to hash, e.g. ``["*.py", "bin/*"]``.
+            As with :func:`fnmatch.fnmatch`, ``*`` also matches ``/``. ``None`` includes every file.
+        exclude: List[str] or None
+            Glob patterns, relative to ``root``, of the files to leave out, e.g. ``["__pycache__/*"]``.
+        timeout: float or None
+            Maximum seconds for the command, also bounded by :meth:`~ChallengeHelper.deadline`.
+        columnar: bool
+            If ``True``, return a :class:`ColumnarManifest` for :class:`ManifestBaseline`, built
+            without the dict per file. Requires NumPy.
+
+        Returns
+        -------
+        Dict[str, dict] or ColumnarManifest
+            Mapping of file path relative to ``root`` to ``{"sha256": hex digest, "size": bytes, "mode": st_mode}``.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        IOError
+            If ``root`` cannot be read.
+        CommandTimeout
+            If the command does not finish in time.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+
+        find_args = []
+        if include:
+            find_args.append("\\( " + " -o ".join(f"-path {shlex.quote('./' + pattern)}" for pattern in include) + " \\)")
+        for pattern in exclude or []:
+            find_args.append(f"! -path {shlex.quote('./' + pattern)}")
+        stdout, stderr, exit_code = self.__cmd_container_wrapper(service_name, _checksum_cmd([str(root)], " ".join(find_args)), timeout)
+        if exit_code != 0:
+            raise IOError(f"failed to hash '{root}': {stderr.decode(errors='replace')}")
+        if columnar:
+            return ColumnarManifest._from_checksums(stdout, strip_dot=True)
+        return _parse_checksums(stdout, strip_dot=True)
+
+    def run_many(self, cmds: Dict[str, List[str] | str], timeout: float | None = None):
+        """Run one command in each of several service containers with a single round trip.
+
+        The commands run concurrently, and with the ``docker`` CLI backends they are shipped to
+        the server as one shell script that sends every result back at once.
+
+        Parameters
+        ----------
+        cmds: Dict[str, List[str] or str]
+            Command to be executed, keyed by service name.
+        timeout: float or None
+            Maximum seconds for the whole batch, also bounded by :meth:`~ChallengeHelper.deadline`.
+
+        Returns
+        -------
+        Dict[str, Tuple[bytes, bytes, int]]
+            Standard output, standard error and exit code, keyed by service name.
+
+        Raises
+        ------
+        ValueError
+            If a service name requested cannot be found.
+        IOError
+            If the batch script cannot be run on the server.
+        CommandTimeout
+            If the batch does not finish in time.
+        """
+        for service_name in cmds:
+            if service_name not in self.services:
+                raise ValueError(f"service '{service_name}' cannot be found.")
+        cmds = {service_name: cmd if isinstance(cmd, str) else " ; ".join(cmd) for service_name, cmd in cmds.items()}
+        token = token_hex(8)
+        with self.__budget(timeout):
+            calls = {service_name: (self.__container(service_name), cmd) for service_name, cmd in cmds.items()}
+            timeout = self.__timeout()
+            env = None if timeout is None else {_CALL_ENV: token}
+            def on_timeout():
+                for container, _ in calls.values():
+                    self.__kill_tagged(container, token)
+            with self.__measure("run_many", spawns=self.backend.spawns) as sample:
+                results = self.backend.container_exec_many(calls, env, timeout, on_timeout)
+                sample.bytes = sum(len(result[0]) + len(result[1]) for result in results.values() if isinstance(result, tuple))
+            for service_name, result in results.items():
+                # Containers recreated since the IDs were cached get one more try on their own,
+                # within what is left of the batch timeout.
+                if isinstance(result, StaleContainerError):
+                    self.invalidate_containers()
+                    results[service_name] = self.__cmd_container_wrapper(service_name, cmds[service_name])
+        return results
+
+    def run_steps(self, service_name: str, cmds: List[str], stop_on_failure: bool = False, timeout: float | None = None):
+        """Run several shell commands inside the service container with a single exec, keeping their results apart.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        cmds: List[str]
+            Commands to be executed in order. Each one runs in its own subshell.
+        stop_on_failure: bool
+            If ``True``, skip the remaining steps after the first one with a non-zero exit code.
+        timeout: float or None
+            Maximum seconds for all steps, also bounded by :meth:`~ChallengeHelper.deadline`.
+
+        Returns
+        -------
+        List[fulgens.StepResult]
+            Result of every executed step.
+
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        IOError
+            If the steps cannot be run inside the container.
+        CommandTimeout
+            If the steps do not finish in time.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+        token = token_hex(8)
+        script = []
+        for cmd in cmds:
+            script.append(_frame_command(cmd, token))
+            if stop_on_failure:
+                script.append("[ $__rc -eq 0 ] || exit 0")
+        stdout, stderr, exit_code = self.__cmd_container_wrapper(service_name, "\n".join(script), timeout)
+        frames = _split_frames(stdout, stderr, token)
+        stopped = stop_on_failure and frames and frames[-1][-1] != 0
+        if len(frames) < len(cmds) and not stopped:
+            raise IOError(f"failed to run steps: {stderr.decode(errors='replace')}")
+        return [StepResult(cmd, *frame) for cmd, frame in zip(cmds, frames)]
+
+    def run(self, service_name: str, cmd: List[str] | str, timeout: float | None = None):
+        """Run shell commands inside the service container.
+
+        Parameters
+        ----------
+        service_name: str
+            Service name.
+        cmd: List[str] or str
+            Command to be executed.
+        timeout: float or None
+            Maximum seconds to wait for the command, also bounded by :meth:`~ChallengeHelper.deadline`.
+            On expiry the command is killed, both the docker client and the process inside the container.
+
+        Returns
+        -------
+        bytes
+            Standard output.
+        bytes
+            Standard error.
+        int
+            exit code
+        
+        Raises
+        ------
+        ValueError
+            If the service name requested cannot be found.
+        CommandTimeout
+            If the command does not finish in time.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"service '{service_name}' cannot be found.")
+        if isinstance(cmd, str):
+            return self.__cmd_container_wrapper(service_name, cmd, timeout)
+        else:
+            return self.__cmd_container_wrapper(service_name, " ; ".join(cmd), timeout)
+
+def _prom_escape(value: str):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _prom_number(value: float):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _metrics_server(exporter: "PrometheusExporter", address: str, port: int):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = exporter.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    server.daemon_threads = True
+    return server
+
+class PrometheusExporter():
+    """Export the operation stats of several helpers in the Prometheus text format.
+
+    Helpers are attached with :meth:`~PrometheusExporter.attach`, after which every operation they
+    make is aggregated under the ``team``, ``service``, ``operation`` and ``backend`` labels.
+    The metrics can be scraped from :meth:`~PrometheusExporter.serve` or written for the
+    node exporter textfile collector with :meth:`~PrometheusExporter.write_textfile`.
+
+    Attributes
+    ----------
+    namespace: str
+        Prefix of every metric name.
     """
-    def __init__(self, status: str, message: str):
+    def __init__(self, namespace: str = "fulgens"):
         """Constructor.
 
         Parameters
         ----------
-        status: str
-            See the :attr:`~Verdict.status` attribute.
-        message: str
-            See the :attr:`~Verdict.message` attribute.
+        namespace: str
+            See the :attr:`~PrometheusExporter.namespace` attribute.
         """
-        self.status = status
-        self.message = message
+        self.namespace = namespace
+        self.__stats = {}
+        self.__hooks = {}
+        self.__lock = threading.Lock()
+        self.__server = None
 
-    def is_ok(self):
-        """Check is the verdict is ``OK`` or not.
+    def attach(self, helper: "ChallengeHelper", team: str | None = None):
+        """Start collecting the operations made by a helper.
+
+        Parameters
+        ----------
+        helper: fulgens.ChallengeHelper
+            Helper to collect from.
+        team: str or None
+            Value of the ``team`` label. Defaults to the helper addresses joined by commas.
+        """
+        if team is None:
+            team = ",".join(helper.addresses)
+        hook = lambda _, sample: self.observe(team, sample)
+        with self.__lock:
+            if helper in self.__hooks:
+                return
+            self.__hooks[helper] = hook
+        helper.add_stats_hook(hook)
+
+    def detach(self, helper: "ChallengeHelper"):
+        """Stop collecting the operations made by a helper. Collected metrics are kept.
+
+        Parameters
+        ----------
+        helper: fulgens.ChallengeHelper
+            Attached helper.
+        """
+        with self.__lock:
+            hook = self.__hooks.pop(helper, None)
+        if hook is not None:
+            helper.remove_stats_hook(hook)
+
+    def observe(self, team: str, sample: OperationSample):
+        """Aggregate a sample. Called by the hooks of the attached helpers.
+
+        Parameters
+        ----------
+        team: str
+            Value of the ``team`` label.
+        sample: fulgens.OperationSample
+            Sample to add.
+        """
+        key = (team, sample.service or "", sample.operation, sample.backend)
+        with self.__lock:
+            if key not in self.__stats:
+                self.__stats[key] = OperationStats()
+            self.__stats[key].add(sample)
+
+    def render(self):
+        """Render the collected metrics.
 
         Returns
         -------
-        bool
-            Whether the verdict is ``OK`` or not.
+        str
+            Metrics in the Prometheus text exposition format.
         """
-        return self.status == "OK"
+        with self.__lock:
+            stats = [(key, stats.to_dict()) for key, stats in sorted(self.__stats.items())]
+        labels = [",".join(f'{name}="{_prom_escape(value)}"' for name, value in zip(("team", "service", "operation", "backend"), key)) for key, _ in stats]
+        lines = []
+        for name, field, doc in (
+            ("operations_total", "count", "Operations made by the checker helpers."),
+            ("operation_errors_total", "errors", "Operations that raised an exception."),
+            ("process_spawns_total", "spawns", "Processes or SSH channels started."),
+            ("operation_bytes_total", "bytes", "Bytes moved by the operations."),
+        ):
+            lines.append(f"# HELP {self.namespace}_{name} {doc}")
+            lines.append(f"# TYPE {self.namespace}_{name} counter")
+            for label, (_, data) in zip(labels, stats):
+                lines.append(f"{self.namespace}_{name}{{{label}}} {data[field]}")
+        for name, field, doc in (
+            ("operation_duration_seconds", "latency", "Operation wall time."),
+            ("operation_size_bytes", "size", "Bytes moved by a single operation."),
+        ):
+            lines.append(f"# HELP {self.namespace}_{name} {doc}")
+            lines.append(f"# TYPE {self.namespace}_{name} histogram")
+            for label, (_, data) in zip(labels, stats):
+                histogram = data[field]
+                for bound, count in histogram["buckets"].items():
+                    lines.append(f'{self.namespace}_{name}_bucket{{{label},le="{_prom_number(bound)}"}} {count}')
+                lines.append(f"{self.namespace}_{name}_sum{{{label}}} {_prom_number(histogram['sum'])}")
+                lines.append(f"{self.namespace}_{name}_count{{{label}}} {histogram['count']}")
+        return "\n".join(lines) + "\n"
 
-    @classmethod
-    def OK(cls, message = ""):
-        """Create OK verdict object.
+    def write_textfile(self, path: str | pathlib.Path):
+        """Write the collected metrics for the node exporter textfile collector.
+
+        The file is replaced atomically, so the collector never reads a partial file.
 
         Parameters
         ----------
-        message: str
-            See the :attr:`~Verdict.message` attribute.
+        path: str or pathlib.Path
+            Destination file, should end with ``.prom``.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.{token_hex(4)}")
+        try:
+            tmp_path.write_text(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def serve(self, port: int = 9150, address: str = ""):
+        """Serve the collected metrics over HTTP on ``/metrics`` from a background thread.
+
+        Parameters
+        ----------
+        port: int
+            Listening port, ``0`` picks a free one.
+        address: str
+            Listening address, all interfaces by default.
 
         Returns
         -------
-        fulgens.Verdict
-            Verdict object with ``OK`` status.
+        int
+            Listening port.
         """
-        return Verdict("OK", message)
+        if self.__server is None:
+            server = _metrics_server(self, address, port)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.__server = server
+        return self.__server.server_address[1]
 
-    @classmethod
-    def FAIL(cls, message):
-        """Create FAIL verdict object.
+    def close(self):
+        """Stop the HTTP server and detach every helper."""
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+        for helper in list(self.__hooks):
+            self.detach(helper)
+
+def run_checkers(checker: Callable[[ChallengeHelper], Verdict], teams: Dict[str, dict | ChallengeHelper], max_workers: int = 16, team_timeout: float = 30.0, tick_timeout: float | None = None, exporter: PrometheusExporter | None = None):
+    """Run a checker against every team concurrently.
+
+    Each team gets its own :class:`ChallengeHelper` and runs on a bounded thread pool. A team
+    whose check runs longer than ``team_timeout`` gets a ``FAIL`` verdict, and once ``tick_timeout``
+    expires every unfinished team gets a ``FAIL`` verdict and the function returns right away.
+    The team timeout is also set as the helper :meth:`~ChallengeHelper.deadline`, so commands still
+    running when it expires are killed.
+
+    Parameters
+    ----------
+    checker: Callable[[ChallengeHelper], Verdict]
+        Checker function, e.g. ``do_check`` of the example checker.
+    teams: Dict[str, dict or ChallengeHelper]
+        Team inventory, keyed by team identifier. Values are either :class:`ChallengeHelper`
+        constructor keyword arguments or an already built helper.
+    max_workers: int
+        Maximum number of checks running at the same time.
+    team_timeout: float
+        Seconds a single team check may take, counted from when it starts.
+    tick_timeout: float or None
+        Seconds for the whole run. ``None`` waits until every team either finishes or overruns.
+    exporter: fulgens.PrometheusExporter or None
+        Exporter collecting the operations of every helper, labeled by team identifier.
+
+    Returns
+    -------
+    Dict[str, fulgens.Verdict]
+        Verdict of every team. Checks raising :class:`CommandTimeout` get a ``FAIL`` verdict and
+        checks raising any other exception get an ``ERROR`` verdict.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    started = {}
+
+    def check(team, helper):
+        started[team] = time.monotonic()
+        owned = not isinstance(helper, ChallengeHelper)
+        if owned:
+            helper = ChallengeHelper(**helper)
+        if exporter is not None:
+            exporter.attach(helper, team)
+        try:
+            with helper.deadline(team_timeout):
+                return checker(helper)
+        finally:
+            if exporter is not None and owned:
+                exporter.detach(helper)
+
+    tick_deadline = None if tick_timeout is None else time.monotonic() + tick_timeout
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(check, team, helper): team for team, helper in teams.items()}
+    pending = set(futures)
+    verdicts = {}
+    try:
+        while pending:
+            now = time.monotonic()
+            if tick_deadline is not None and now >= tick_deadline:
+                break
+            wake_at = [] if tick_deadline is None else [tick_deadline]
+            for future in list(pending):
+                team = futures[future]
+                if team not in started:
+                    # Not scheduled yet, poll until it gets a worker and its deadline starts.
+                    wake_at.append(now + 0.05)
+                elif now - started[team] >= team_timeout:
+                    verdicts[team] = Verdict.FAIL(f"check timed out after {team_timeout} seconds.")
+                    pending.discard(future)
+                else:
+                    wake_at.append(started[team] + team_timeout)
+            if not pending:
+                break
+            done, pending = wait(pending, timeout=max(min(wake_at) - now, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                team = futures[future]
+                try:
+                    verdicts[team] = future.result()
+                except CommandTimeout as ex:
+                    verdicts[team] = Verdict.FAIL(str(ex))
+                except Exception as ex:
+                    verdicts[team] = Verdict.ERROR(str(ex))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    for future in pending:
+        verdicts[futures[future]] = Verdict.FAIL("tick time budget expired.")
+    return {team: verdicts[team] for team in teams}
+
+class CheckerDaemon():
+    """Long-lived process that runs checkers on request, keeping the checkers, helpers and SSH
+    connections warm between ticks.
+
+    Jobs are sent over a unix socket as JSON objects, one per line. Each one is answered with one
+    JSON line; answers on a connection come in completion order and carry the job ``id``.
+
+    .. code-block:: text
+
+        {"id": 1, "checker": "web", "team": "team1", "timeout": 30, "helper": {"addresses": ["10.0.1.2:8080"],
+         "secret": "...", "local_challenge_dir": "/srv/web", "remote_challenge_dir": "/opt/web",
+         "ssh": {"host": "10.0.1.2", "user": "root"}}}
+        {"id": 1, "team": "team1", "status": "OK", "message": ""}
+
+    ``helper`` holds :class:`ChallengeHelper` constructor keyword arguments, except that ``ssh``
+    holds :meth:`SSHConnectionPool.connection` arguments and ``docker_api`` holds
+    :class:`DockerEngineAPI` ones for a :class:`DockerAPIBackend`. Helpers are cached per checker and arguments, so the compose
+    file is parsed and the SSH connection opened once instead of on every tick.
+
+    Attributes
+    ----------
+    checkers: Dict[str, Callable[[ChallengeHelper], Verdict]]
+        Checker functions keyed by the name used in the jobs.
+    socket_path: str
+        Path of the listening unix socket.
+    max_workers: int
+        Maximum number of checks running at the same time.
+    default_timeout: float
+        Seconds a check may take when the job has no ``timeout``.
+    max_helpers: int
+        Maximum number of cached helpers, the least recently used ones are dropped first.
+    pool: SSHConnectionPool
+        Pool of the SSH connections of the helpers.
+    exporter: PrometheusExporter or None
+        Exporter collecting the operations of every helper, labeled by the job ``team``.
+    """
+    def __init__(self, checkers: Dict[str, Callable[[ChallengeHelper], Verdict]], socket_path: str = "/run/fulgens.sock", max_workers: int = 16, default_timeout: float = 30.0, max_helpers: int = 1024, pool: SSHConnectionPool | None = None, exporter: PrometheusExporter | None = None):
+        """Constructor.
 
         Parameters
         ----------
-        message: str
-            See the :attr:`~Verdict.message` attribute.
+        checkers: Dict[str, Callable[[ChallengeHelper], Verdict]]
+            See the :attr:`~CheckerDaemon.checkers` attribute.
+        socket_path: str
+            See the :attr:`~CheckerDaemon.socket_path` attribute.
+        max_workers: int
+            See the :attr:`~CheckerDaemon.max_workers` attribute.
+        default_timeout: float
+            See the :attr:`~CheckerDaemon.default_timeout` attribute.
+        max_helpers: int
+            See the :attr:`~CheckerDaemon.max_helpers` attribute.
+        pool: SSHConnectionPool or None
+            See the :attr:`~CheckerDaemon.pool` attribute. Defaults to :meth:`SSHConnectionPool.default`.
+        exporter: PrometheusExporter or None
+            See the :attr:`~CheckerDaemon.exporter` attribute.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.checkers = checkers
+        self.socket_path = socket_path
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.max_helpers = max_helpers
+        self.pool = pool or SSHConnectionPool.default()
+        self.exporter = exporter
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__helpers = {}
+        self.__lock = threading.Lock()
+        self.__server = None
+
+    @staticmethod
+    def load_checker(spec: str):
+        """Import a checker function from a file.
+
+        Parameters
+        ----------
+        spec: str
+            ``path/to/checker.py`` or ``path/to/checker.py:function``. The function defaults to
+            ``do_check``, as in the example checker.
 
         Returns
         -------
-        fulgens.Verdict
-            Verdict object with ``FAIL`` status.
+        Callable[[ChallengeHelper], Verdict]
+            Checker function.
         """
-        return Verdict("FAIL", message)
+        import importlib.util
+        import sys
 
-    @classmethod
-    def ERROR(cls, message):
-        """Create ERROR verdict object.
+        path, _, function = spec.partition(":")
+        path = Path(path).resolve()
+        # Let the checker import the modules next to it.
+        sys.path.insert(0, str(path.parent))
+        module_spec = importlib.util.spec_from_file_location(f"fulgens_checker_{path.stem}", path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        return getattr(module, function or "do_check")
+
+    def __helper(self, checker_name: str, spec: dict, team: str | None):
+        key = (checker_name, json.dumps(spec, sort_keys=True))
+        with self.__lock:
+            helper = self.__helpers.pop(key, None)
+            if helper is not None:
+                self.__helpers[key] = helper
+                return helper
+        kwargs = dict(spec)
+        ssh = kwargs.pop("ssh", None)
+        if ssh:
+            kwargs["ssh_conn"] = self.pool.connection(**ssh)
+        docker_api = kwargs.pop("docker_api", None)
+        if docker_api is not None:
+            kwargs["backend"] = DockerAPIBackend(DockerEngineAPI(**docker_api))
+        kwargs["local_challenge_dir"] = Path(kwargs["local_challenge_dir"])
+        helper = ChallengeHelper(**kwargs)
+        if self.exporter is not None:
+            self.exporter.attach(helper, team)
+        with self.__lock:
+            self.__helpers[key] = helper
+            while len(self.__helpers) > self.max_helpers:
+                evicted = self.__helpers.pop(next(iter(self.__helpers)))
+                if self.exporter is not None:
+                    self.exporter.detach(evicted)
+        return helper
+
+    def check(self, job: dict):
+        """Run a single job in the calling thread.
 
         Parameters
         ----------
-        message: str
-            See the :attr:`~Verdict.message` attribute.
+        job: dict
+            Job, see :class:`CheckerDaemon`.
 
         Returns
         -------
         fulgens.Verdict
-            Verdict object with ``ERROR`` status.
+            Checker verdict. Checks raising :class:`CommandTimeout` get a ``FAIL`` verdict and
+            checks raising any other exception get an ``ERROR`` verdict.
         """
-        return Verdict("ERROR", message)
+        checker = self.checkers.get(job.get("checker"))
+        if checker is None:
+            return Verdict.ERROR(f"checker '{job.get('checker')}' cannot be found.")
+        try:
+            helper = self.__helper(job["checker"], job["helper"], job.get("team"))
+            with helper.deadline(job.get("timeout", self.default_timeout)):
+                verdict = checker(helper)
+        except CommandTimeout as ex:
+            return Verdict.FAIL(str(ex))
+        except Exception as ex:
+            return Verdict.ERROR(str(ex))
+        if not isinstance(verdict, Verdict):
+            return Verdict.ERROR(f"checker returned {type(verdict).__name__} instead of a Verdict.")
+        return verdict
 
-class ChallengeHelper():
+    def __run(self, job: dict, send: Callable, done: threading.Event):
+        lock = threading.Lock()
+        answered = []
+
+        def reply(verdict):
+            with lock:
+                if answered:
+                    return
+                answered.append(verdict)
+            send({"id": job.get("id"), "team": job.get("team"), **verdict.to_dict()})
+            done.set()
+
+        # A checker stuck outside of the helper calls cannot be interrupted, answer without it.
+        timeout = job.get("timeout", self.default_timeout)
+        timer = threading.Timer(timeout, reply, (Verdict.FAIL(f"check timed out after {timeout} seconds."),))
+        timer.daemon = True
+        try:
+            timer.start()
+            reply(self.check(job))
+        except Exception as ex:
+            reply(Verdict.ERROR(f"invalid job: {ex}"))
+        finally:
+            timer.cancel()
+            # The connection waits for every job, it must not hang on one that failed to answer.
+            done.set()
+
+    def __handle(self, rfile, wfile):
+        write_lock = threading.Lock()
+
+        def send(message):
+            with write_lock:
+                try:
+                    wfile.write(json.dumps(message).encode() + b"\n")
+                    wfile.flush()
+                except OSError:
+                    pass
+
+        pending = []
+        for line in rfile:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as ex:
+                send({"id": None, "status": "ERROR", "message": f"invalid job: {ex}"})
+                continue
+            if not isinstance(job, dict):
+                send({"id": None, "status": "ERROR", "message": f"invalid job: expected a JSON object, got {type(job).__name__}."})
+                continue
+            done = threading.Event()
+            pending.append(done)
+            self.__executor.submit(self.__run, job, send, done)
+        # The client may half-close after sending its jobs, answer them all before closing.
+        for done in pending:
+            done.wait()
+
+    def serve_forever(self):
+        """Listen on :attr:`~CheckerDaemon.socket_path` and run jobs until :meth:`~CheckerDaemon.shutdown` is called."""
+        import socketserver
+
+        handle = self.__handle
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                handle(self.rfile, self.wfile)
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.__server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.__server.daemon_threads = True
+        try:
+            self.__server.serve_forever()
+        finally:
+            self.__server.server_close()
+            os.remove(self.socket_path)
+
+    def shutdown(self):
+        """Stop :meth:`~CheckerDaemon.serve_forever` and the worker pool."""
+        if self.__server is not None:
+            self.__server.shutdown()
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+
+class _AsyncProcess():
+    """Command started by :class:`AsyncChallengeHelper`, either a local subprocess or an asyncssh process."""
+    def __init__(self, process: "asyncio.subprocess.Process | asyncssh.SSHClientProcess", remote: bool):
+        self.process = process
+        self.remote = remote
+        self.stdout = process.stdout
+        self.stderr = process.stderr
+
+    async def wait(self):
+        if not self.remote:
+            return await self.process.wait()
+        exit_status = (await self.process.wait()).exit_status
+        return -1 if exit_status is None else exit_status
+
+    def kill(self):
+        if self.remote:
+            # Closing the channel makes the server hang up on the command.
+            self.process.close()
+            return
+        try:
+            os.killpg(self.process.pid, 9)
+        except ProcessLookupError:
+            pass
+
+class _AsyncStreamReader(io.RawIOBase):
+    """Blocking file object over an asyncio stream, so an executor thread can consume it while the loop runs."""
+    def __init__(self, stream: "asyncio.StreamReader | asyncssh.SSHReader", loop: "asyncio.AbstractEventLoop"):
+        super().__init__()
+        self.stream = stream
+        self.loop = loop
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        import asyncio
+
+        data = asyncio.run_coroutine_threadsafe(self.stream.read(len(buffer)), self.loop).result()
+        buffer[:len(data)] = data
+        return len(data)
+
+class AsyncChallengeHelper():
     """
-    Helper for checker to get and interact with the service.
+    Asyncio counterpart of :class:`ChallengeHelper` for running commands and fetching files.
+
+    :meth:`~AsyncChallengeHelper.run` and :meth:`~AsyncChallengeHelper.fetch` are coroutines, so a
+    single event loop can drive the checks of every team at once instead of blocking a thread per call.
+    Local commands are spawned with :func:`asyncio.create_subprocess_exec`, remote commands go through
+    an `asyncssh <https://asyncssh.readthedocs.io/>`_ connection. Container IDs are cached, calls are
+    bounded by :meth:`~AsyncChallengeHelper.deadline` and measured as in :class:`ChallengeHelper`,
+    with ``asyncio`` or ``asyncssh`` as the stats backend.
 
     Attributes
     ----------
@@ -107,110 +4511,201 @@ class ChallengeHelper():
         Local challenge directory.
     remote_challenge_dir: pathlib.Path
         Remote challenge directory.
-    compose_filename: str
-        Compose filename. The default value is ``docker-compose.yml``.
-    ssh_conn: fabric.Connection or None
-        SSH connection to the server that runs the services. If ``None``, it will assume
-        that the service is in the same server as the checker, also :attr:`~ChallengeHelper.remote_challenge_dir`
-        and :attr:`~ChallengeHelper.local_challenge_dir` will have the same value.
+    services: types.MappingProxyType
+        Read-only ``services`` section of the compose file, see :func:`load_compose`.
+    ssh_conn: asyncssh.SSHClientConnection or None
+        Async SSH connection to the server that runs the services. If ``None``, it will assume
+        that the service is in the same server as the checker.
+    project_name: str
+        Compose project name.
+    container_ids: dict or None
+        Cached mapping of service name to running container ID, see :meth:`~AsyncChallengeHelper.refresh_containers`.
+        ``None`` until the first lookup.
     """
-    def __init__(self, addresses: List[str], secret: str, local_challenge_dir: str | pathlib.Path, remote_challenge_dir: str | pathlib.Path = None, compose_filename: str = "docker-compose.yml", ssh_conn: fabric.Connection | None = None):
+    def __init__(self, addresses: List[str], secret: str, local_challenge_dir: str | pathlib.Path, remote_challenge_dir: str | pathlib.Path = None, compose_filename: str = "docker-compose.yml", ssh_conn: "asyncssh.SSHClientConnection | None" = None):
         """Constructor.
 
         Parameters
         ----------
         addresses: List[str]
-            See the :attr:`~ChallengeHelper.status` attribute.
+            See the :attr:`~AsyncChallengeHelper.addresses` attribute.
         secret: str
-            See the :attr:`~ChallengeHelper.secret` attribute.
+            See the :attr:`~AsyncChallengeHelper.secret` attribute.
         local_challenge_dir: str or pathlib.Path
-            See the :attr:`~ChallengeHelper.local_challenge_dir` attribute.
+            See the :attr:`~AsyncChallengeHelper.local_challenge_dir` attribute.
         remote_challenge_dir: str or pathlib.Path
-            See the :attr:`~ChallengeHelper.remote_challenge_dir` attribute.
+            See the :attr:`~AsyncChallengeHelper.remote_challenge_dir` attribute.
         compose_filename: str
-            See the :attr:`~ChallengeHelper.compose_filename` attribute.
-        ssh_conn: fabric.Connection or None
-            See the :attr:`~ChallengeHelper.ssh_conn` attribute.
+            Compose filename. The default value is ``docker-compose.yml``.
+        ssh_conn: asyncssh.SSHClientConnection or None
+            See the :attr:`~AsyncChallengeHelper.ssh_conn` attribute.
         """
+        import contextvars
+
         self.addresses = addresses
-        self.ssh_conn = ssh_conn
         self.secret = secret
-        with open(local_challenge_dir.joinpath(compose_filename)) as compose_file:
-            compose_data = yaml.safe_load(compose_file)
-        self.services = compose_data["services"]
-
+        self.ssh_conn = ssh_conn
+        self.services, self.project_name = _compose_project(local_challenge_dir, remote_challenge_dir, compose_filename)
         self.local_chall_dir = Path(local_challenge_dir)
-
-        if ssh_conn == None:
+        if ssh_conn is None:
             self.remote_chall_dir = self.local_chall_dir
         else:
-            self.remote_chall_dir = Path(remote_challenge_dir)        
-        
-        self.compose_path = self.remote_chall_dir.joinpath(compose_filename)        
-    
+            self.remote_chall_dir = Path(remote_challenge_dir or local_challenge_dir)
+        self.compose_path = self.remote_chall_dir.joinpath(compose_filename)
+        self.container_ids = None
+        # Deadlines follow the asyncio task rather than the thread.
+        self.__deadlines = contextvars.ContextVar(f"fulgens_deadlines_{id(self)}", default=())
+        self.__stats = _StatsRecorder(self)
 
-    def __cmd_wrapper(self, real_cmd: str):
-        return_code = 0
-        if not self.ssh_conn:
-            cmd_res = subprocess.run(real_cmd, capture_output=True, shell=True)
-            return_code = cmd_res.returncode
-            return cmd_res.stdout, cmd_res.stderr, cmd_res.returncode
-        else:
-            cmd_res = self.ssh_conn.run(real_cmd, hide=True)
-            return_code = cmd_res.exited
-            return cmd_res.stdout.encode(), cmd_res.stderr.encode(), cmd_res.exited
-    
-    def __cmd_container_wrapper(self, service_name: str, cmd: str):
-        real_cmd = f"docker compose -f {self.compose_path} exec {service_name} /bin/sh -c {shlex.quote(cmd)}"
-        return self.__cmd_wrapper(real_cmd)
+    def __timeout(self, timeout: float | None = None):
+        return _remaining_timeout(self.__deadlines.get(), timeout)
 
-    def __transfer_file_wrapper(self, source: str, dest: str):
-        if not self.ssh_conn:
-            move(source, dest)
-        else:
-            self.ssh_conn.get(remote=source, local=str(dest))
-        return True
-    
-    def __transfer_folder_wrapper(self, source: str, dest: str):
-        if not self.ssh_conn:
-            move(source, dest)
-        else:
-            folder_tarname = Path("/tmp").joinpath(token_hex(8))
-            self.ssh_conn.run(f"tar -czf {folder_tarname} {source}", hide=True)
-            self.__transfer_file_wrapper(folder_tarname, folder_tarname)
-            self.ssh_conn.run(f"rm -rf {folder_tarname} {source}", hide=True)
-            
-            self.ssh_conn.local(f"tar --strip-components=1 -C /tmp -xzf {folder_tarname}", hide=True)
-            move(source, dest)
-            os.remove(folder_tarname)
-        return True
-    
-    def __dir_checker_wrapper(self, path):
-        if not self.ssh_conn:
-            return Path(path).is_dir()
-        else:
-            res = self.ssh_conn.run(f"file {path}", hide=True).stdout
-            return res.find("directory") != -1
+    @contextmanager
+    def __budget(self, timeout: float | None):
+        # One deadline for every step of a call, so retries only get the time left.
+        if timeout is None:
+            yield
+            return
+        with self.deadline(timeout):
+            yield
 
-    def __get_container_file_wrapper(self, service_name, source):
-        dest_fname = Path("/tmp").joinpath(os.path.basename(source))
-        copy_cmd = f"docker compose -f {self.compose_path} cp {service_name}:{source} {dest_fname}"
-        cmd_status = self.__cmd_wrapper(copy_cmd)
-        if cmd_status[-1] != 0:
-            raise Exception(f"failed to copy: {cmd_status[1].decode()}")
-        return dest_fname
-    
-    def fetch(self, service_name: str, source: str | pathlib.Path, dest: str | pathlib.Path):
+    def __measure(self, operation: str, service_name: str | None = None):
+        return self.__stats.measure(operation, service_name, "asyncio" if self.ssh_conn is None else "asyncssh", 1)
+
+    async def __spawn(self, args: List[str]):
+        import asyncio
+
+        if self.ssh_conn is None:
+            process = await asyncio.create_subprocess_exec(*args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True)
+            return _AsyncProcess(process, False)
+        return _AsyncProcess(await self.ssh_conn.create_process(shlex.join(args), encoding=None), True)
+
+    async def __cmd_wrapper(self, args: List[str], timeout: float | None = None, on_timeout: Callable | None = None):
+        import asyncio
+
+        process = await self.__spawn(args)
+        try:
+            stdout, stderr = await asyncio.wait_for(asyncio.gather(process.stdout.read(), process.stderr.read()), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            if on_timeout:
+                await on_timeout()
+            raise CommandTimeout(timeout) from None
+        except BaseException:
+            process.kill()
+            raise
+        return stdout, stderr, await process.wait()
+
+    async def __container(self, service_name: str):
+        if self.container_ids is None:
+            await self.refresh_containers()
+        return ContainerRef(service_name, self.container_ids.get(service_name), self.compose_path)
+
+    async def __kill_tagged(self, container: ContainerRef, token: str):
+        # Killing the docker client does not stop the process it started inside the container.
+        # It has its own timeout, the deadline of the call has expired already.
+        try:
+            with self.__measure("kill", container.service):
+                await self.__cmd_wrapper(_docker_shell_args(container, _kill_tagged_cmd(token)), _KILL_TIMEOUT)
+        except Exception:
+            # Best effort, the container may be gone already.
+            pass
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """Limit the total time of every helper call made inside the block by the current task.
+
+        Calls get the remaining time as their timeout, and raise :class:`CommandTimeout` once it is
+        used up. Deadlines nest, the earliest one wins. Tasks created inside the block inherit it.
+
+        Parameters
+        ----------
+        seconds: float
+            Time budget of the block.
+
+        Examples
+        --------
+        >>> with helper.deadline(10):
+        ...     await helper.run("web", "curl -s localhost")
+        """
+        token = self.__deadlines.set(self.__deadlines.get() + (time.monotonic() + seconds,))
+        try:
+            yield
+        finally:
+            self.__deadlines.reset(token)
+
+    def stats(self):
+        """Get the latency and throughput statistics of the operations made by this helper.
+
+        Returns
+        -------
+        Dict[Tuple[str, str or None, str], dict]
+            See :meth:`ChallengeHelper.stats`.
+        """
+        return self.__stats.to_dict()
+
+    def add_stats_hook(self, hook: Callable[["AsyncChallengeHelper", OperationSample], None]):
+        """Register a function called with every operation sample, see :meth:`ChallengeHelper.add_stats_hook`.
+
+        Parameters
+        ----------
+        hook: Callable[[AsyncChallengeHelper, OperationSample], None]
+            Function receiving the helper and the :class:`OperationSample`.
+        """
+        self.__stats.add_hook(hook)
+
+    def remove_stats_hook(self, hook: Callable[["AsyncChallengeHelper", OperationSample], None]):
+        """Unregister a function added with :meth:`~AsyncChallengeHelper.add_stats_hook`.
+
+        Parameters
+        ----------
+        hook: Callable[[AsyncChallengeHelper, OperationSample], None]
+            Registered function.
+        """
+        self.__stats.remove_hook(hook)
+
+    async def refresh_containers(self):
+        """Resolve and cache the container ID of every running service, see :meth:`ChallengeHelper.refresh_containers`.
+
+        Returns
+        -------
+        dict
+            Mapping of service name to container ID.
+
+        Raises
+        ------
+        IOError
+            If the running containers cannot be listed.
+        """
+        with self.__measure("ps"):
+            stdout, stderr, exit_code = await self.__cmd_wrapper(["docker", "compose", "-f", str(self.compose_path), "ps", "--format", "json"], self.__timeout())
+        if exit_code != 0:
+            raise IOError(f"failed to list containers: {stderr.decode()}")
+        self.container_ids = _parse_compose_ps(stdout)
+        return self.container_ids
+
+    def invalidate_containers(self):
+        """Drop the cached container IDs so the next call resolves them again."""
+        self.container_ids = None
+
+    async def fetch(self, service_name: str, source: str | pathlib.Path, dest: str | pathlib.Path, timeout: float | None = None):
         """Fetch file/folder from the remote service container to the local filesystem.
 
+        The container path is streamed as a tar archive over a single command and extracted in an
+        executor thread while it arrives, so neither the whole archive is held in memory nor the
+        event loop blocked, and no temporary file is left on the remote server.
+
         Parameters
         ----------
         service_name: str
             Service name.
         source: str | pathlib.Path
-            Service container path file. 
+            Service container path file.
         dest: str | pathlib.Path
             Local filesystem path.
+        timeout: float or None
+            Maximum seconds for the transfer, also bounded by :meth:`~AsyncChallengeHelper.deadline`.
 
         Returns
         -------
@@ -223,17 +4718,57 @@ class ChallengeHelper():
             If the service name requested cannot be found.
         IOError
             If there is something wrong with the file transfer or modification.
+        CommandTimeout
+            If the transfer does not finish in time.
         """
+        import asyncio
+
         if service_name not in self.services:
             raise ValueError(f"service '{service_name}' cannot be found.")
-        
-        container_fname = self.__get_container_file_wrapper(service_name, source)
-        if self.__dir_checker_wrapper(container_fname):
-            return self.__transfer_folder_wrapper(container_fname, dest)
-        else:
-            return self.__transfer_file_wrapper(container_fname, dest)
+        loop = asyncio.get_running_loop()
+        with self.__budget(timeout):
+            for retry in (True, False):
+                container = await self.__container(service_name)
+                timeout = self.__timeout()
+                with self.__measure("fetch", service_name) as sample:
+                    process = await self.__spawn(_docker_cp_args(container, source, "-"))
+                    stream = _CountingReader(io.BufferedReader(_AsyncStreamReader(process.stdout, loop), 1024 * 1024))
+                    stderr = asyncio.ensure_future(process.stderr.read())
+                    extract = loop.run_in_executor(None, _extract_tar_stream, stream, source, dest)
+                    error = None
+                    try:
+                        fetched = await asyncio.wait_for(asyncio.shield(extract), timeout)
+                    except asyncio.TimeoutError:
+                        # The extractor thread sees the end of the stream once the copy is killed.
+                        process.kill()
+                        await asyncio.gather(extract, stderr, return_exceptions=True)
+                        await process.wait()
+                        raise CommandTimeout(timeout) from None
+                    except BaseException as ex:
+                        if not process.stdout.at_eof():
+                            process.kill()
+                        await asyncio.gather(extract, return_exceptions=True)
+                        if not isinstance(ex, Exception):
+                            raise
+                        error = ex
+                    finally:
+                        sample.bytes = stream.bytes_read
+                    if error is None:
+                        # The tar reader stops at the end-of-archive marker, drain the padding behind it.
+                        await process.stdout.read()
+                    exit_code = await process.wait()
+                    stderr = await stderr
+                if exit_code == 0 and error is None:
+                    return fetched
+                if retry and container.id and _STALE_CONTAINER_RE.search(stderr):
+                    self.invalidate_containers()
+                    continue
+                if exit_code != 0:
+                    raise IOError(f"failed to copy: {stderr.decode()}") from error
+                raise error
 
-    def run(self, service_name: str, cmd: List[str] | str):
+
+    async def run(self, service_name: str, cmd: List[str] | str, timeout: float | None = None):
         """Run shell commands inside the service container.
 
         Parameters
@@ -242,6 +4777,9 @@ class ChallengeHelper():
             Service name.
         cmd: List[str] or str
             Command to be executed.
+        timeout: float or None
+            Maximum seconds to wait for the command, also bounded by :meth:`~AsyncChallengeHelper.deadline`.
+            On expiry the command is killed, both the docker client and the process inside the container.
 
         Returns
         -------
@@ -251,15 +4789,87 @@ class ChallengeHelper():
             Standard error.
         int
             exit code
-        
+
         Raises
         ------
         ValueError
             If the service name requested cannot be found.
+        CommandTimeout
+            If the command does not finish in time.
         """
         if service_name not in self.services:
             raise ValueError(f"service '{service_name}' cannot be found.")
-        if isinstance(cmd, str):
-            return self.__cmd_container_wrapper(service_name, cmd)
-        else:
-            return self.__cmd_container_wrapper(service_name, " ; ".join(cmd))
+        if not isinstance(cmd, str):
+            cmd = " ; ".join(cmd)
+        token = token_hex(8)
+        with self.__budget(timeout):
+            for retry in (True, False):
+                container = await self.__container(service_name)
+                timeout = self.__timeout()
+                env = None if timeout is None else {_CALL_ENV: token}
+                on_timeout = lambda: self.__kill_tagged(container, token)
+                with self.__measure("run", service_name) as sample:
+                    result = await self.__cmd_wrapper(_docker_shell_args(container, cmd, env), timeout, on_timeout)
+                    sample.bytes = len(result[0]) + len(result[1])
+                # A recreated container gets a new ID, so re-resolve once when the cached one is gone.
+                if retry and container.id and result[-1] != 0 and _STALE_CONTAINER_RE.search(result[1]):
+                    self.invalidate_containers()
+                    continue
+                return result
+
+
+def main(argv: List[str] | None = None):
+    """Command line entry point.
+
+    ``fulgens serve NAME=CHECKER.py[:FUNCTION] ...`` runs a :class:`CheckerDaemon`, and
+    ``fulgens check`` sends the jobs read from standard input to it and prints the answers.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="fulgens", description="COMPFEST Attack-and-Defense CTF challenge checker helper")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the checker daemon")
+    serve.add_argument("checkers", nargs="+", metavar="NAME=CHECKER.py[:FUNCTION]", help="checkers to preload, the function defaults to do_check")
+    serve.add_argument("--socket", default="/run/fulgens.sock", help="listening unix socket")
+    serve.add_argument("--workers", type=int, default=16, help="maximum number of checks running at the same time")
+    serve.add_argument("--timeout", type=float, default=30.0, help="seconds a check may take when the job has no timeout")
+    serve.add_argument("--metrics-port", type=int, help="serve Prometheus metrics of the helpers on this port")
+    check = commands.add_parser("check", help="send the JSON jobs read from stdin, one per line, to the daemon")
+    check.add_argument("--socket", default="/run/fulgens.sock", help="daemon unix socket")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        import signal
+
+        checkers = {}
+        for spec in args.checkers:
+            name, sep, path = spec.partition("=")
+            if not sep:
+                parser.error(f"checker '{spec}' is not NAME=CHECKER.py[:FUNCTION].")
+            checkers[name] = CheckerDaemon.load_checker(path)
+        exporter = None
+        if args.metrics_port is not None:
+            exporter = PrometheusExporter()
+            exporter.serve(args.metrics_port)
+        daemon = CheckerDaemon(checkers, args.socket, args.workers, args.timeout, exporter=exporter)
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=daemon.shutdown).start())
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        import sys
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(args.socket)
+            sock.sendall(sys.stdin.buffer.read())
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile("rb") as answers:
+                for answer in answers:
+                    sys.stdout.buffer.write(answer)
+                    sys.stdout.flush()
+
+if __name__ == "__main__":
+    # Checkers import ``fulgens``, run its main so that they share the Verdict class with the daemon.
+    import fulgens
+    fulgens.main()
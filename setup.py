@@ -8,4 +8,6 @@ if __name__ == "__main__":
         author='CTF COMPFEST',
         py_modules=["fulgens"],
         install_requires=["fabric (>3.0, <4.0)", "PyYAML (>5.0, <7.0)"],
+        extras_require={"async": ["asyncssh (>=2.0, <3.0)"], "numpy": ["numpy (>=1.20)"]},
+        entry_points={"console_scripts": ["fulgens=fulgens:main"]},
     )
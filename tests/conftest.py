@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR.joinpath("benchmarks")))
+
+import fulgens
+from fake_docker_api import FakeDockerEngine
+from ssh_server import SSHServer
+
+FAKE_DOCKER = ROOT_DIR.joinpath("benchmarks", "fake_docker.py")
+
+class FakeDocker():
+    """Handle on the state of the fake ``docker`` CLI, see ``benchmarks/fake_docker.py``."""
+    def __init__(self, state_dir: Path):
+        self.state_dir = state_dir
+        self.generation = 0
+        self.set_services(["web", "db"])
+        self.recreate()
+
+    def set_services(self, services: list):
+        self.state_dir.joinpath("services").write_text("\n".join(services) + "\n")
+
+    def recreate(self):
+        """Give every container a new ID, so the cached ones become stale."""
+        self.generation += 1
+        self.state_dir.joinpath("generation").write_text(f"{self.generation}\n")
+
+def wait_for(predicate, timeout: float = 5.0):
+    """Poll until ``predicate`` holds, for effects of a kill that finish after the call returned."""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+def is_dead(pid: int):
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            return file.read().rpartition(")")[2].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+@pytest.fixture
+def docker(tmp_path, monkeypatch):
+    bin_dir = tmp_path.joinpath("bin")
+    bin_dir.mkdir()
+    wrapper = bin_dir.joinpath("docker")
+    wrapper.write_text(f"#!/bin/sh\nexec {sys.executable} {FAKE_DOCKER} \"$@\"\n")
+    wrapper.chmod(0o755)
+    state_dir = tmp_path.joinpath("docker-state")
+    state_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_DOCKER_STATE", str(state_dir))
+    return FakeDocker(state_dir)
+
+@pytest.fixture
+def chall_dir(tmp_path):
+    chall_dir = tmp_path.joinpath("chall")
+    chall_dir.mkdir()
+    chall_dir.joinpath("docker-compose.yml").write_text("services:\n  web:\n    image: web\n  db:\n    image: db\n")
+    return chall_dir
+
+@pytest.fixture
+def helper(docker, chall_dir):
+    return fulgens.ChallengeHelper(["127.0.0.1"], "secret", chall_dir)
+
+@pytest.fixture
+def engine():
+    # Unix socket paths are limited to about 100 bytes, too short for the pytest tmp_path.
+    with tempfile.TemporaryDirectory(prefix="fulgens-") as socket_dir:
+        engine = FakeDockerEngine(os.path.join(socket_dir, "docker.sock"), "chall", ["web", "db"])
+        yield engine
+        engine.close()
+
+@pytest.fixture
+def ssh_server(tmp_path):
+    server = SSHServer(str(tmp_path.joinpath("remote")))
+    yield server
+    server.close()
+
+@pytest.fixture
+def pool(ssh_server):
+    pool = fulgens.SSHConnectionPool(connect_kwargs=ssh_server.connect_kwargs())
+    yield pool
+    pool.close()
@@ -0,0 +1,217 @@
+"""Stand-in for the Docker Engine API on a unix socket, used by the tests.
+
+As with ``benchmarks/fake_docker.py``, containers share the host filesystem and exec'd commands run on
+the host. Only the endpoints used by :class:`fulgens.DockerEngineAPI` are served.
+"""
+import base64
+import http.server
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import tarfile
+import threading
+import urllib.parse
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    block_on_close = False
+
+class FakeDockerEngine():
+    """Fake engine serving the containers of one compose project.
+
+    Attributes
+    ----------
+    socket_path: str
+        Path of the unix socket.
+    project: str
+        Compose project name put in the container labels.
+    services: List[str]
+        Running services.
+    generation: int
+        Part of every container ID, bump it to recreate the containers.
+    connections: int
+        Connections accepted so far.
+    frame_size: int
+        Largest payload of a multiplexed exec output frame.
+    """
+    def __init__(self, socket_path: str, project: str, services: list):
+        self.socket_path = socket_path
+        self.project = project
+        self.services = list(services)
+        self.generation = 0
+        self.connections = 0
+        self.frame_size = 4096
+        self.__execs = {}
+        self.__lock = threading.Lock()
+        engine = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                engine._accepted()
+
+            def log_message(self, *args):
+                pass
+
+            def address_string(self):
+                return "unix"
+
+            def do_GET(self):
+                engine._dispatch(self)
+
+            def do_HEAD(self):
+                engine._dispatch(self)
+
+            def do_POST(self):
+                engine._dispatch(self)
+
+        self.__server = _Server(socket_path, Handler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, args=(0.05,), daemon=True)
+        self.__thread.start()
+
+    def _accepted(self):
+        with self.__lock:
+            self.connections += 1
+
+    def close(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        os.remove(self.socket_path)
+
+    def container_id(self, service: str):
+        return f"api_{service}_{self.generation}"
+
+    def __service_of(self, container_id: str):
+        for service in self.services:
+            if container_id == self.container_id(service):
+                return service
+        return None
+
+    @staticmethod
+    def __send(handler, status: int, body: bytes = b"", headers: dict | None = None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if handler.command != "HEAD":
+            handler.wfile.write(body)
+
+    def __json(self, handler, obj, status: int = 200):
+        self.__send(handler, status, json.dumps(obj).encode(), {"Content-Type": "application/json"})
+
+    def _dispatch(self, handler):
+        url = urllib.parse.urlparse(handler.path)
+        query = urllib.parse.parse_qs(url.query)
+        parts = url.path.split("/")[2:]
+        length = int(handler.headers.get("Content-Length", 0))
+        body = json.loads(handler.rfile.read(length)) if length else None
+
+        if parts == ["containers", "json"]:
+            filters = json.loads(query["filters"][0])
+            if f"com.docker.compose.project={self.project}" not in filters["label"]:
+                return self.__json(handler, [])
+            return self.__json(handler, [
+                {"Id": self.container_id(service), "Labels": {"com.docker.compose.project": self.project, "com.docker.compose.service": service}}
+                for service in self.services
+            ])
+        if parts[0] == "exec" and parts[2] == "start":
+            return self.__start_exec(handler, parts[1])
+        if parts[0] == "exec" and parts[2] == "json":
+            exit_code = self.__execs[parts[1]]["ExitCode"]
+            return self.__json(handler, {"Running": exit_code is None, "ExitCode": exit_code})
+        if parts[0] == "containers" and self.__service_of(parts[1]) is None:
+            return self.__json(handler, {"message": f"No such container: {parts[1]}"}, 404)
+        if parts[2] == "exec":
+            with self.__lock:
+                exec_id = f"exec{len(self.__execs)}"
+                self.__execs[exec_id] = {"Config": body, "ExitCode": None}
+            return self.__json(handler, {"Id": exec_id}, 201)
+        if parts[2] == "archive":
+            return self.__archive(handler, query["path"][0])
+        self.__json(handler, {"message": "page not found"}, 404)
+
+    def __start_exec(self, handler, exec_id: str):
+        config = self.__execs[exec_id]["Config"]
+        env = dict(os.environ, **dict(item.split("=", 1) for item in config["Env"]))
+        if handler.headers.get("Upgrade") == "tcp":
+            return self.__attach_exec(handler, exec_id, config, env)
+        result = subprocess.run(config["Cmd"], capture_output=True, env=env)
+        self.__execs[exec_id]["ExitCode"] = result.returncode
+        # The real engine hijacks the connection for the raw stream and closes it at the end.
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        for stream, data in ((1, result.stdout), (2, result.stderr)):
+            for start in range(0, len(data), self.frame_size):
+                chunk = data[start:start + self.frame_size]
+                handler.wfile.write(struct.pack(">BxxxI", stream, len(chunk)) + chunk)
+        handler.close_connection = True
+
+    def __attach_exec(self, handler, exec_id: str, config: dict, env: dict):
+        # Hijacked connection: stdin is read from the socket until the client shuts its side down.
+        stdin = subprocess.PIPE if config.get("AttachStdin") else subprocess.DEVNULL
+        process = subprocess.Popen(config["Cmd"], stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, start_new_session=True)
+        handler.send_response(101, "UPGRADED")
+        handler.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        handler.send_header("Connection", "Upgrade")
+        handler.send_header("Upgrade", "tcp")
+        handler.end_headers()
+        handler.wfile.flush()
+        lock = threading.Lock()
+
+        def pump_stdin():
+            try:
+                for data in iter(lambda: handler.rfile.read1(65536), b""):
+                    process.stdin.write(data)
+                    process.stdin.flush()
+            except OSError:
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        def pump_output(pipe, stream):
+            for data in iter(lambda: pipe.read1(self.frame_size), b""):
+                try:
+                    with lock:
+                        handler.wfile.write(struct.pack(">BxxxI", stream, len(data)) + data)
+                        handler.wfile.flush()
+                except OSError:
+                    # The client detached, the command keeps running as with the real engine.
+                    pass
+
+        if process.stdin is not None:
+            threading.Thread(target=pump_stdin, daemon=True).start()
+        pumps = [threading.Thread(target=pump_output, args=(pipe, stream), daemon=True) for pipe, stream in ((process.stdout, 1), (process.stderr, 2))]
+        for thread in pumps:
+            thread.start()
+        for thread in pumps:
+            thread.join()
+        self.__execs[exec_id]["ExitCode"] = process.wait()
+        # Wake the stdin pump up, so the handler can close the connection.
+        handler.connection.shutdown(socket.SHUT_RDWR)
+        handler.close_connection = True
+
+    def __archive(self, handler, path: str):
+        if not os.path.lexists(path):
+            return self.__json(handler, {"message": f"Could not find the file {path} in container"}, 404)
+        if handler.command == "HEAD":
+            st = os.lstat(path)
+            # Go's os.FileMode keeps the permission bits and flags the type in the high bits.
+            mode = (st.st_mode & 0o777) | ((1 << 31) if os.path.isdir(path) else 0)
+            path_stat = {"name": os.path.basename(path), "size": st.st_size, "mode": mode, "mtime": "", "linkTarget": ""}
+            return self.__send(handler, 200, headers={"X-Docker-Container-Path-Stat": base64.b64encode(json.dumps(path_stat).encode()).decode()})
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            tar.add(path, arcname=os.path.basename(path.rstrip("/")))
+        self.__send(handler, 200, buf.getvalue(), {"Content-Type": "application/x-tar"})
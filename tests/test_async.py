@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import fulgens
+from conftest import is_dead, wait_for
+
+@pytest.fixture
+def async_helper(docker, chall_dir):
+    return fulgens.AsyncChallengeHelper(["127.0.0.1"], "secret", chall_dir)
+
+def test_run(async_helper):
+    assert asyncio.run(async_helper.run("web", ["echo hi", "echo err >&2"])) == (b"hi\n", b"err\n", 0)
+    assert async_helper.stats()[("run", "web", "asyncio")]["count"] == 1
+
+def test_run_concurrently(async_helper):
+    async def main():
+        return await asyncio.gather(*(async_helper.run("web", f"sleep 0.3; echo {i}") for i in range(5)))
+    assert [result[0] for result in asyncio.run(main())] == [f"{i}\n".encode() for i in range(5)]
+
+def test_fetch(async_helper, tmp_path):
+    source = tmp_path.joinpath("app")
+    source.mkdir()
+    source.joinpath("main.py").write_bytes(b"x" * (1024 * 1024))
+    dest = tmp_path.joinpath("dest")
+    assert asyncio.run(async_helper.fetch("web", str(source), dest))
+    assert dest.joinpath("main.py").read_bytes() == b"x" * (1024 * 1024)
+    with pytest.raises(IOError):
+        asyncio.run(async_helper.fetch("web", str(tmp_path.joinpath("missing")), dest))
+
+def test_deadline_kills_the_command_inside_the_container(async_helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    async def main():
+        with async_helper.deadline(0.5):
+            await async_helper.run("web", f"sleep 30 & echo $! > {pid_file}; wait")
+    with pytest.raises(fulgens.CommandTimeout):
+        asyncio.run(main())
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
+    assert async_helper.stats()[("kill", "web", "asyncio")]["errors"] == 0
+
+def test_fetch_timeout(async_helper, tmp_path, monkeypatch):
+    tmp_path.joinpath("file").write_bytes(b"data")
+    monkeypatch.setenv("FAKE_DOCKER_CP_DELAY", "30")
+    with pytest.raises(fulgens.CommandTimeout):
+        asyncio.run(async_helper.fetch("web", str(tmp_path.joinpath("file")), tmp_path.joinpath("dest"), timeout=0.5))
+
+def test_retries_recreated_containers(docker, async_helper, tmp_path):
+    asyncio.run(async_helper.refresh_containers())
+    docker.recreate()
+    assert asyncio.run(async_helper.run("web", "echo again")) == (b"again\n", b"", 0)
+    docker.recreate()
+    tmp_path.joinpath("file").write_bytes(b"data")
+    assert asyncio.run(async_helper.fetch("web", str(tmp_path.joinpath("file")), tmp_path.joinpath("dest")))
+    assert tmp_path.joinpath("dest").read_bytes() == b"data"
+
+def test_setup_matches_the_sync_helper(async_helper, helper):
+    assert async_helper.services == helper.services
+    assert async_helper.project_name == helper.project_name == "chall"
+    samples = []
+    def hook(helper, sample):
+        samples.append(sample)
+    async_helper.add_stats_hook(hook)
+    asyncio.run(async_helper.run("web", "true"))
+    async_helper.remove_stats_hook(hook)
+    asyncio.run(async_helper.run("web", "true"))
+    assert [sample.operation for sample in samples] == ["ps", "run"]
+
+def test_retry_gets_what_is_left_of_the_timeout(async_helper, docker, monkeypatch):
+    async def main():
+        await async_helper.refresh_containers()
+        docker.recreate()
+        monkeypatch.setenv("FAKE_DOCKER_LATENCY", "0.3")
+        await async_helper.run("web", "sleep 0.6", timeout=1.0)
+    with pytest.raises(fulgens.CommandTimeout):
+        asyncio.run(main())
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import fulgens
+from conftest import is_dead, wait_for
+
+@pytest.fixture
+def api_helper(engine, chall_dir):
+    backend = fulgens.DockerAPIBackend(fulgens.DockerEngineAPI(engine.socket_path))
+    return fulgens.ChallengeHelper(["127.0.0.1"], "secret", chall_dir, backend=backend)
+
+def test_docker_api_backend_needs_no_server_shell():
+    backend = fulgens.DockerAPIBackend(fulgens.DockerEngineAPI())
+    assert not isinstance(backend, fulgens.ShellBackend)
+    assert backend.stream_fetch
+    for name in ("spawn", "exec", "copy_out", "stat", "is_dir", "container_copy"):
+        assert not hasattr(backend, name)
+
+def test_helper_run_and_run_steps(api_helper):
+    assert api_helper.run("web", "echo hi; echo err >&2") == (b"hi\n", b"err\n", 0)
+    steps = api_helper.run_steps("web", ["echo one", "exit 5"])
+    assert [tuple(step) for step in steps] == [(b"one\n", b"", 0), (b"", b"", 5)]
+    results = api_helper.run_many({"web": "echo web", "db": "echo db"})
+    assert results == {"web": (b"web\n", b"", 0), "db": (b"db\n", b"", 0)}
+    assert api_helper.stats()[("run", "web", "docker_api")]["spawns"] == 0
+
+def test_helper_read_and_fetch(api_helper, tmp_path):
+    source = tmp_path.joinpath("app")
+    source.joinpath("static").mkdir(parents=True)
+    source.joinpath("static", "index.html").write_bytes(b"<h1>hi</h1>\n")
+    source.joinpath("flag").write_bytes(b"FLAG\n")
+    os.symlink("/etc/hostname", source.joinpath("hostname"))
+    assert api_helper.read("web", str(source.joinpath("flag"))) == b"FLAG\n"
+    dest = tmp_path.joinpath("dest")
+    assert api_helper.fetch("web", str(source), dest)
+    assert dest.joinpath("static", "index.html").read_bytes() == b"<h1>hi</h1>\n"
+    assert os.readlink(dest.joinpath("hostname")) == "/etc/hostname"
+    with pytest.raises(IOError):
+        api_helper.read("web", str(source.joinpath("missing")))
+
+def test_helper_session(api_helper):
+    with api_helper.session("web") as session:
+        assert session.run("echo hi") == (b"hi\n", b"", 0)
+        assert session.run(["echo out", "echo err >&2", "exit 3"]) == (b"out\n", b"err\n", 3)
+        assert session.run("printf '\\000\\377'") == (b"\x00\xff", b"", 0)
+    assert api_helper.stats()[("session", "web", "docker_api")]["count"] == 1
+
+def test_helper_session_timeout_kills_the_command(api_helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    with api_helper.session("web") as session:
+        with pytest.raises(fulgens.CommandTimeout):
+            session.run(f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5)
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
+
+def test_helper_stream(api_helper, tmp_path):
+    with api_helper.stream("web", "echo one; echo two; exit 4", lines=True) as output:
+        assert list(output) == [b"one\n", b"two\n"]
+    assert output.exit_code == 4
+    pid_file = tmp_path.joinpath("pid")
+    with api_helper.stream("web", f"sleep 30 & echo $! > {pid_file}; echo ready; wait", lines=True) as output:
+        assert next(output) == b"ready\n"
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
+
+def test_helper_retries_recreated_containers(engine, api_helper, tmp_path):
+    api_helper.refresh_containers()
+    engine.generation += 1
+    assert api_helper.run("web", "echo again") == (b"again\n", b"", 0)
+    assert api_helper.container_ids["web"] == "api_web_1"
+    engine.generation += 1
+    tmp_path.joinpath("flag").write_bytes(b"FLAG\n")
+    assert api_helper.read("web", str(tmp_path.joinpath("flag"))) == b"FLAG\n"
+
+def test_helper_timeout(api_helper):
+    with pytest.raises(fulgens.CommandTimeout):
+        api_helper.run("web", "sleep 5", timeout=0.3)
+
+def test_helper_unknown_container(engine, api_helper):
+    engine.services = ["db"]
+    with pytest.raises(ValueError, match="no running container"):
+        api_helper.run("web", "true")
+
+def test_fake_backend_read_and_fetch_under_a_deadline(chall_dir, tmp_path):
+    backend = fulgens.FakeBackend({"/srv/flag": b"FLAG\n", "/srv/app/main.py": b"print()\n"})
+    helper = fulgens.ChallengeHelper(["127.0.0.1"], "secret", chall_dir, backend=backend)
+    with helper.deadline(10):
+        assert helper.read("web", "/srv/flag") == b"FLAG\n"
+        assert helper.fetch("web", "/srv/app", tmp_path.joinpath("app"))
+    assert tmp_path.joinpath("app", "main.py").read_bytes() == b"print()\n"
@@ -0,0 +1,62 @@
+import hashlib
+
+import pytest
+
+import fulgens
+
+def sha256(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path.joinpath("root")
+    root.joinpath("sub").mkdir(parents=True)
+    root.joinpath("plain.txt").write_bytes(b"plain")
+    root.joinpath("back\\slash").write_bytes(b"backslash")
+    root.joinpath("new\nline").write_bytes(b"newline")
+    root.joinpath("sub", "deep.py").write_bytes(b"deep")
+    return root
+
+def test_unescape_sha256sum():
+    assert fulgens._unescape_sha256sum("\\abc  ./a\\nb\\\\c") == "abc  ./a\nb\\c"
+
+def test_manifest_with_escaped_names(helper, root):
+    manifest = helper.manifest("web", str(root))
+    assert {path: entry["sha256"] for path, entry in manifest.items()} == {
+        "plain.txt": sha256(b"plain"),
+        "back\\slash": sha256(b"backslash"),
+        "new\nline": sha256(b"newline"),
+        "sub/deep.py": sha256(b"deep"),
+    }
+    assert manifest["plain.txt"]["size"] == 5
+
+def test_manifest_filters(helper, root):
+    assert list(helper.manifest("web", str(root), include=["sub/*"])) == ["sub/deep.py"]
+    assert "sub/deep.py" not in helper.manifest("web", str(root), exclude=["sub/*"])
+
+def test_checksum(helper, root):
+    paths = [str(root.joinpath("new\nline")), str(root.joinpath("sub")), str(root.joinpath("missing"))]
+    checksums = helper.checksum("web", paths)
+    assert checksums[paths[0]]["sha256"] == sha256(b"newline")
+    assert checksums[paths[1]] is None and checksums[paths[2]] is None
+
+def test_cached_fetch_with_escaped_names(helper, root, tmp_path):
+    helper.fetch_cache = fulgens.FetchCache(tmp_path.joinpath("cache"))
+    dest = tmp_path.joinpath("dest")
+    for _ in range(2):
+        assert helper.fetch("web", str(root), dest)
+    assert helper.stats()[("fetch", "web", "local")]["count"] == 1
+    assert dest.joinpath("new\nline").read_bytes() == b"newline"
+    assert dest.joinpath("back\\slash").read_bytes() == b"backslash"
+
+def test_columnar_manifest_matches_dict_manifest(helper, root):
+    pytest.importorskip("numpy")
+    baseline = fulgens.ManifestBaseline(helper.manifest("web", str(root)))
+    columnar = fulgens.ManifestBaseline(helper.manifest("web", str(root), columnar=True))
+    root.joinpath("plain.txt").write_bytes(b"changed")
+    root.joinpath("sub", "deep.py").unlink()
+    root.joinpath("added").write_bytes(b"added")
+    diff = baseline.compare(helper.manifest("web", str(root)))
+    columnar_diff = columnar.compare(helper.manifest("web", str(root), columnar=True))
+    assert (diff.added, diff.removed, diff.modified) == (["added"], ["sub/deep.py"], ["plain.txt"])
+    assert (columnar_diff.added, columnar_diff.removed, columnar_diff.modified) == (diff.added, diff.removed, diff.modified)
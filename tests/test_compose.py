@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import fulgens
+
+COMPOSE = "services:\n  web:\n    image: web\n    ports: ['80:80']\n"
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    fulgens.clear_compose_cache()
+    yield
+    fulgens.clear_compose_cache()
+
+def test_model_is_read_only(tmp_path):
+    path = tmp_path.joinpath("docker-compose.yml")
+    path.write_text(COMPOSE)
+    model = fulgens.load_compose(path)
+    assert model["services"]["web"]["ports"] == ("80:80",)
+    with pytest.raises(TypeError):
+        model["services"]["db"] = {}
+
+def test_unchanged_file_is_not_read_again(tmp_path, monkeypatch):
+    path = tmp_path.joinpath("docker-compose.yml")
+    path.write_text(COMPOSE)
+    model = fulgens.load_compose(path)
+    monkeypatch.setattr(fulgens, "open", lambda *args, **kwargs: pytest.fail("compose file read again"), raising=False)
+    assert fulgens.load_compose(str(path)) is model
+
+def test_same_content_shares_the_model(tmp_path):
+    paths = [tmp_path.joinpath(name, "docker-compose.yml") for name in ("chall1", "chall2")]
+    for path in paths:
+        path.parent.mkdir()
+        path.write_text(COMPOSE)
+    first, second = (fulgens.load_compose(path) for path in paths)
+    assert first is second
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = tmp_path.joinpath("docker-compose.yml")
+    path.write_text(COMPOSE)
+    model = fulgens.load_compose(path)
+    path.write_text(COMPOSE + "  db:\n    image: db\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert set(fulgens.load_compose(path)["services"]) == {"web", "db"}
+    assert set(model["services"]) == {"web"}
+
+def test_helpers_share_the_services(chall_dir):
+    first = fulgens.ChallengeHelper(["10.0.0.1"], "secret1", chall_dir)
+    second = fulgens.ChallengeHelper(["10.0.0.2"], "secret2", chall_dir)
+    assert first.services is second.services
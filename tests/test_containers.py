@@ -0,0 +1,36 @@
+import pytest
+
+import fulgens
+
+def test_run_uses_the_cached_container_id(helper, docker):
+    assert helper.refresh_containers() == {"web": "fake_web_1", "db": "fake_db_1"}
+    assert helper.run("web", "echo hi") == (b"hi\n", b"", 0)
+    assert helper.stats()[("ps", None, "local")]["count"] == 1
+
+def test_run_retries_once_after_the_container_was_recreated(helper, docker):
+    helper.refresh_containers()
+    docker.recreate()
+    assert helper.run("web", "echo hi") == (b"hi\n", b"", 0)
+    assert helper.container_ids == {"web": "fake_web_2", "db": "fake_db_2"}
+    assert helper.stats()[("ps", None, "local")]["count"] == 2
+
+def test_stopped_service_falls_back_to_compose(helper, docker):
+    docker.set_services(["db"])
+    helper.refresh_containers()
+    assert "web" not in helper.container_ids
+    stdout, stderr, exit_code = helper.run("web", "true")
+    assert exit_code != 0 and b"is not running" in stderr
+
+@pytest.mark.parametrize("stderr", [
+    b"Error response from daemon: No such container: abc\n",
+    b"Error response from daemon: Container abc is not running\n",
+    b"Error response from daemon: container abc is not running\n",
+    b"Error: No such container: abc\n",
+])
+def test_stale_container_messages(stderr):
+    with pytest.raises(fulgens.StaleContainerError):
+        fulgens._check_stale(fulgens.ContainerRef("web", "abc", None), (b"", stderr, 1))
+
+def test_missing_path_is_not_a_stale_container():
+    result = (b"", b"Error response from daemon: No such container:path: abc:/missing\n", 1)
+    assert fulgens._check_stale(fulgens.ContainerRef("web", "abc", None), result) == result
@@ -0,0 +1,73 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+import fulgens
+from conftest import wait_for
+
+helpers = []
+
+def check_web(helper):
+    helpers.append(helper)
+    stdout, _, _ = helper.run("web", "echo up")
+    return fulgens.Verdict.OK(stdout.decode().strip())
+
+def check_slow(helper):
+    time.sleep(2)
+    return fulgens.Verdict.OK()
+
+def check_broken(helper):
+    raise RuntimeError("checker bug")
+
+@pytest.fixture
+def daemon(docker):
+    with tempfile.TemporaryDirectory(prefix="fulgens-") as socket_dir:
+        checkers = {"web": check_web, "slow": check_slow, "broken": check_broken}
+        daemon = fulgens.CheckerDaemon(checkers, os.path.join(socket_dir, "daemon.sock"), pool=fulgens.SSHConnectionPool())
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        assert wait_for(lambda: os.path.exists(daemon.socket_path))
+        yield daemon
+        daemon.shutdown()
+        thread.join(5)
+    helpers.clear()
+
+def send(daemon, *lines):
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.settimeout(10)
+        sock.connect(daemon.socket_path)
+        sock.sendall(b"".join(line.encode() + b"\n" for line in lines))
+        sock.shutdown(socket.SHUT_WR)
+        data = b"".join(iter(lambda: sock.recv(65536), b""))
+    return [json.loads(line) for line in data.splitlines()]
+
+def job(chall_dir, job_id, checker="web", **extra):
+    spec = {"addresses": ["127.0.0.1"], "secret": "secret", "local_challenge_dir": str(chall_dir)}
+    return json.dumps({"id": job_id, "checker": checker, "team": "team1", "helper": spec, **extra})
+
+def test_jobs_reuse_the_helper(daemon, chall_dir):
+    answers = send(daemon, job(chall_dir, 1), job(chall_dir, 2))
+    assert sorted(answers, key=lambda answer: answer["id"]) == [
+        {"id": 1, "team": "team1", "status": "OK", "message": "up"},
+        {"id": 2, "team": "team1", "status": "OK", "message": "up"},
+    ]
+    assert len(helpers) == 2 and helpers[0] is helpers[1]
+
+def test_invalid_jobs_are_answered(daemon, chall_dir):
+    answers = send(daemon, "[1]", "not json", "42", job(chall_dir, 1, checker="missing"), job(chall_dir, 2, checker="broken"), job(chall_dir, 3))
+    statuses = sorted((answer["id"] or 0, answer["status"]) for answer in answers)
+    assert statuses == [(0, "ERROR"), (0, "ERROR"), (0, "ERROR"), (1, "ERROR"), (2, "ERROR"), (3, "OK")]
+
+def test_job_missing_its_helper_is_answered(daemon):
+    assert send(daemon, json.dumps({"id": 1, "checker": "web"}))[0]["status"] == "ERROR"
+
+def test_stuck_checker_is_answered_on_time(daemon, chall_dir):
+    start = time.monotonic()
+    answers = send(daemon, job(chall_dir, 1, checker="slow", timeout=0.3))
+    assert time.monotonic() - start < 1.5
+    assert answers == [{"id": 1, "team": "team1", "status": "FAIL", "message": "check timed out after 0.3 seconds."}]
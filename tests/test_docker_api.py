@@ -0,0 +1,75 @@
+import socket
+import struct
+import tarfile
+
+import pytest
+
+import fulgens
+
+@pytest.fixture
+def api(engine):
+    return fulgens.DockerEngineAPI(engine.socket_path)
+
+def test_container_ids(engine, api):
+    assert api.container_ids("chall") == {"web": "api_web_0", "db": "api_db_0"}
+    assert api.container_ids("other") == {}
+
+def test_exec_demuxes_stdout_and_stderr(engine, api):
+    engine.frame_size = 3
+    stdout, stderr, exit_code = api.exec("api_web_0", ["/bin/sh", "-c", "echo hello world; echo oops >&2; exit 4"])
+    assert (stdout, stderr, exit_code) == (b"hello world\n", b"oops\n", 4)
+
+def test_exec_passes_the_environment(api):
+    assert api.exec("api_web_0", ["/bin/sh", "-c", "echo $GREETING"], env=["GREETING=hi"])[0] == b"hi\n"
+
+def test_exec_binary_output_spanning_frames(api, tmp_path):
+    data = bytes(range(256)) * 64
+    tmp_path.joinpath("blob").write_bytes(data)
+    assert api.exec("api_web_0", ["cat", str(tmp_path.joinpath("blob"))]) == (data, b"", 0)
+
+def test_exec_timeout(api):
+    with pytest.raises(TimeoutError):
+        api.exec("api_web_0", ["/bin/sh", "-c", "sleep 5"], timeout=0.3)
+    # The abandoned response must not leak into the next request.
+    assert api.exec("api_web_0", ["/bin/sh", "-c", "echo ok"])[0] == b"ok\n"
+
+def test_stat_path(api, tmp_path):
+    tmp_path.joinpath("file").write_bytes(b"12345")
+    file_stat = api.stat_path("api_web_0", str(tmp_path.joinpath("file")))
+    assert (file_stat["name"], file_stat["size"]) == ("file", 5)
+    assert api.stat_path("api_web_0", str(tmp_path))["mode"] & (1 << 31)
+
+def test_get_archive(api, tmp_path):
+    tmp_path.joinpath("folder").mkdir()
+    tmp_path.joinpath("folder", "a.txt").write_bytes(b"a")
+    with api.get_archive("api_web_0", str(tmp_path.joinpath("folder"))) as resp:
+        with tarfile.open(fileobj=resp, mode="r|") as tar:
+            names = [member.name for member in tar]
+    assert names == ["folder", "folder/a.txt"]
+
+def test_errors(api, tmp_path):
+    with pytest.raises(fulgens.DockerAPIError) as info:
+        api.stat_path("api_web_0", str(tmp_path.joinpath("missing")))
+    assert info.value.status == 404
+    with pytest.raises(fulgens.DockerAPIError, match="No such container"):
+        api.exec("api_gone_0", ["true"])
+
+def test_requests_reuse_the_connection(engine, api, tmp_path):
+    for _ in range(5):
+        api.container_ids("chall")
+        api.stat_path("api_web_0", str(tmp_path))
+    assert engine.connections == 1
+
+def test_exec_attach(api):
+    exec_id, sock = api.exec_attach("api_web_0", ["/bin/sh", "-c", "cat; echo done >&2; exit 3"])
+    with sock:
+        sock.sendall(b"ping\n")
+        sock.shutdown(socket.SHUT_WR)
+        data = b"".join(iter(lambda: sock.recv(65536), b""))
+    frames = []
+    while data:
+        stream, size = struct.unpack(">BxxxI", data[:8])
+        frames.append((stream, data[8:8 + size]))
+        data = data[8 + size:]
+    assert frames == [(1, b"ping\n"), (2, b"done\n")]
+    assert api.exec_inspect(exec_id) == {"Running": False, "ExitCode": 3}
@@ -0,0 +1,59 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import fulgens
+
+@pytest.fixture
+def exporter():
+    exporter = fulgens.PrometheusExporter()
+    yield exporter
+    exporter.close()
+
+def test_render(exporter, helper):
+    exporter.attach(helper, 'team "1"')
+    helper.run("web", "echo hi")
+    text = exporter.render()
+    labels = 'team="team \\"1\\"",service="web",operation="run",backend="local"'
+    assert "# TYPE fulgens_operations_total counter" in text
+    assert f"fulgens_operations_total{{{labels}}} 1\n" in text
+    assert f"fulgens_operation_bytes_total{{{labels}}} 3\n" in text
+    assert f'fulgens_operation_duration_seconds_bucket{{{labels},le="+Inf"}} 1\n' in text
+    assert f"fulgens_operation_size_bytes_count{{{labels}}} 1\n" in text
+
+def test_detached_helpers_keep_their_metrics(exporter, helper):
+    exporter.attach(helper, "team1")
+    helper.run("web", "true")
+    exporter.detach(helper)
+    helper.run("web", "true")
+    assert 'fulgens_operations_total{team="team1",service="web",operation="run",backend="local"} 1\n' in exporter.render()
+
+def test_run_checkers_labels_every_team(exporter, docker, chall_dir):
+    def checker(helper):
+        helper.run("web", "true")
+        return fulgens.Verdict.OK()
+    teams = {team: {"addresses": ["127.0.0.1"], "secret": team, "local_challenge_dir": chall_dir} for team in ("team1", "team2")}
+    fulgens.run_checkers(checker, teams, exporter=exporter)
+    text = exporter.render()
+    for team in teams:
+        assert f'fulgens_operations_total{{team="{team}",service="web",operation="run",backend="local"}} 1\n' in text
+
+def test_write_textfile(exporter, helper, tmp_path):
+    exporter.attach(helper, "team1")
+    helper.run("web", "true")
+    textfile_dir = tmp_path.joinpath("textfiles")
+    textfile_dir.mkdir()
+    exporter.write_textfile(textfile_dir.joinpath("fulgens.prom"))
+    assert textfile_dir.joinpath("fulgens.prom").read_text() == exporter.render()
+    assert [item.name for item in textfile_dir.iterdir()] == ["fulgens.prom"]
+
+def test_serve(exporter, helper):
+    exporter.attach(helper, "team1")
+    helper.run("web", "true")
+    port = exporter.serve(0, "127.0.0.1")
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert response.read().decode() == exporter.render()
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
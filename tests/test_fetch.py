@@ -0,0 +1,113 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+import fulgens
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path.joinpath("app")
+    source.mkdir()
+    source.joinpath("main.py").write_text("print()\n")
+    source.joinpath("lib").mkdir()
+    source.joinpath("lib", "util.py").write_text("x = 1\n")
+    os.symlink("/etc/passwd", source.joinpath("passwd"))
+    os.symlink("../main.py", source.joinpath("lib", "main.py"))
+    return source
+
+def tar_stream(*members):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode="w") as tar:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            if isinstance(content, bytes):
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+            else:
+                info.type, info.linkname = tarfile.SYMTYPE, content
+                tar.addfile(info)
+    data.seek(0)
+    return data
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_fetch_keeps_symlinks(helper, source, tmp_path, stream):
+    dest = tmp_path.joinpath("dest")
+    assert helper.fetch("web", str(source), dest, stream=stream)
+    assert dest.joinpath("main.py").read_text() == "print()\n"
+    assert os.readlink(dest.joinpath("passwd")) == "/etc/passwd"
+    assert os.readlink(dest.joinpath("lib", "main.py")) == "../main.py"
+
+def test_fetch_under_a_deadline_matches_a_plain_fetch(helper, source, tmp_path):
+    dest = tmp_path.joinpath("dest")
+    dest.mkdir()
+    with helper.deadline(10):
+        assert helper.fetch("web", str(source), dest)
+    assert os.readlink(dest.joinpath("app", "passwd")) == "/etc/passwd"
+    assert sorted(os.listdir(dest)) == ["app"]
+
+@pytest.mark.parametrize("member", [
+    ("app/../../escaped", b"x"),
+    ("app/sub/../../../escaped", b"x"),
+])
+def test_escaping_members_are_rejected(tmp_path, member):
+    dest = tmp_path.joinpath("dest")
+    with pytest.raises(IOError):
+        fulgens._extract_tar_stream(tar_stream(("app/ok", b"ok"), member), "/srv/app", dest)
+    assert sorted(os.listdir(tmp_path)) == []
+
+def test_members_below_a_symlink_are_rejected(tmp_path):
+    outside = tmp_path.joinpath("outside")
+    outside.mkdir()
+    dest = tmp_path.joinpath("dest")
+    with pytest.raises(IOError):
+        fulgens._extract_tar_stream(tar_stream(("app/link", str(outside)), ("app/link/escaped", b"x")), "/srv/app", dest)
+    assert os.listdir(outside) == []
+    assert not dest.exists()
+
+def test_failed_extraction_keeps_the_previous_destination(tmp_path):
+    dest = tmp_path.joinpath("dest")
+    dest.mkdir()
+    dest.joinpath("old").write_text("old")
+    truncated = io.BytesIO(tar_stream(("app/new", b"x" * 4096)).getvalue()[:1024])
+    with pytest.raises(tarfile.TarError):
+        fulgens._extract_tar_stream(truncated, "/srv/app", dest.joinpath("app"))
+    assert sorted(os.listdir(tmp_path)) == ["dest"]
+    assert sorted(os.listdir(dest)) == ["old"]
+    assert fulgens._extract_tar_stream(tar_stream(("app/new", b"x")), "/srv/app", dest)
+    assert dest.joinpath("app", "new").read_bytes() == b"x"
+
+def test_clone_fd_copies_the_content(tmp_path):
+    source, dest = tmp_path.joinpath("source"), tmp_path.joinpath("dest")
+    source.write_bytes(os.urandom(1 << 20))
+    with open(source, "rb") as source_file, open(dest, "wb") as dest_file:
+        assert fulgens._clone_fd(source_file.fileno(), dest_file.fileno())
+    assert dest.read_bytes() == source.read_bytes()
+
+def test_clone_fd_rewinds_when_it_cannot_copy(tmp_path, monkeypatch):
+    def copy_file_range(*args):
+        raise OSError(18, "Invalid cross-device link")
+
+    monkeypatch.setattr(fulgens, "_reflink_fd", lambda source_fd, dest_fd: False)
+    monkeypatch.setattr(os, "copy_file_range", copy_file_range)
+    source, dest = tmp_path.joinpath("source"), tmp_path.joinpath("dest")
+    source.write_bytes(b"data")
+    with open(source, "rb") as source_file, open(dest, "wb") as dest_file:
+        assert not fulgens._clone_fd(source_file.fileno(), dest_file.fileno())
+        assert (source_file.tell(), dest_file.tell()) == (0, 0)
+    # _copy_file then falls back to a plain copy.
+    fulgens._copy_file(source, dest)
+    assert dest.read_bytes() == b"data"
+
+def test_copy_file_into_a_directory_keeps_the_metadata(tmp_path):
+    source = tmp_path.joinpath("run.sh")
+    source.write_bytes(b"#!/bin/sh\n")
+    source.chmod(0o750)
+    os.utime(source, (1_000_000_000, 1_000_000_000))
+    dest_dir = tmp_path.joinpath("dest")
+    dest_dir.mkdir()
+    assert fulgens._copy_file(source, dest_dir) == str(dest_dir.joinpath("run.sh"))
+    st = dest_dir.joinpath("run.sh").stat()
+    assert (st.st_mode & 0o777, st.st_mtime) == (0o750, 1_000_000_000)
+    assert dest_dir.joinpath("run.sh").read_bytes() == b"#!/bin/sh\n"
@@ -0,0 +1,167 @@
+import os
+
+import pytest
+
+import fulgens
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path.joinpath("container", "app")
+    source.joinpath("static").mkdir(parents=True)
+    source.joinpath("main.py").write_bytes(b"print('v1')\n")
+    source.joinpath("static", "index.html").write_bytes(b"<h1>hi</h1>\n")
+    source.joinpath("run.sh").write_bytes(b"#!/bin/sh\n")
+    source.joinpath("run.sh").chmod(0o755)
+    return source
+
+@pytest.fixture
+def cache(tmp_path):
+    return fulgens.FetchCache(tmp_path.joinpath("cache"))
+
+@pytest.fixture
+def dest(tmp_path):
+    # Like shutil.move, fetching into an existing directory places the source inside it.
+    dest = tmp_path.joinpath("dest")
+    dest.mkdir()
+    return dest
+
+def transfers(helper):
+    return helper.stats().get(("fetch", "web", "local"), {}).get("count", 0)
+
+def tree(path):
+    return {str(child.relative_to(path)): child.read_bytes() for child in sorted(path.rglob("*")) if child.is_file()}
+
+def test_unchanged_fetch_is_served_from_the_cache(helper, cache, source, dest, tmp_path):
+    helper.fetch_cache = cache
+    assert helper.fetch("web", str(source), dest)
+    assert transfers(helper) == 1
+    assert helper.fetch("web", str(source), dest)
+    assert transfers(helper) == 1
+    assert tree(dest.joinpath("app")) == tree(source)
+    assert os.stat(dest.joinpath("app", "run.sh")).st_mode & 0o100
+
+def test_cache_hit_removes_files_deleted_in_the_container(helper, cache, source, dest, tmp_path):
+    helper.fetch_cache = cache
+    helper.fetch("web", str(source), dest)
+    source.joinpath("static", "index.html").unlink()
+    source.joinpath("static").rmdir()
+    assert helper.fetch("web", str(source), dest)
+    assert transfers(helper) == 1
+    assert tree(dest.joinpath("app")) == tree(source)
+    assert not dest.joinpath("app", "static").exists()
+
+def test_changed_file_is_transferred_again(helper, cache, source, dest, tmp_path):
+    helper.fetch_cache = cache
+    helper.fetch("web", str(source), dest)
+    source.joinpath("main.py").write_bytes(b"print('v2')\n")
+    assert helper.fetch("web", str(source), dest)
+    assert transfers(helper) == 2
+    assert dest.joinpath("app", "main.py").read_bytes() == b"print('v2')\n"
+
+def test_writing_a_fetched_file_leaves_the_cache_intact(helper, cache, source, tmp_path):
+    helper.fetch_cache = cache
+    first, second = tmp_path.joinpath("first"), tmp_path.joinpath("second")
+    helper.fetch("web", str(source), first)
+    first.joinpath("main.py").write_bytes(b"tampered\n")
+    helper.fetch("web", str(source), second)
+    assert transfers(helper) == 1
+    assert second.joinpath("main.py").read_bytes() == b"print('v1')\n"
+
+def test_hardlinked_fetches_share_the_stored_copy(helper, tmp_path, source):
+    helper.fetch_cache = fulgens.FetchCache(tmp_path.joinpath("cache"), hardlink=True)
+    first, second = tmp_path.joinpath("first"), tmp_path.joinpath("second")
+    helper.fetch("web", str(source), first)
+    helper.fetch("web", str(source), second)
+    assert os.path.samefile(first.joinpath("main.py"), second.joinpath("main.py"))
+
+def test_failed_fetch_keeps_the_previous_target(helper, cache, source, dest, monkeypatch):
+    helper.fetch_cache = cache
+    helper.fetch("web", str(source), dest)
+    before = tree(dest.joinpath("app"))
+    source.joinpath("main.py").write_bytes(b"print('v2')\n")
+    monkeypatch.setenv("FAKE_DOCKER_CP_DELAY", "30")
+    with pytest.raises(fulgens.CommandTimeout):
+        helper.fetch("web", str(source), dest, timeout=1)
+    assert tree(dest.joinpath("app")) == before
+    assert [child.name for child in dest.iterdir()] == ["app"]
+
+def test_cached_file_fetch(helper, cache, source, dest):
+    helper.fetch_cache = cache
+    for _ in range(2):
+        assert helper.fetch("web", str(source.joinpath("main.py")), dest)
+    assert transfers(helper) == 1
+    assert dest.joinpath("main.py").read_bytes() == b"print('v1')\n"
+
+def test_ingest_skips_files_that_changed_after_hashing(cache, tmp_path):
+    path = tmp_path.joinpath("file")
+    path.write_bytes(b"new")
+    stale = {"dir": False, "dirs": [], "files": {"": (fulgens.FetchCache.file_digest(path), False)}}
+    path.write_bytes(b"newer")
+    cache.ingest(stale, path)
+    assert cache.size == 0
+
+def test_gc_evicts_the_least_recently_used(tmp_path):
+    cache = fulgens.FetchCache(tmp_path.joinpath("cache"), max_size=10)
+    digests = []
+    for name in ("a", "b", "c"):
+        path = tmp_path.joinpath(name)
+        path.write_bytes(name.encode() * 4)
+        digests.append(fulgens.FetchCache.file_digest(path))
+        cache.add(path)
+        if name == "b":
+            # Touch "a" so "b" becomes the least recently used.
+            assert cache.get(digests[0]) is not None
+    assert cache.size == 8
+    assert cache.get(digests[1]) is None
+    assert cache.get(digests[0]) is not None and cache.get(digests[2]) is not None
+
+def test_recency_survives_a_restart(tmp_path):
+    cache = fulgens.FetchCache(tmp_path.joinpath("cache"))
+    path = tmp_path.joinpath("file")
+    path.write_bytes(b"data")
+    cache.add(path)
+    reopened = fulgens.FetchCache(tmp_path.joinpath("cache"))
+    assert reopened.size == 4
+    assert reopened.get(fulgens.FetchCache.file_digest(path)) is not None
+
+def test_names_with_newlines_stay_inside_the_target(helper, cache, source, dest, tmp_path):
+    helper.fetch_cache = cache
+    evil = source.joinpath("a\nD ..")
+    evil.mkdir()
+    evil.joinpath("x\\y\nX z").write_bytes(b"data\n")
+    for _ in range(2):
+        assert helper.fetch("web", str(source), dest)
+    assert transfers(helper) == 1
+    assert tree(dest.joinpath("app")) == tree(source)
+    assert sorted(child.name for child in dest.iterdir()) == ["app"]
+
+@pytest.mark.parametrize("path", ["app/../../pwned", "app//pwned", "other/pwned"])
+def test_manifest_rejects_paths_outside_the_source(path):
+    output = f"d\0{path}\0\0\0\0".encode()
+    assert fulgens._parse_manifest(output, "/srv/app") is None
+
+def test_materialize_rejects_paths_outside_the_target(cache, tmp_path):
+    with pytest.raises(ValueError):
+        cache.materialize({"dir": True, "dirs": ["../pwned"], "files": {}}, tmp_path.joinpath("target"))
+    assert not tmp_path.joinpath("pwned").exists()
+
+def test_artifact_store_dedupes_fetches(helper, source, tmp_path):
+    helper.artifact_store = fulgens.ArtifactStore(helper.local_chall_dir, hardlink=True)
+    first, second = tmp_path.joinpath("first"), tmp_path.joinpath("second")
+    helper.fetch("web", str(source), first)
+    helper.fetch("web", str(source), second)
+    assert transfers(helper) == 2
+    assert os.path.samefile(first.joinpath("main.py"), second.joinpath("main.py"))
+    assert helper.local_chall_dir.joinpath(".artifacts", "objects").is_dir()
+
+def test_artifact_store_keeps_no_copy_without_reflinks(helper, source, tmp_path):
+    helper.artifact_store = store = fulgens.ArtifactStore(helper.local_chall_dir)
+    first, second = tmp_path.joinpath("first"), tmp_path.joinpath("second")
+    helper.fetch("web", str(source), first)
+    helper.fetch("web", str(source), second)
+    assert tree(first) == tree(second) == tree(source)
+    stored = [path for path in store.root.joinpath("objects").rglob("*") if path.is_file()]
+    if store.reflink:
+        assert len(stored) == len(tree(source))
+    else:
+        assert stored == [] and store.size == 0
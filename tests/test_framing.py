@@ -0,0 +1,47 @@
+import subprocess
+
+import pytest
+
+import fulgens
+
+def run_framed(cmds, token="t0ken"):
+    script = "\n".join(fulgens._frame_command(cmd, token) for cmd in cmds)
+    result = subprocess.run(["/bin/sh", "-c", script], capture_output=True)
+    return fulgens._split_frames(result.stdout, result.stderr, token)
+
+def test_frames_keep_streams_and_exit_codes_apart():
+    frames = run_framed(["echo out; echo err >&2", "printf 'no newline'", "exit 3"])
+    assert frames == [(b"out\n", b"err\n", 0), (b"no newline", b"", 0), (b"", b"", 3)]
+
+def test_frame_commands_see_a_closed_stdin():
+    assert run_framed(["cat", "echo after"]) == [(b"", b"", 0), (b"after\n", b"", 0)]
+
+def test_binary_output_survives_framing():
+    frames = run_framed(["printf '\\000\\377\\036x\\n'"])
+    assert frames == [(b"\x00\xff\x1ex\n", b"", 0)]
+
+def test_incomplete_frames_are_dropped():
+    token = "t0ken"
+    stdout = b"a\n\x1et0ken 0\nb\n\x1et0ken 1\npartial"
+    # The stderr marker of the second frame is missing, as if the script was killed.
+    stderr = b"\x1et0ken\n"
+    assert fulgens._split_frames(stdout, stderr, token) == [(b"a\n", b"", 0)]
+
+def test_run_steps(helper):
+    steps = helper.run_steps("web", ["echo one", "echo two >&2; false", "echo three"])
+    assert [step.cmd for step in steps] == ["echo one", "echo two >&2; false", "echo three"]
+    assert [tuple(step) for step in steps] == [(b"one\n", b"", 0), (b"", b"two\n", 1), (b"three\n", b"", 0)]
+    assert [step.is_ok() for step in steps] == [True, False, True]
+
+def test_run_steps_stop_on_failure(helper):
+    steps = helper.run_steps("web", ["true", "exit 2", "echo never"], stop_on_failure=True)
+    assert [step.exit_code for step in steps] == [0, 2]
+
+def test_run_steps_share_one_exec(helper):
+    helper.run_steps("web", ["true", "true", "true"])
+    assert helper.stats()[("run", "web", "local")]["count"] == 1
+
+def test_run_steps_killed_script(helper):
+    # $$ is the shell running every step, so the remaining frames never come.
+    with pytest.raises(IOError):
+        helper.run_steps("web", ["true", "kill -9 $$", "true"])
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import fulgens
+
+def test_connections_share_one_transport(pool, ssh_server):
+    first = pool.connection("127.0.0.1", "checker", ssh_server.port)
+    second = pool.connection("127.0.0.1", "checker", ssh_server.port)
+    assert first.run("echo one", hide=True, in_stream=False).stdout == "one\n"
+    assert second.run("echo two", hide=True, in_stream=False).stdout == "two\n"
+    with pool.acquire("127.0.0.1", "checker", ssh_server.port) as conn:
+        transport = conn.transport
+    with pool.acquire("127.0.0.1", "checker", ssh_server.port) as conn:
+        assert conn.transport is transport
+
+def test_channels_per_host_are_limited(ssh_server):
+    pool = fulgens.SSHConnectionPool(max_channels_per_host=1, connect_kwargs=ssh_server.connect_kwargs())
+    conn = pool.connection("127.0.0.1", "checker", ssh_server.port)
+    conn.run("true", hide=True, in_stream=False)
+    threads = [threading.Thread(target=conn.run, args=("sleep 0.3",), kwargs={"hide": True, "in_stream": False}) for _ in range(2)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.6
+    pool.close()
+
+def test_dropped_transport_is_reconnected(pool, ssh_server):
+    conn = pool.connection("127.0.0.1", "checker", ssh_server.port)
+    conn.run("true", hide=True, in_stream=False)
+    with pool.acquire("127.0.0.1", "checker", ssh_server.port) as raw:
+        raw.transport.close()
+    assert conn.run("echo back", hide=True, in_stream=False).stdout == "back\n"
+
+def test_idle_connections_are_evicted(ssh_server):
+    pool = fulgens.SSHConnectionPool(idle_timeout=0, connect_kwargs=ssh_server.connect_kwargs())
+    with pool.acquire("127.0.0.1", "checker", ssh_server.port) as raw:
+        raw.run("true", hide=True, in_stream=False)
+    pool.evict_idle()
+    assert not raw.is_connected
+    pool.close()
+
+def test_helper_runs_over_the_pool(pool, ssh_server, docker, chall_dir):
+    conn = pool.connection("127.0.0.1", "checker", ssh_server.port)
+    helper = fulgens.ChallengeHelper(["127.0.0.1"], "secret", chall_dir, ssh_conn=conn)
+    assert helper.run("web", "echo hi") == (b"hi\n", b"", 0)
+    assert helper.backend.name == "ssh"
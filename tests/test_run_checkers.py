@@ -0,0 +1,45 @@
+import threading
+import time
+
+import fulgens
+from conftest import is_dead, wait_for
+
+def test_verdicts_per_team(docker, chall_dir):
+    def checker(helper):
+        stdout, _, _ = helper.run("web", "sleep 0.3; echo up")
+        if helper.secret == "broken":
+            raise RuntimeError("checker bug")
+        return fulgens.Verdict.OK(stdout.decode().strip())
+    teams = {f"team{i}": {"addresses": ["127.0.0.1"], "secret": f"secret{i}", "local_challenge_dir": chall_dir} for i in range(3)}
+    teams["team3"] = fulgens.ChallengeHelper(["127.0.0.1"], "broken", chall_dir)
+    start = time.monotonic()
+    verdicts = fulgens.run_checkers(checker, teams, max_workers=4)
+    assert time.monotonic() - start < 1.0
+    assert [(team, verdict.status, verdict.message) for team, verdict in verdicts.items()] == [
+        ("team0", "OK", "up"), ("team1", "OK", "up"), ("team2", "OK", "up"), ("team3", "ERROR", "checker bug"),
+    ]
+
+def test_team_timeout_kills_the_running_command(helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    def checker(helper):
+        helper.run("web", f"sleep 30 & echo $! > {pid_file}; wait")
+        return fulgens.Verdict.OK()
+    start = time.monotonic()
+    verdicts = fulgens.run_checkers(checker, {"team0": helper}, team_timeout=0.5)
+    assert time.monotonic() - start < 2.0
+    assert verdicts["team0"].status == "FAIL"
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
+
+def test_tick_timeout_returns_right_away(helper):
+    release = threading.Event()
+    def checker(helper):
+        release.wait()
+        return fulgens.Verdict.OK()
+    start = time.monotonic()
+    try:
+        verdicts = fulgens.run_checkers(checker, {"team0": helper, "team1": helper}, max_workers=1, tick_timeout=0.3)
+    finally:
+        release.set()
+    assert time.monotonic() - start < 1.0
+    assert {team: verdict.message for team, verdict in verdicts.items()} == {"team0": "tick time budget expired.", "team1": "tick time budget expired."}
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+import fulgens
+from conftest import is_dead, wait_for
+
+def test_results_per_service(helper):
+    results = helper.run_many({"web": "echo web", "db": ["echo db >&2", "exit 2"]})
+    assert results == {"web": (b"web\n", b"", 0), "db": (b"", b"db\n", 2)}
+    stats = helper.stats()
+    assert stats[("run_many", None, "local")]["count"] == 1
+    assert stats[("run_many", None, "local")]["spawns"] == 1
+
+def test_commands_run_concurrently(helper):
+    start = time.monotonic()
+    helper.run_many({"web": "sleep 0.5", "db": "sleep 0.5"})
+    assert time.monotonic() - start < 0.9
+
+def test_binary_output(helper):
+    assert helper.run_many({"web": "printf '\\000\\377'"})["web"] == (b"\x00\xff", b"", 0)
+
+def test_stale_container_is_retried(helper, docker):
+    helper.refresh_containers()
+    docker.recreate()
+    assert helper.run_many({"web": "echo web", "db": "echo db"}) == {"web": (b"web\n", b"", 0), "db": (b"db\n", b"", 0)}
+    assert helper.container_ids == {"web": "fake_web_2", "db": "fake_db_2"}
+
+def test_timeout_kills_every_command(helper, tmp_path):
+    pid_files = {service_name: tmp_path.joinpath(service_name) for service_name in ("web", "db")}
+    with pytest.raises(fulgens.CommandTimeout):
+        helper.run_many({service_name: f"sleep 30 & echo $! > {pid_file}; wait" for service_name, pid_file in pid_files.items()}, timeout=0.5)
+    for pid_file in pid_files.values():
+        pid = int(pid_file.read_text())
+        assert wait_for(lambda: is_dead(pid))
+
+def test_unknown_service(helper):
+    with pytest.raises(ValueError):
+        helper.run_many({"web": "true", "cache": "true"})
@@ -0,0 +1,39 @@
+import pytest
+
+import fulgens
+from conftest import is_dead, wait_for
+
+def test_commands_share_one_exec(helper):
+    with helper.session("web") as session:
+        assert session.run("echo hi") == (b"hi\n", b"", 0)
+        assert session.run(["echo out", "echo err >&2", "exit 3"]) == (b"out\n", b"err\n", 3)
+        # exit and stdin reads only end their own subshell.
+        assert session.run("cat; echo after") == (b"after\n", b"", 0)
+        assert session.run("printf 'no newline'") == (b"no newline", b"", 0)
+    stats = helper.stats()
+    assert stats[("session", "web", "local")]["count"] == 1
+    assert ("run", "web", "local") not in stats
+
+def test_binary_output(helper):
+    with helper.session("web") as session:
+        assert session.run("printf '\\000\\001\\377\\n\\n'") == (b"\x00\x01\xff\n\n", b"", 0)
+
+def test_closed_session_refuses_commands(helper):
+    session = helper.session("web")
+    session.close()
+    with pytest.raises(IOError):
+        session.run("true")
+
+def test_timeout_closes_the_session_and_kills_the_command(helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    with helper.session("web") as session:
+        with pytest.raises(fulgens.CommandTimeout):
+            session.run(f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5)
+        with pytest.raises(IOError):
+            session.run("true")
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
+
+def test_unknown_service(helper):
+    with pytest.raises(ValueError):
+        helper.session("cache")
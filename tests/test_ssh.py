@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import fulgens
+
+BINARY = bytes(range(256))
+
+def ssh_helper(ssh_server, chall_dir, pool=None):
+    if pool is not None:
+        conn = pool.connection("127.0.0.1", "checker", ssh_server.port)
+    else:
+        import fabric
+        conn = fabric.Connection("127.0.0.1", user="checker", port=ssh_server.port, connect_kwargs=ssh_server.connect_kwargs())
+    return fulgens.ChallengeHelper(["127.0.0.1"], "secret", chall_dir, ssh_conn=conn)
+
+def printf_cmd(data):
+    return "printf '" + "".join(f"\\{byte:03o}" for byte in data) + "'"
+
+def test_binary_output_is_unchanged(ssh_server, docker, chall_dir):
+    helper = ssh_helper(ssh_server, chall_dir)
+    assert helper.run("web", [printf_cmd(BINARY), printf_cmd(BINARY) + " >&2"]) == (BINARY, BINARY, 0)
+    assert helper.stats()[("run", "web", "ssh")]["bytes"] == 512
+
+def test_binary_output_over_the_pool(ssh_server, pool, docker, chall_dir):
+    helper = ssh_helper(ssh_server, chall_dir, pool)
+    assert helper.run_many({"web": printf_cmd(BINARY), "db": "exit 2"}) == {"web": (BINARY, b"", 0), "db": (b"", b"", 2)}
+    with helper.session("web") as session:
+        assert session.run(printf_cmd(BINARY)) == (BINARY, b"", 0)
+    with helper.stream("web", printf_cmd(BINARY)) as output:
+        assert b"".join(output) == BINARY
+
+def test_folder_fetch_into_a_path_with_spaces(ssh_server, docker, chall_dir, tmp_path):
+    # Relative container paths resolve in the remote root, as /tmp is rewritten on the server.
+    source = Path(ssh_server.remote_root).joinpath("app; touch pwned")
+    source.joinpath("sub dir").mkdir(parents=True)
+    source.joinpath("sub dir", "data").write_bytes(BINARY)
+    dest = tmp_path.joinpath("my dest")
+    helper = ssh_helper(ssh_server, chall_dir)
+    assert helper.fetch("web", "app; touch pwned", dest)
+    assert dest.joinpath("sub dir", "data").read_bytes() == BINARY
+    assert sorted(child.name for child in tmp_path.iterdir() if child.name.startswith(".fulgens-")) == []
+    assert not Path(ssh_server.remote_root).joinpath("pwned").exists() and not Path("pwned").exists()
@@ -0,0 +1,38 @@
+import pytest
+
+import fulgens
+
+def test_histogram_buckets():
+    histogram = fulgens.Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.to_dict() == {"buckets": {1: 2, 10: 3, float("inf"): 4}, "count": 4, "sum": 56.5}
+
+def test_operations_are_counted(helper):
+    helper.run("web", "echo hello")
+    helper.run("web", "true")
+    with pytest.raises(ValueError):
+        helper.run("cache", "true")
+    stats = helper.stats()[("run", "web", "local")]
+    assert (stats["count"], stats["errors"], stats["spawns"], stats["bytes"]) == (2, 0, 2, 6)
+    assert stats["latency"]["count"] == 2
+    assert stats["size"]["buckets"][256] == 2
+
+def test_failed_operations_are_counted_as_errors(helper, tmp_path):
+    with pytest.raises(IOError):
+        helper.read("web", str(tmp_path.joinpath("missing")))
+    assert helper.stats()[("read", "web", "local")]["errors"] == 1
+
+def test_hooks_get_every_sample(helper):
+    samples = []
+    def hook(hook_helper, sample):
+        assert hook_helper is helper
+        samples.append((sample.operation, sample.service, sample.backend, sample.error))
+    def broken_hook(hook_helper, sample):
+        raise RuntimeError("metrics are down")
+    helper.add_stats_hook(broken_hook)
+    helper.add_stats_hook(hook)
+    helper.run("web", "true")
+    helper.remove_stats_hook(hook)
+    helper.run("web", "true")
+    assert samples == [("ps", None, "local", None), ("run", "web", "local", None)]
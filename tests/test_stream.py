@@ -0,0 +1,33 @@
+import pytest
+
+import fulgens
+from conftest import is_dead, wait_for
+
+def test_chunks_and_exit_code(helper):
+    with helper.stream("web", ["echo one", "echo two >&2", "printf 'three'", "exit 4"]) as output:
+        assert b"".join(output) == b"one\nthree"
+    assert output.exit_code == 4
+
+def test_lines(helper):
+    with helper.stream("web", "printf 'a\\nb\\nc'; sleep 0.1; printf 'd\\n'", lines=True) as output:
+        assert list(output) == [b"a\n", b"b\n", b"cd\n"]
+
+def test_output_arrives_while_the_command_runs(helper):
+    with helper.stream("web", "echo ready; sleep 30", lines=True, timeout=5) as output:
+        assert next(output) == b"ready\n"
+
+def test_closing_early_kills_the_command_inside_the_container(helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    with helper.stream("web", f"sleep 30 & echo $! > {pid_file}; echo ready; wait", lines=True) as output:
+        assert next(output) == b"ready\n"
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
+    assert helper.stats()[("kill", "web", "local")]["count"] == 1
+
+def test_timeout(helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    with pytest.raises(fulgens.CommandTimeout):
+        with helper.stream("web", f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5) as output:
+            list(output)
+    pid = int(pid_file.read_text())
+    assert wait_for(lambda: is_dead(pid))
@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+import fulgens
+from conftest import is_dead, wait_for
+
+SLEEP_CMD = "sleep 30 & echo $! > {pid_file}; wait"
+
+def started_pid(pid_file):
+    assert wait_for(lambda: pid_file.exists() and pid_file.read_text().strip())
+    return int(pid_file.read_text())
+
+def test_watchdog_runs_callbacks_and_raises():
+    killed = []
+    with pytest.raises(fulgens.CommandTimeout) as info:
+        with fulgens._Watchdog(0.05) as watchdog:
+            watchdog.on_expire(lambda: killed.append(True))
+            time.sleep(0.2)
+    assert killed == [True]
+    assert info.value.timeout == 0.05
+    # Callbacks registered after the expiry run right away.
+    watchdog.on_expire(lambda: killed.append(True))
+    assert killed == [True, True]
+
+def test_watchdog_without_timeout_never_expires():
+    with fulgens._Watchdog(None) as watchdog:
+        watchdog.check()
+    assert not watchdog.expired
+
+def test_run_timeout_kills_the_command_inside_the_container(helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    start = time.monotonic()
+    with pytest.raises(fulgens.CommandTimeout):
+        helper.run("web", SLEEP_CMD.format(pid_file=pid_file), timeout=0.5)
+    assert time.monotonic() - start < 5
+    pid = started_pid(pid_file)
+    assert wait_for(lambda: is_dead(pid))
+    assert wait_for(lambda: ("kill", "web", "local") in helper.stats())
+
+def test_deadline_kill_runs_after_the_deadline_expired(helper, tmp_path):
+    pid_file = tmp_path.joinpath("pid")
+    with pytest.raises(fulgens.CommandTimeout):
+        with helper.deadline(0.5):
+            helper.run("web", SLEEP_CMD.format(pid_file=pid_file))
+    pid = started_pid(pid_file)
+    assert wait_for(lambda: is_dead(pid))
+    assert wait_for(lambda: helper.stats().get(("kill", "web", "local"), {}).get("errors") == 0)
+
+def test_expired_deadline_refuses_new_calls(helper):
+    helper.refresh_containers()
+    with helper.deadline(0.1):
+        time.sleep(0.2)
+        with pytest.raises(fulgens.CommandTimeout):
+            helper.run("web", "true")
+    assert ("run", "web", "local") not in helper.stats()
+
+def test_nested_deadlines_take_the_earliest(helper):
+    with helper.deadline(30):
+        with helper.deadline(0.3):
+            with pytest.raises(fulgens.CommandTimeout):
+                helper.run("web", "sleep 5")
+        assert helper.run("web", "echo ok") == (b"ok\n", b"", 0)
+
+def test_fetch_timeout(helper, tmp_path, monkeypatch):
+    source = tmp_path.joinpath("source")
+    source.write_bytes(b"data")
+    monkeypatch.setenv("FAKE_DOCKER_CP_DELAY", "30")
+    start = time.monotonic()
+    with pytest.raises(fulgens.CommandTimeout):
+        helper.fetch("web", str(source), tmp_path.joinpath("dest"), timeout=0.5)
+    assert time.monotonic() - start < 5
+    assert not tmp_path.joinpath("dest").exists()
+
+def test_run_many_retry_gets_what_is_left_of_the_timeout(helper, docker, monkeypatch):
+    helper.refresh_containers()
+    docker.recreate()
+    monkeypatch.setenv("FAKE_DOCKER_LATENCY", "0.3")
+    start = time.monotonic()
+    # The stale batch and the container lookup use up most of the second.
+    with pytest.raises(fulgens.CommandTimeout):
+        helper.run_many({"web": "sleep 0.6"}, timeout=1.0)
+    assert time.monotonic() - start < 1.5
+
+def test_cached_fetch_shares_the_timeout(helper, tmp_path, monkeypatch):
+    helper.fetch_cache = fulgens.FetchCache(tmp_path.joinpath("cache"))
+    helper.refresh_containers()
+    source = tmp_path.joinpath("source")
+    source.write_bytes(b"data")
+    monkeypatch.setenv("FAKE_DOCKER_LATENCY", "0.4")
+    monkeypatch.setenv("FAKE_DOCKER_CP_DELAY", "0.4")
+    # The manifest and the copy fit in the timeout one at a time, not together.
+    with pytest.raises(fulgens.CommandTimeout):
+        helper.fetch("web", str(source), tmp_path.joinpath("dest"), timeout=1.0)
+    assert not tmp_path.joinpath("dest").exists()